@@ -1,7 +1,19 @@
 import { useEffect, useRef, useState } from "react";
 
 import { createMockPokerSession } from "../lib/mockSession";
-import { buildStartGameMessage, resolveWebSocketUrl } from "../lib/socket";
+import {
+  buildResyncMessage,
+  buildStartGameMessage,
+  decodeServerMessage,
+  encodeClientMessage,
+  isSessionMessage,
+  loadSessionToken,
+  resolveWebSocketUrl,
+  resolveWireEncoding,
+  saveSessionToken,
+  SESSION_SUSPENDED_MESSAGE_TYPE,
+} from "../lib/socket";
+import { isStateStreamMessage, reduceStateMessage } from "../lib/statePatch";
 
 const SOCKET_STATES = {
   CLOSED: 3,
@@ -13,9 +25,11 @@ const FALLBACK_TO_MOCK_MESSAGE =
   "Backend unavailable. Running in frontend mock mode so the game stays playable.";
 const CONNECTION_ERROR_MESSAGE = "Could not establish a websocket session.";
 const PAYLOAD_ERROR_MESSAGE = "The backend returned invalid game data.";
+const SESSION_SUSPENDED_MESSAGE = "The server is restarting. Reload the page to continue the match.";
 
 export function usePokerSession(sessionRequest) {
   const socketRef = useRef(null);
+  const encodingRef = useRef(resolveWireEncoding());
   const mockSessionRef = useRef(null);
   const [gameData, setGameData] = useState(null);
   const [connectionState, setConnectionState] = useState("idle");
@@ -34,6 +48,7 @@ export function usePokerSession(sessionRequest) {
     let hasReceivedBackendPayload = false;
     let fallbackTriggered = false;
     let isDisposed = false;
+    let stateStream = { needsResync: false, seq: 0, state: null };
 
     const stopMockSession = () => {
       mockSessionRef.current?.stop();
@@ -88,6 +103,7 @@ export function usePokerSession(sessionRequest) {
     setSessionMode("backend");
 
     socket = new WebSocket(websocketUrl);
+    socket.binaryType = "arraybuffer";
     socketRef.current = socket;
 
     socket.onopen = () => {
@@ -95,7 +111,9 @@ export function usePokerSession(sessionRequest) {
         return;
       }
       setConnectionState("connected");
-      socket.send(buildStartGameMessage(gameType, chipMode));
+      socket.send(
+        buildStartGameMessage(gameType, chipMode, "delta", encodingRef.current, loadSessionToken(sessionKey)),
+      );
     };
 
     socket.onmessage = (event) => {
@@ -104,7 +122,28 @@ export function usePokerSession(sessionRequest) {
       }
       try {
         hasReceivedBackendPayload = true;
-        setGameData(JSON.parse(event.data));
+        const payload = decodeServerMessage(event.data);
+        if (isSessionMessage(payload)) {
+          saveSessionToken(sessionKey, payload.sessionToken);
+          if (payload.type === SESSION_SUSPENDED_MESSAGE_TYPE) {
+            setConnectionState("error");
+            setErrorMessage(SESSION_SUSPENDED_MESSAGE);
+          }
+          return;
+        }
+        if (isStateStreamMessage(payload)) {
+          const wasWaitingForResync = stateStream.needsResync;
+          stateStream = reduceStateMessage(stateStream, payload);
+          if (stateStream.needsResync) {
+            if (!wasWaitingForResync) {
+              socket.send(encodeClientMessage(buildResyncMessage(), encodingRef.current));
+            }
+            return;
+          }
+          setGameData(stateStream.state);
+        } else {
+          setGameData(payload);
+        }
         setConnectionState("streaming");
         setErrorMessage("");
       } catch {
@@ -162,7 +201,7 @@ export function usePokerSession(sessionRequest) {
       return;
     }
     if (socketRef.current?.readyState === SOCKET_STATES.OPEN) {
-      socketRef.current.send(message);
+      socketRef.current.send(encodeClientMessage(message, encodingRef.current));
     }
   };
 
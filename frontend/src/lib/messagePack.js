@@ -0,0 +1,223 @@
+// A MessagePack codec covering the types the backend's msgpack.packb writes for game states: nil, booleans,
+// integers, floats, strings, binaries, arrays and maps. Extension types are not used by the protocol. 64-bit
+// integers are read as numbers, exact up to Number.MAX_SAFE_INTEGER.
+
+const textDecoder = new TextDecoder();
+const textEncoder = new TextEncoder();
+
+export function decodeMessagePack(data) {
+  const bytes = data instanceof Uint8Array ? data : new Uint8Array(data);
+  const view = new DataView(bytes.buffer, bytes.byteOffset, bytes.byteLength);
+  let offset = 0;
+
+  const readString = (length) => {
+    const value = textDecoder.decode(bytes.subarray(offset, offset + length));
+    offset += length;
+    return value;
+  };
+
+  const readArray = (length) => {
+    const value = new Array(length);
+    for (let index = 0; index < length; index += 1) {
+      value[index] = readValue();
+    }
+    return value;
+  };
+
+  const readMap = (length) => {
+    const value = {};
+    for (let index = 0; index < length; index += 1) {
+      const key = readValue();
+      value[key] = readValue();
+    }
+    return value;
+  };
+
+  const readValue = () => {
+    if (offset >= bytes.length) {
+      throw new RangeError("MessagePack data ended early.");
+    }
+    const type = bytes[offset];
+    offset += 1;
+
+    if (type <= 0x7f) return type;
+    if (type >= 0xe0) return type - 0x100;
+    if (type >= 0x80 && type <= 0x8f) return readMap(type & 0x0f);
+    if (type >= 0x90 && type <= 0x9f) return readArray(type & 0x0f);
+    if (type >= 0xa0 && type <= 0xbf) return readString(type & 0x1f);
+
+    let value;
+    switch (type) {
+      case 0xc0:
+        return null;
+      case 0xc2:
+        return false;
+      case 0xc3:
+        return true;
+      case 0xc4:
+        value = bytes.slice(offset + 1, offset + 1 + bytes[offset]);
+        offset += 1 + value.length;
+        return value;
+      case 0xc5:
+        value = bytes.slice(offset + 2, offset + 2 + view.getUint16(offset));
+        offset += 2 + value.length;
+        return value;
+      case 0xc6:
+        value = bytes.slice(offset + 4, offset + 4 + view.getUint32(offset));
+        offset += 4 + value.length;
+        return value;
+      case 0xca:
+        value = view.getFloat32(offset);
+        offset += 4;
+        return value;
+      case 0xcb:
+        value = view.getFloat64(offset);
+        offset += 8;
+        return value;
+      case 0xcc:
+        value = view.getUint8(offset);
+        offset += 1;
+        return value;
+      case 0xcd:
+        value = view.getUint16(offset);
+        offset += 2;
+        return value;
+      case 0xce:
+        value = view.getUint32(offset);
+        offset += 4;
+        return value;
+      case 0xcf:
+        value = Number(view.getBigUint64(offset));
+        offset += 8;
+        return value;
+      case 0xd0:
+        value = view.getInt8(offset);
+        offset += 1;
+        return value;
+      case 0xd1:
+        value = view.getInt16(offset);
+        offset += 2;
+        return value;
+      case 0xd2:
+        value = view.getInt32(offset);
+        offset += 4;
+        return value;
+      case 0xd3:
+        value = Number(view.getBigInt64(offset));
+        offset += 8;
+        return value;
+      case 0xd9:
+        offset += 1;
+        return readString(bytes[offset - 1]);
+      case 0xda:
+        offset += 2;
+        return readString(view.getUint16(offset - 2));
+      case 0xdb:
+        offset += 4;
+        return readString(view.getUint32(offset - 4));
+      case 0xdc:
+        offset += 2;
+        return readArray(view.getUint16(offset - 2));
+      case 0xdd:
+        offset += 4;
+        return readArray(view.getUint32(offset - 4));
+      case 0xde:
+        offset += 2;
+        return readMap(view.getUint16(offset - 2));
+      case 0xdf:
+        offset += 4;
+        return readMap(view.getUint32(offset - 4));
+      default:
+        throw new TypeError(`Unsupported MessagePack type 0x${type.toString(16)}.`);
+    }
+  };
+
+  const value = readValue();
+  if (offset !== bytes.length) {
+    throw new RangeError("MessagePack data has trailing bytes.");
+  }
+  return value;
+}
+
+function encodeLength(chunks, length, fixPrefix, fixLimit, prefixes) {
+  if (length < fixLimit) {
+    chunks.push(fixPrefix | length);
+  } else if (prefixes[0] !== null && length <= 0xff) {
+    chunks.push(prefixes[0], length);
+  } else if (length <= 0xffff) {
+    chunks.push(prefixes[1], length >> 8, length & 0xff);
+  } else {
+    chunks.push(prefixes[2], (length >>> 24) & 0xff, (length >> 16) & 0xff, (length >> 8) & 0xff, length & 0xff);
+  }
+}
+
+function encodeWide(chunks, prefix, length, write) {
+  const buffer = new DataView(new ArrayBuffer(length));
+  write(buffer);
+  chunks.push(prefix, ...new Uint8Array(buffer.buffer));
+}
+
+// Integers take the smallest type that holds them, unsigned ones when they are not negative, as msgpack.packb
+// writes them, so integers of any width stay integers instead of becoming float64.
+function encodeInteger(chunks, value) {
+  if (value >= 0) {
+    if (value <= 0x7f) {
+      chunks.push(value);
+    } else if (value <= 0xff) {
+      chunks.push(0xcc, value);
+    } else if (value <= 0xffff) {
+      encodeWide(chunks, 0xcd, 2, (buffer) => buffer.setUint16(0, value));
+    } else if (value <= 0xffffffff) {
+      encodeWide(chunks, 0xce, 4, (buffer) => buffer.setUint32(0, value));
+    } else {
+      encodeWide(chunks, 0xcf, 8, (buffer) => buffer.setBigUint64(0, BigInt(value)));
+    }
+  } else if (value >= -0x20) {
+    chunks.push(value & 0xff);
+  } else if (value >= -0x80) {
+    chunks.push(0xd0, value & 0xff);
+  } else if (value >= -0x8000) {
+    encodeWide(chunks, 0xd1, 2, (buffer) => buffer.setInt16(0, value));
+  } else if (value >= -0x80000000) {
+    encodeWide(chunks, 0xd2, 4, (buffer) => buffer.setInt32(0, value));
+  } else {
+    encodeWide(chunks, 0xd3, 8, (buffer) => buffer.setBigInt64(0, BigInt(value)));
+  }
+}
+
+function encodeValue(chunks, value) {
+  if (value === null || value === undefined) {
+    chunks.push(0xc0);
+  } else if (typeof value === "boolean") {
+    chunks.push(value ? 0xc3 : 0xc2);
+  } else if (typeof value === "number") {
+    if (Number.isInteger(value) && value >= -(2 ** 63) && value < 2 ** 64) {
+      encodeInteger(chunks, value);
+    } else {
+      encodeWide(chunks, 0xcb, 8, (buffer) => buffer.setFloat64(0, value));
+    }
+  } else if (typeof value === "string") {
+    const encoded = textEncoder.encode(value);
+    encodeLength(chunks, encoded.length, 0xa0, 32, [0xd9, 0xda, 0xdb]);
+    chunks.push(...encoded);
+  } else if (Array.isArray(value)) {
+    encodeLength(chunks, value.length, 0x90, 16, [null, 0xdc, 0xdd]);
+    value.forEach((item) => encodeValue(chunks, item));
+  } else if (typeof value === "object") {
+    const entries = Object.entries(value);
+    encodeLength(chunks, entries.length, 0x80, 16, [null, 0xde, 0xdf]);
+    entries.forEach(([key, item]) => {
+      encodeValue(chunks, key);
+      encodeValue(chunks, item);
+    });
+  } else {
+    throw new TypeError(`Cannot encode ${typeof value} as MessagePack.`);
+  }
+}
+
+// Only used for the short messages a client sends, so the bytes are collected in a plain array.
+export function encodeMessagePack(value) {
+  const chunks = [];
+  encodeValue(chunks, value);
+  return Uint8Array.from(chunks);
+}
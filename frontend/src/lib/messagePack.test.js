@@ -0,0 +1,56 @@
+import { describe, expect, it } from "vitest";
+
+import { decodeMessagePack, encodeMessagePack } from "./messagePack";
+
+describe("MessagePack codec", () => {
+  it("round-trips the values a game state holds", () => {
+    const state = {
+      chips_won_history: [100, -50, -200, 70000, -70000, 5000000000],
+      long_name: "x".repeat(40),
+      pot: 12.5,
+      show_down_hand: { value: null },
+      table_cards: ["As", "Kd"],
+      game_over: false,
+      winner_name: "Dealer",
+    };
+
+    expect(decodeMessagePack(encodeMessagePack(state))).toEqual(state);
+  });
+
+  it("writes the bytes the backend's msgpack.packb writes", () => {
+    const state = {
+      seq: 300,
+      chips_won_history: [100, -50, -200, 200, 70000, -70000, 5000000000, -5000000000, 2 ** 53 - 1, -(2 ** 53 - 1)],
+      long_name: "x".repeat(40),
+      pot: 12.5,
+      show_down_hand: { value: null },
+      game_over: false,
+      winner_name: "Zoë",
+    };
+    // msgpack.packb of the same dict in Python
+    const packed = Uint8Array.from(
+      (
+        "87a3736571cd012cb163686970735f776f6e5f686973746f72799a64d0ced1ff38ccc8ce00011170d2fffeee90cf000000012a05f200" +
+        "d3fffffffed5fa0e00cf001fffffffffffffd3ffe0000000000001a96c6f6e675f6e616d65d928" +
+        "78".repeat(40) +
+        "a3706f74cb4029000000000000ae73686f775f646f776e5f68616e6481a576616c7565c0a967616d655f6f766572c2ab77696e6e6572" +
+        "5f6e616d65a45a6fc3ab"
+      )
+        .match(/../g)
+        .map((byte) => parseInt(byte, 16)),
+    );
+
+    expect(encodeMessagePack(state)).toEqual(packed);
+    expect(decodeMessagePack(packed)).toEqual(state);
+  });
+
+  it("reads the wide types the backend writes", () => {
+    // {"seq": 300} with a uint16, then a negative int8 inside an array16
+    expect(decodeMessagePack(new Uint8Array([0x81, 0xa3, 0x73, 0x65, 0x71, 0xcd, 0x01, 0x2c]))).toEqual({ seq: 300 });
+    expect(decodeMessagePack(new Uint8Array([0xdc, 0x00, 0x01, 0xd0, 0x9c]))).toEqual([-100]);
+  });
+
+  it("rejects truncated data", () => {
+    expect(() => decodeMessagePack(new Uint8Array([0x92, 0x01]))).toThrow(RangeError);
+  });
+});
@@ -1,3 +1,5 @@
+import { decodeMessagePack, encodeMessagePack } from "./messagePack";
+
 const LOCAL_HOSTNAMES = new Set(["localhost", "127.0.0.1", "0.0.0.0"]);
 
 export function resolveWebSocketUrl(
@@ -17,10 +19,60 @@ export function resolveWebSocketUrl(
   return `${websocketProtocol}//${currentLocation.hostname}:3002`;
 }
 
-export function buildStartGameMessage(gameType, chipMode) {
+export const WIRE_ENCODINGS = new Set(["json", "msgpack"]);
+
+export function resolveWireEncoding(configuredEncoding = import.meta.env.VITE_WS_ENCODING) {
+  const normalizedEncoding = configuredEncoding?.trim().toLowerCase();
+  return WIRE_ENCODINGS.has(normalizedEncoding) ? normalizedEncoding : "json";
+}
+
+export function buildStartGameMessage(
+  gameType,
+  chipMode,
+  stateProtocol = "delta",
+  encoding = "json",
+  sessionToken = null,
+) {
   return JSON.stringify({
     type: "start-game",
     gameType,
     chipMode,
+    stateProtocol,
+    encoding,
+    ...(sessionToken ? { sessionToken } : {}),
   });
 }
+
+export const SESSION_MESSAGE_TYPE = "session";
+export const SESSION_SUSPENDED_MESSAGE_TYPE = "session-suspended";
+
+export function isSessionMessage(payload) {
+  return payload?.type === SESSION_MESSAGE_TYPE || payload?.type === SESSION_SUSPENDED_MESSAGE_TYPE;
+}
+
+// Resumable matches are remembered per tab, so reloading the page continues the same match.
+export function loadSessionToken(sessionKey, storage = globalThis.sessionStorage) {
+  return storage?.getItem(`poker-ml:session:${sessionKey}`) ?? null;
+}
+
+export function saveSessionToken(sessionKey, sessionToken, storage = globalThis.sessionStorage) {
+  storage?.setItem(`poker-ml:session:${sessionKey}`, sessionToken);
+}
+
+export function buildResyncMessage() {
+  return { type: "resync" };
+}
+
+// The backend answers a msgpack request with binary frames, or with text frames when it cannot encode
+// MessagePack, so each message is decoded by its frame type rather than by the requested encoding.
+export function decodeServerMessage(data) {
+  return typeof data === "string" ? JSON.parse(data) : decodeMessagePack(data);
+}
+
+// Actions are plain strings and requests are objects, the start-game message itself is always JSON.
+export function encodeClientMessage(message, encoding = "json") {
+  if (encoding === "msgpack") {
+    return encodeMessagePack(message);
+  }
+  return typeof message === "string" ? message : JSON.stringify(message);
+}
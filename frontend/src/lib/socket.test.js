@@ -1,6 +1,17 @@
 import { describe, expect, it } from "vitest";
 
-import { buildStartGameMessage, resolveWebSocketUrl } from "./socket";
+import { decodeMessagePack } from "./messagePack";
+import {
+  buildResyncMessage,
+  buildStartGameMessage,
+  decodeServerMessage,
+  encodeClientMessage,
+  isSessionMessage,
+  loadSessionToken,
+  resolveWebSocketUrl,
+  resolveWireEncoding,
+  saveSessionToken,
+} from "./socket";
 
 describe("resolveWebSocketUrl", () => {
   it("prefers an explicit configured websocket url", () => {
@@ -36,7 +47,48 @@ describe("buildStartGameMessage", () => {
     expect(JSON.parse(buildStartGameMessage("Leduc", "reset_each_round"))).toEqual({
         chipMode: "reset_each_round",
         gameType: "Leduc",
+        encoding: "json",
+        stateProtocol: "delta",
         type: "start-game",
       });
   });
 });
+
+describe("wire encoding", () => {
+  it("only accepts the encodings the backend knows", () => {
+    expect(resolveWireEncoding(" MsgPack ")).toBe("msgpack");
+    expect(resolveWireEncoding("xml")).toBe("json");
+    expect(resolveWireEncoding(undefined)).toBe("json");
+  });
+
+  it("decodes text frames as JSON and binary frames as MessagePack", () => {
+    expect(decodeServerMessage('{"seq":1}')).toEqual({ seq: 1 });
+    expect(decodeServerMessage(new Uint8Array([0x81, 0xa3, 0x73, 0x65, 0x71, 0x01]).buffer)).toEqual({ seq: 1 });
+  });
+
+  it("encodes client messages for the negotiated encoding", () => {
+    expect(encodeClientMessage("Call")).toBe("Call");
+    expect(encodeClientMessage(buildResyncMessage())).toBe('{"type":"resync"}');
+    expect(decodeMessagePack(encodeClientMessage(buildResyncMessage(), "msgpack"))).toEqual({ type: "resync" });
+  });
+});
+
+describe("session tokens", () => {
+  it("resumes a remembered match from the start-game message", () => {
+    const storage = new Map();
+    const storageAdapter = {
+      getItem: (key) => storage.get(key) ?? null,
+      setItem: (key, value) => storage.set(key, value),
+    };
+
+    expect(loadSessionToken("Leduc:persistent_match:0", storageAdapter)).toBeNull();
+    saveSessionToken("Leduc:persistent_match:0", "token-0123456789abcdef", storageAdapter);
+    const sessionToken = loadSessionToken("Leduc:persistent_match:0", storageAdapter);
+
+    expect(JSON.parse(buildStartGameMessage("Leduc", "persistent_match", "delta", "json", sessionToken))).toMatchObject({
+      sessionToken: "token-0123456789abcdef",
+    });
+    expect(isSessionMessage({ type: "session", sessionToken })).toBe(true);
+    expect(isSessionMessage({ type: "state-patch" })).toBe(false);
+  });
+});
@@ -0,0 +1,69 @@
+export const STATE_SNAPSHOT_TYPE = "state-snapshot";
+export const STATE_PATCH_TYPE = "state-patch";
+
+function readPath(state, path) {
+  return path.reduce((value, key) => value[key], state);
+}
+
+function cloneValue(value) {
+  return value === null || typeof value !== "object" ? value : structuredClone(value);
+}
+
+// Returns a new state, only the containers along each operation's path are copied.
+export function applyStatePatch(state, operations) {
+  let nextState = state;
+
+  for (const operation of operations) {
+    const path = operation.p;
+    if (path.length === 0) {
+      nextState = operation.v;
+      continue;
+    }
+
+    nextState = Array.isArray(nextState) ? [...nextState] : { ...nextState };
+    let parent = nextState;
+    for (const key of path.slice(0, -1)) {
+      parent[key] = Array.isArray(parent[key]) ? [...parent[key]] : { ...parent[key] };
+      parent = parent[key];
+    }
+
+    const key = path[path.length - 1];
+    if ("a" in operation) {
+      parent[key] = [...parent[key], ...operation.a];
+    } else if ("c" in operation) {
+      parent[key] = cloneValue(readPath(nextState, operation.c));
+    } else if ("d" in operation) {
+      if (Array.isArray(parent)) {
+        parent.splice(key, 1);
+      } else {
+        delete parent[key];
+      }
+    } else {
+      parent[key] = operation.v;
+    }
+  }
+
+  return nextState;
+}
+
+export function isStateStreamMessage(payload) {
+  return payload?.type === STATE_SNAPSHOT_TYPE || payload?.type === STATE_PATCH_TYPE;
+}
+
+// Folds one message of the delta protocol into the current state. `needsResync` is set when a patch does
+// not follow the last message, the state is then left as it was until the next snapshot arrives.
+export function reduceStateMessage(current, payload) {
+  if (payload.type === STATE_SNAPSHOT_TYPE) {
+    return { needsResync: false, seq: payload.seq, state: payload.state };
+  }
+
+  if (current.state === null || payload.seq !== current.seq + 1) {
+    return { ...current, needsResync: true };
+  }
+
+  return {
+    needsResync: false,
+    seq: payload.seq,
+    state: applyStatePatch(current.state, payload.ops),
+  };
+}
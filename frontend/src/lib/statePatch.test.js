@@ -0,0 +1,45 @@
+import { describe, expect, it } from "vitest";
+
+import { applyStatePatch, reduceStateMessage } from "./statePatch";
+
+const baseState = {
+  players: {
+    current_dealer: { chips_won_history: [100], id: 0 },
+    initial_players: [
+      { chips: 1200, chips_won_history: [100], id: 0 },
+      { chips: 1200, chips_won_history: [-100], id: 1 },
+    ],
+  },
+  total_pot: 0,
+  winner_name: null,
+};
+
+describe("applyStatePatch", () => {
+  it("sets, appends and copies values without mutating the previous state", () => {
+    const nextState = applyStatePatch(baseState, [
+      { p: ["players", "initial_players", 1, "chips"], v: 1300 },
+      { p: ["players", "initial_players", 1, "chips_won_history"], a: [100] },
+      { c: ["players", "initial_players", 1], p: ["players", "current_dealer"] },
+      { p: ["winner_name"], v: "AI 1" },
+    ]);
+
+    expect(nextState.players.current_dealer).toEqual({ chips: 1300, chips_won_history: [-100, 100], id: 1 });
+    expect(nextState.winner_name).toBe("AI 1");
+    expect(baseState.players.initial_players[1]).toEqual({ chips: 1200, chips_won_history: [-100], id: 1 });
+    expect(nextState.players.initial_players[0]).toBe(baseState.players.initial_players[0]);
+  });
+});
+
+describe("reduceStateMessage", () => {
+  it("asks for a resync when a patch is missing", () => {
+    const snapshot = reduceStateMessage(
+      { needsResync: false, seq: 0, state: null },
+      { seq: 1, state: baseState, type: "state-snapshot" },
+    );
+    const patched = reduceStateMessage(snapshot, { ops: [{ p: ["total_pot"], v: 200 }], seq: 2, type: "state-patch" });
+    const skipped = reduceStateMessage(patched, { ops: [{ p: ["total_pot"], v: 0 }], seq: 4, type: "state-patch" });
+
+    expect(patched.state.total_pot).toBe(200);
+    expect(skipped).toEqual({ ...patched, needsResync: true });
+  });
+});
@@ -0,0 +1,318 @@
+from __future__ import annotations
+
+import math
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from enum import Enum
+from functools import lru_cache
+from itertools import combinations
+from pathlib import Path
+from typing import Any, Iterable, Optional, Sequence
+
+from treys import Deck
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - depends on the environment
+    np = None
+
+from .equity import calculate_equity
+from .evaluation import get_rank_table
+from .isomorphism import canonicalize
+
+BUCKET_TABLE_MAGIC = b"PMLBUCK\x00"
+BUCKET_TABLE_VERSION = 1
+DEFAULT_BUCKET_TABLE_PATH = Path(__file__).resolve().parent / "models" / "runtime" / "holdem-buckets.bin"
+DEFAULT_NUM_BUCKETS = 10
+# Board cards of each Hold'em street
+STREETS = {"preflop": 0, "flop": 3, "turn": 4, "river": 5}
+# Turn and river have too many classes to precompute here, they are always bucketed on demand
+BUILDABLE_STREETS = ("preflop", "flop")
+# Precision of every bucket's equity, built into the table or computed on demand
+BUCKET_STANDARD_ERROR = 0.01
+# Deals sampled per class when building a table. An equity share is between 0 and 1, so its variance is at most
+# 1/4 and the flop's samples reach BUCKET_STANDARD_ERROR, preflop has few classes so they are ranked more precisely
+DEFAULT_BUILD_SAMPLES = {"preflop": 50_000, "flop": math.ceil(0.25 / BUCKET_STANDARD_ERROR**2)}
+BUCKET_CACHE_SIZE = 65_536
+ON_DEMAND_EXACT_LIMIT = 1_000
+# Deals ranked per numpy step of a build
+_BUILD_BATCH_SIZE = 200_000
+
+# magic, version, number of buckets, number of classes of each street
+_HEADER = struct.Struct("<8sII4Q")
+
+_DECK = tuple(Deck.GetFullDeck())
+_CARD_INDICES = {card: index for index, card in enumerate(_DECK)}
+
+
+class CardAbstraction(str, Enum):
+    # Info sets hold the ranks of the cards, like the Leduc blueprints'
+    RANKS = "ranks"
+    # Hold'em info sets hold the equity bucket of each street instead
+    BUCKETS = "buckets"
+
+
+def resolve_card_abstraction(
+    raw_value: CardAbstraction | str | None,
+    *,
+    default: CardAbstraction = CardAbstraction.RANKS,
+) -> CardAbstraction:
+    if isinstance(raw_value, CardAbstraction):
+        return raw_value
+    if raw_value is None:
+        return default
+
+    normalized_value = raw_value.strip().lower()
+    for card_abstraction in CardAbstraction:
+        if card_abstraction.value == normalized_value:
+            return card_abstraction
+
+    return default
+
+
+def resolve_bucket_table_path(raw_value: Optional[str]) -> Path:
+    if raw_value is None or not raw_value.strip():
+        return DEFAULT_BUCKET_TABLE_PATH
+    return Path(raw_value.strip())
+
+
+def get_class_key(hole: Sequence[int], board: Sequence[int]) -> int:
+    """The same number for every hole cards and board equal up to the order of the cards and a suit relabeling."""
+    canonical_hole, canonical_board = canonicalize([hole, board])
+    return _pack(canonical_hole + canonical_board)
+
+
+def _pack(cards: Sequence[int]) -> int:
+    key = 0
+    for card in cards:
+        key = key * len(_DECK) + _CARD_INDICES[card]
+    return key
+
+
+def get_bucket_for_equity(equity: float, num_buckets: int) -> int:
+    return min(int(equity * num_buckets), num_buckets - 1)
+
+
+class BucketTable:
+    """
+    Read-only table of the equity buckets of Hold'em hands, written by write_bucket_table and opened with mmap.
+
+    The file holds a header, the sorted class keys (uint64) of each street and then their buckets (uint8). A
+    lookup binary searches the keys of its street in place.
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        if sys.byteorder != "little":
+            raise ValueError("Bucket tables are little-endian and can only be read on little-endian hosts.")
+
+        self.path = Path(path)
+        with self.path.open("rb") as file_handle:
+            self._mmap = mmap.mmap(file_handle.fileno(), 0, access=mmap.ACCESS_READ)
+
+        buffer = memoryview(self._mmap)
+        magic, version, self.num_buckets, *street_sizes = _HEADER.unpack_from(buffer)
+        if (
+            magic != BUCKET_TABLE_MAGIC
+            or version != BUCKET_TABLE_VERSION
+            or len(buffer) != _HEADER.size + 9 * sum(street_sizes)
+        ):
+            buffer.release()
+            self._mmap.close()
+            raise ValueError(f"{self.path} is not a version {BUCKET_TABLE_VERSION} bucket table.")
+
+        keys_offset = _HEADER.size
+        buckets_offset = _HEADER.size + 8 * sum(street_sizes)
+        self._streets: dict[int, tuple[memoryview, memoryview]] = {}
+        for board_size, street_size in zip(STREETS.values(), street_sizes):
+            self._streets[board_size] = (
+                buffer[keys_offset : keys_offset + 8 * street_size].cast("Q"),
+                buffer[buckets_offset : buckets_offset + street_size],
+            )
+            keys_offset += 8 * street_size
+            buckets_offset += street_size
+
+    def get(self, key: int, board_size: int) -> Optional[int]:
+        """The bucket of the class `key` on a board of `board_size` cards, None when the table does not hold it."""
+        keys, buckets = self._streets[board_size]
+        index = bisect_left(keys, key)
+        if index < len(keys) and keys[index] == key:
+            return buckets[index]
+        return None
+
+
+def load_bucket_table(path: str | Path) -> Optional[BucketTable]:
+    """The bucket table at `path`, None when it was not built."""
+    if not Path(path).exists():
+        return None
+    return BucketTable(path)
+
+
+@lru_cache(maxsize=None)
+def _load_bucket_table(path: Path) -> BucketTable:
+    return BucketTable(path)
+
+
+def get_bucket_table() -> Optional[BucketTable]:
+    # Only a table that was found is kept, so one built while the server runs is used from the next call on
+    path = resolve_bucket_table_path(os.getenv("POKER_ML_BUCKET_TABLE"))
+    if not path.exists():
+        return None
+    return _load_bucket_table(path)
+
+
+@lru_cache(maxsize=BUCKET_CACHE_SIZE)
+def _get_canonical_bucket(hole: tuple[int, ...], board: tuple[int, ...]) -> int:
+    bucket_table = get_bucket_table()
+    if bucket_table is not None:
+        bucket = bucket_table.get(_pack(hole + board), len(board))
+        if bucket is not None:
+            return bucket
+
+    num_buckets = DEFAULT_NUM_BUCKETS if bucket_table is None else bucket_table.num_buckets
+    result = calculate_equity(
+        [hole],
+        board,
+        random_opponents=1,
+        target_standard_error=BUCKET_STANDARD_ERROR,
+        exact_limit=ON_DEMAND_EXACT_LIMIT,
+        random_seed=0,
+    )
+    return get_bucket_for_equity(result.equity[0], num_buckets)
+
+
+def get_bucket(hole: Sequence[int], board: Sequence[int] = ()) -> int:
+    """
+    Equity bucket of Hold'em `hole` cards on `board`: their equity against one random hand, over the boards
+    completing this one, cut into equal ranges. Classes missing from the bucket table are computed once.
+    """
+    canonical_hole, canonical_board = canonicalize([hole, board])
+    return _get_canonical_bucket(canonical_hole, canonical_board)
+
+
+def get_bucket_path(hole: Sequence[int], board: Sequence[int]) -> tuple[int, ...]:
+    """The bucket of `hole` on each street up to the one of `board`."""
+    return tuple(
+        get_bucket(hole, board[:board_size]) for board_size in STREETS.values() if board_size <= len(board)
+    )
+
+
+def _enumerate_classes(
+    board_size: int, flops: Optional[Iterable[Sequence[int]]]
+) -> dict[int, tuple[tuple[int, ...], tuple[int, ...]]]:
+    if board_size == 0:
+        boards: Iterable[tuple[int, ...]] = [()]
+    else:
+        boards = {canonicalize([flop])[0] for flop in (combinations(_DECK, 3) if flops is None else flops)}
+
+    classes: dict[int, tuple[tuple[int, ...], tuple[int, ...]]] = {}
+    for board in boards:
+        for hole in combinations([card for card in _DECK if card not in board], 2):
+            canonical_hole, canonical_board = canonicalize([hole, board])
+            classes.setdefault(_pack(canonical_hole + canonical_board), (canonical_hole, canonical_board))
+    return classes
+
+
+def _estimate_equities(rank_table: Any, generator: Any, holes: Any, boards: Any, samples: int) -> Any:
+    """Equity of each row of `holes` on the same row of `boards` against a random hand, from `samples` deals."""
+    num_classes, board_size = boards.shape
+    known_cards = np.concatenate((holes, boards), axis=1)
+    is_unknown = np.ones((num_classes, len(_DECK)), dtype=bool)
+    is_unknown[np.arange(num_classes)[:, None], _CARD_INDEX_ARRAY[(known_cards >> 8) & 0xFF]] = False
+    deals = np.repeat(_DECK_ARRAY[np.nonzero(is_unknown)[1]].reshape(num_classes, -1), samples, axis=0)
+
+    # A partial Fisher-Yates shuffle of each row puts the opponent's cards and the rest of the board first
+    num_drawn = 2 + STREETS["river"] - board_size
+    rows = np.arange(len(deals))
+    for position in range(num_drawn):
+        swaps = generator.integers(position, deals.shape[1], len(deals))
+        drawn_cards = deals[rows, swaps]
+        deals[rows, swaps] = deals[:, position]
+        deals[:, position] = drawn_cards
+
+    full_boards = np.concatenate((np.repeat(boards, samples, axis=0), deals[:, 2:num_drawn]), axis=1)
+    ranks = rank_table.evaluate_batch(np.concatenate((np.repeat(holes, samples, axis=0), full_boards), axis=1))
+    opponent_ranks = rank_table.evaluate_batch(np.concatenate((deals[:, :2], full_boards), axis=1))
+    shares = (ranks < opponent_ranks) + 0.5 * (ranks == opponent_ranks)
+    return shares.reshape(num_classes, samples).mean(axis=1)
+
+
+def build_bucket_tables(
+    *,
+    num_buckets: int = DEFAULT_NUM_BUCKETS,
+    streets: Sequence[str] = BUILDABLE_STREETS,
+    samples: Optional[int] = None,
+    flops: Optional[Iterable[Sequence[int]]] = None,
+    random_seed: int = 0,
+) -> dict[int, tuple[array, array]]:
+    """
+    The sorted class keys and buckets of each street of `streets`, by board size. Equities are estimated from
+    `samples` deals per class, or DEFAULT_BUILD_SAMPLES, and the flop only covers `flops` when given.
+    """
+    rank_table = get_rank_table()
+    if np is None or rank_table is None:
+        raise RuntimeError("Building bucket tables needs numpy and the rank table, see game_engine.build_rank_table.")
+    if not set(streets) <= set(BUILDABLE_STREETS):
+        raise ValueError(f"Only the {', '.join(BUILDABLE_STREETS)} buckets can be built.")
+
+    generator = np.random.default_rng(random_seed)
+    tables: dict[int, tuple[array, array]] = {}
+    for street in streets:
+        board_size = STREETS[street]
+        street_samples = DEFAULT_BUILD_SAMPLES[street] if samples is None else samples
+        classes = _enumerate_classes(board_size, flops)
+        keys = sorted(classes)
+        buckets = array("B")
+        batch_classes = max(1, _BUILD_BATCH_SIZE // street_samples)
+        for start in range(0, len(keys), batch_classes):
+            batch = [classes[key] for key in keys[start : start + batch_classes]]
+            holes = np.array([hole for hole, _ in batch], dtype=np.int32)
+            boards = np.array([board for _, board in batch], dtype=np.int32).reshape(len(batch), board_size)
+            equities = _estimate_equities(rank_table, generator, holes, boards, street_samples)
+            buckets.extend(get_bucket_for_equity(equity, num_buckets) for equity in equities.tolist())
+        tables[board_size] = (array("Q", keys), buckets)
+    return tables
+
+
+def write_bucket_table(
+    path: str | Path = DEFAULT_BUCKET_TABLE_PATH,
+    *,
+    num_buckets: int = DEFAULT_NUM_BUCKETS,
+    streets: Sequence[str] = BUILDABLE_STREETS,
+    samples: Optional[int] = None,
+    flops: Optional[Iterable[Sequence[int]]] = None,
+    random_seed: int = 0,
+) -> Path:
+    if sys.byteorder != "little":
+        raise ValueError("Bucket tables are little-endian and can only be written on little-endian hosts.")
+
+    tables = build_bucket_tables(
+        num_buckets=num_buckets, streets=streets, samples=samples, flops=flops, random_seed=random_seed
+    )
+    street_tables = [tables.get(board_size, (array("Q"), array("B"))) for board_size in STREETS.values()]
+
+    output_path = Path(path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with output_path.open("wb") as file_handle:
+        file_handle.write(
+            _HEADER.pack(
+                BUCKET_TABLE_MAGIC, BUCKET_TABLE_VERSION, num_buckets, *(len(keys) for keys, _ in street_tables)
+            )
+        )
+        for keys, _ in street_tables:
+            file_handle.write(keys.tobytes())
+        for _, buckets in street_tables:
+            file_handle.write(buckets.tobytes())
+
+    return output_path
+
+
+if np is not None:
+    _DECK_ARRAY = np.array(_DECK, dtype=np.int32)
+    # Deck positions by bits 8 to 15 of a treys card, its rank and suit
+    _CARD_INDEX_ARRAY = np.zeros(1 << 8, dtype=np.int64)
+    for _card, _card_index in _CARD_INDICES.items():
+        _CARD_INDEX_ARRAY[(_card >> 8) & 0xFF] = _card_index
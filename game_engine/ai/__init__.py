@@ -1,3 +1,13 @@
+from .blueprint_store import BlueprintStore, convert_pickle_blueprint, load_blueprint, write_blueprint
 from .policy import NashBlueprintPolicy
+from .registry import ModelRegistry, get_default_registry
 
-__all__ = ["NashBlueprintPolicy"]
+__all__ = [
+    "BlueprintStore",
+    "ModelRegistry",
+    "NashBlueprintPolicy",
+    "convert_pickle_blueprint",
+    "get_default_registry",
+    "load_blueprint",
+    "write_blueprint",
+]
@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import mmap
+import pickle
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+from typing import Any, Iterator, Mapping, Optional, Sequence
+
+BLUEPRINT_MAGIC = b"PMLBLUE\x00"
+BLUEPRINT_VERSION = 1
+BLUEPRINT_SUFFIX = ".blueprint"
+
+# magic, version, number of info sets, number of actions over all info sets, size of the keys blob
+_HEADER = struct.Struct("<8sIIQQ")
+
+
+class _SortedKeys(Sequence[bytes]):
+    """The info set keys of a store as a sequence of bytes, so bisect can search them in place."""
+
+    def __init__(self, keys_blob: memoryview, key_offsets: memoryview) -> None:
+        self._keys_blob = keys_blob
+        self._key_offsets = key_offsets
+
+    def __len__(self) -> int:
+        return len(self._key_offsets) - 1
+
+    def __getitem__(self, index: int) -> bytes:  # type: ignore[override]
+        return bytes(self._keys_blob[self._key_offsets[index] : self._key_offsets[index + 1]])
+
+
+class BlueprintStore(Mapping[str, tuple[list[int], list[float]]]):
+    """
+    Read-only view over a binary blueprint file, opened with mmap.
+
+    The file holds a header, the probabilities (float64) and action codes (int32) of every info set back to
+    back, the offsets of each info set's actions and keys, and the sorted UTF-8 info set keys. Lookups binary
+    search the keys in place, so opening a store deserializes nothing and every process that opens the same
+    file shares its pages. Values have the `(actions, probabilities)` shape of the pickled blueprint dicts.
+    `close` unmaps the file, a store is also a context manager that closes it on exit.
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        if sys.byteorder != "little":
+            raise ValueError("Binary blueprints are little-endian and can only be read on little-endian hosts.")
+
+        self.path = Path(path)
+        with self.path.open("rb") as file_handle:
+            self._mmap = mmap.mmap(file_handle.fileno(), 0, access=mmap.ACCESS_READ)
+
+        buffer = self._buffer = memoryview(self._mmap)
+        magic, version, num_info_sets, num_actions, keys_size = _HEADER.unpack_from(buffer)
+        if magic != BLUEPRINT_MAGIC or version != BLUEPRINT_VERSION:
+            self.close()
+            raise ValueError(f"{self.path} is not a version {BLUEPRINT_VERSION} binary blueprint.")
+
+        offset = _HEADER.size
+        self._probabilities = buffer[offset : offset + 8 * num_actions].cast("d")
+        offset += 8 * num_actions
+        self._actions = buffer[offset : offset + 4 * num_actions].cast("i")
+        offset += 4 * num_actions
+        self._action_offsets = buffer[offset : offset + 4 * (num_info_sets + 1)].cast("I")
+        offset += 4 * (num_info_sets + 1)
+        key_offsets = buffer[offset : offset + 8 * (num_info_sets + 1)].cast("Q")
+        offset += 8 * (num_info_sets + 1)
+        self._keys = _SortedKeys(buffer[offset : offset + keys_size], key_offsets)
+
+    def close(self) -> None:
+        """Unmaps the file. Views over the mapping are released first, since mmap can't close while they exist."""
+        keys = getattr(self, "_keys", None)
+        views = [getattr(self, name, None) for name in ("_probabilities", "_actions", "_action_offsets")]
+        if keys is not None:
+            views += [keys._keys_blob, keys._key_offsets]
+        for view in views + [self._buffer]:
+            if view is not None:
+                view.release()
+        self._mmap.close()
+
+    def __enter__(self) -> BlueprintStore:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def _find(self, infoset: str) -> Optional[int]:
+        encoded_infoset = infoset.encode("utf-8")
+        index = bisect_left(self._keys, encoded_infoset)
+        if index < len(self._keys) and self._keys[index] == encoded_infoset:
+            return index
+        return None
+
+    def __getitem__(self, infoset: str) -> tuple[list[int], list[float]]:
+        index = self._find(infoset)
+        if index is None:
+            raise KeyError(infoset)
+
+        start, end = self._action_offsets[index], self._action_offsets[index + 1]
+        return self._actions[start:end].tolist(), self._probabilities[start:end].tolist()
+
+    def __contains__(self, infoset: object) -> bool:
+        return isinstance(infoset, str) and self._find(infoset) is not None
+
+    def __iter__(self) -> Iterator[str]:
+        for index in range(len(self._keys)):
+            yield self._keys[index].decode("utf-8")
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+
+def write_blueprint(model: Mapping[str, tuple[Sequence[int], Sequence[float]]], path: str | Path) -> Path:
+    """Writes a blueprint dict in the pickle format produced by mod_leduc.py as a binary blueprint."""
+    if sys.byteorder != "little":
+        raise ValueError("Binary blueprints are little-endian and can only be written on little-endian hosts.")
+
+    encoded_keys = sorted((infoset.encode("utf-8"), infoset) for infoset in model)
+
+    probabilities = array("d")
+    actions = array("i")
+    action_offsets = array("I", [0])
+    key_offsets = array("Q", [0])
+    keys_blob = bytearray()
+    for encoded_infoset, infoset in encoded_keys:
+        infoset_actions, infoset_probabilities = model[infoset]
+        if len(infoset_actions) != len(infoset_probabilities):
+            raise ValueError(f"Info set {infoset!r} has {len(infoset_actions)} actions but {len(infoset_probabilities)} probabilities.")
+        actions.extend(int(action) for action in infoset_actions)
+        probabilities.extend(float(probability) for probability in infoset_probabilities)
+        action_offsets.append(len(actions))
+        keys_blob += encoded_infoset
+        key_offsets.append(len(keys_blob))
+
+    output_path = Path(path)
+    with output_path.open("wb") as file_handle:
+        file_handle.write(_HEADER.pack(BLUEPRINT_MAGIC, BLUEPRINT_VERSION, len(encoded_keys), len(actions), len(keys_blob)))
+        for values in (probabilities, actions, action_offsets, key_offsets):
+            file_handle.write(values.tobytes())
+        file_handle.write(keys_blob)
+
+    return output_path
+
+
+def is_binary_blueprint(path: str | Path) -> bool:
+    with Path(path).open("rb") as file_handle:
+        return file_handle.read(len(BLUEPRINT_MAGIC)) == BLUEPRINT_MAGIC
+
+
+def load_blueprint(path: str | Path) -> Mapping[str, Any]:
+    """Opens a binary blueprint with mmap, or unpickles a blueprint dict produced by mod_leduc.py."""
+    if is_binary_blueprint(path):
+        return BlueprintStore(path)
+
+    with Path(path).open("rb") as file_handle:
+        return pickle.load(file_handle)
+
+
+def convert_pickle_blueprint(pickle_path: str | Path, output_path: str | Path | None = None) -> Path:
+    pickle_path = Path(pickle_path)
+    with pickle_path.open("rb") as file_handle:
+        model = pickle.load(file_handle)
+
+    return write_blueprint(model, output_path or pickle_path.with_suffix(BLUEPRINT_SUFFIX))
@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+from typing import Optional, Sequence
+
+from .blueprint_store import BLUEPRINT_SUFFIX, convert_pickle_blueprint
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Convert pickled blueprints produced by mod_leduc.py to the binary blueprint format.")
+    parser.add_argument("pickle_paths", nargs="+", type=Path, help="Blueprint .pkl files to convert.")
+    parser.add_argument(
+        "--output",
+        type=Path,
+        default=None,
+        help=f"Output path, only valid with a single input. Defaults to the input path with the {BLUEPRINT_SUFFIX} suffix.",
+    )
+    return parser
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.output is not None and len(args.pickle_paths) > 1:
+        parser.error("--output can only be used with a single input file.")
+
+    for pickle_path in args.pickle_paths:
+        output_path = convert_pickle_blueprint(pickle_path, args.output)
+        print(f"{pickle_path} -> {output_path}")
+
+
+if __name__ == "__main__":
+    main()
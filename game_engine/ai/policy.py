@@ -1,49 +1,40 @@
 from __future__ import annotations
 
-import pickle
 from pathlib import Path
 from random import Random
-from typing import Any
+from typing import Any, Mapping, Sequence
 
+from .registry import ModelRegistry, get_default_registry
+from .sampling import BlueprintSampler, action_from_code
 
-def action_from_code(action_code: int, selected_action_index: int, last_action: str) -> str:
-    if last_action.isdigit():
-        action_map = {0: "f", 1: "c"}
-    else:
-        action_map = {0: "k"}
-
-    if selected_action_index in action_map:
-        return action_map[selected_action_index]
-
-    return f"r{action_code}00"
+__all__ = ["NashBlueprintPolicy", "action_from_code"]
 
 
 class NashBlueprintPolicy:
-    def __init__(self, *, model_path: str | Path, rng: Random):
+    """
+    Per-session policy handle, the blueprint and its sampling tables are shared through a ModelRegistry.
+    The handle keeps the sampler it got on first use until the registry drops a model.
+    """
+
+    def __init__(self, *, model_path: str | Path, rng: Random, registry: ModelRegistry | None = None):
         self.model_path = Path(model_path)
         self.rng = rng
-        self._model: dict[str, Any] | None = None
+        self.registry = get_default_registry() if registry is None else registry
+        self._sampler: BlueprintSampler | None = None
+        self._sampler_generation = -1
 
-    def _load_model(self) -> dict[str, Any]:
-        if self._model is None:
-            with self.model_path.open("rb") as file_handle:
-                self._model = pickle.load(file_handle)
+    def _load_model(self) -> Mapping[str, Any]:
+        return self._get_sampler().model
 
-        return self._model
+    def _get_sampler(self) -> BlueprintSampler:
+        if self._sampler is None or self._sampler_generation != self.registry.generation:
+            self._sampler_generation = self.registry.generation
+            self._sampler = self.registry.get_sampler(self.model_path)
+        return self._sampler
 
     def decide_next_action(self, infoset: str) -> str:
-        action_data = self._load_model().get(infoset)
-        if action_data is None:
-            return "c"
-
-        actions, probabilities = action_data
-        selected_action_code = self.rng.choices(actions, weights=probabilities, k=1)[0]
-
-        selected_action_index = actions.index(selected_action_code)
-        split_result = infoset.split(":|")
-        if split_result and split_result[0]:
-            last_action = split_result[0][-1]
-        else:
-            last_action = "y"
+        return self._get_sampler().decide(infoset, self.rng)
 
-        return action_from_code(selected_action_code, selected_action_index, last_action)
+    def decide_many(self, infosets: Sequence[str], rngs: Sequence[Random]) -> list[str]:
+        """Decides for many tables at once, the i-th info set is sampled with the i-th RNG."""
+        return self._get_sampler().decide_many(infosets, rngs)
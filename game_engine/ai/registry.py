@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Mapping, Optional
+
+from .blueprint_store import load_blueprint
+from .sampling import BlueprintSampler
+
+DEFAULT_MAX_MODELS = 4
+
+ModelLoader = Callable[[Path], Mapping[str, Any]]
+
+
+class ModelRegistry:
+    """
+    Process-wide cache of loaded blueprints, so every session playing with the same model shares one copy.
+
+    Entries are keyed by resolved path and remember the file's mtime, a model whose file changed on disk is
+    loaded again on its next use. Each entry also holds the model's BlueprintSampler, so the sampling tables are
+    shared too. At most `max_models` blueprints are kept, the least recently used is evicted. A model that is
+    dropped, by eviction, a change on disk or reload, is closed if it has a `close` method, like BlueprintStore.
+    """
+
+    def __init__(self, max_models: int = DEFAULT_MAX_MODELS, loader: ModelLoader = load_blueprint) -> None:
+        if max_models < 1:
+            raise ValueError("max_models must be at least 1.")
+
+        self.max_models = max_models
+        self._loader = loader
+        self._models: OrderedDict[Path, tuple[int, Mapping[str, Any], BlueprintSampler]] = OrderedDict()
+        self._lock = threading.Lock()
+        # Bumped whenever a model is dropped, so policy handles know to fetch their model again
+        self.generation = 0
+
+    def get_model(self, model_path: str | Path) -> Mapping[str, Any]:
+        return self._get_entry(model_path)[1]
+
+    def get_sampler(self, model_path: str | Path) -> BlueprintSampler:
+        return self._get_entry(model_path)[2]
+
+    def _get_entry(self, model_path: str | Path) -> tuple[int, Mapping[str, Any], BlueprintSampler]:
+        resolved_path = Path(model_path).expanduser().resolve()
+        mtime_ns = resolved_path.stat().st_mtime_ns
+
+        with self._lock:
+            entry = self._models.get(resolved_path)
+            if entry is not None and entry[0] == mtime_ns:
+                self._models.move_to_end(resolved_path)
+                return entry
+
+            model = self._loader(resolved_path)
+            if entry is not None:
+                self._drop(entry)
+            entry = self._models[resolved_path] = (mtime_ns, model, BlueprintSampler(model))
+            self._models.move_to_end(resolved_path)
+            while len(self._models) > self.max_models:
+                self._drop(self._models.popitem(last=False)[1])
+            return entry
+
+    def reload(self, model_path: str | Path | None = None) -> None:
+        """Forgets one model, or every model, so the next use loads it from disk again."""
+        with self._lock:
+            self.generation += 1
+            if model_path is None:
+                entries = list(self._models.values())
+                self._models.clear()
+            else:
+                entry = self._models.pop(Path(model_path).expanduser().resolve(), None)
+                entries = [] if entry is None else [entry]
+            for entry in entries:
+                self._drop(entry)
+
+    def _drop(self, entry: tuple[int, Mapping[str, Any], BlueprintSampler]) -> None:
+        # Handles still holding the sampler fetch the model again on their next decision instead of reading it
+        self.generation += 1
+        close = getattr(entry[1], "close", None)
+        if close is not None:
+            close()
+
+    def __contains__(self, model_path: object) -> bool:
+        if not isinstance(model_path, (str, Path)):
+            return False
+        return Path(model_path).expanduser().resolve() in self._models
+
+    def __len__(self) -> int:
+        return len(self._models)
+
+
+_default_registry: Optional[ModelRegistry] = None
+
+
+def get_default_registry() -> ModelRegistry:
+    global _default_registry
+    if _default_registry is None:
+        _default_registry = ModelRegistry()
+    return _default_registry
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+from bisect import bisect
+from itertools import accumulate
+from math import isfinite
+from random import Random
+from typing import Any, Mapping, Optional, Sequence
+
+# Returned when the blueprint has no entry for an info set
+DEFAULT_ACTION = "c"
+
+
+def action_from_code(action_code: int, selected_action_index: int, last_action: str) -> str:
+    if last_action.isdigit():
+        action_map = {0: "f", 1: "c"}
+    else:
+        action_map = {0: "k"}
+
+    if selected_action_index in action_map:
+        return action_map[selected_action_index]
+
+    return f"r{action_code}00"
+
+
+class SamplingEntry:
+    """The cumulative weights of one info set and the action string each of its outcomes maps to."""
+
+    __slots__ = ("cum_weights", "total", "hi", "outcomes")
+
+    def __init__(self, infoset: str, actions: Sequence[int], probabilities: Sequence[float]) -> None:
+        self.cum_weights = list(accumulate(probabilities))
+        self.total = self.cum_weights[-1] + 0.0 if self.cum_weights else 0.0
+        self.hi = len(self.cum_weights) - 1
+
+        history = infoset.split(":|")[0]
+        last_action = history[-1] if history else "y"
+        self.outcomes = [action_from_code(action_code, index, last_action) for index, action_code in enumerate(actions)]
+
+    def sample(self, rng: Random) -> str:
+        # Same draw and search as rng.choices(actions, weights=probabilities, k=1), so seeded runs don't change
+        if self.total <= 0.0:
+            raise ValueError("Total of weights must be greater than zero")
+        if not isfinite(self.total):
+            raise ValueError("Total of weights must be finite")
+        return self.outcomes[bisect(self.cum_weights, rng.random() * self.total, 0, self.hi)]
+
+
+class BlueprintSampler:
+    """
+    Samples actions from a blueprint with cumulative weight tables instead of rebuilding them on every turn.
+
+    The table of an info set is built the first time it is played and kept for the life of the sampler,
+    which the ModelRegistry shares between every session using the model. Walker alias tables would be O(1)
+    per draw, but they consume the RNG differently, and seeded games must keep making the same decisions.
+    """
+
+    def __init__(self, model: Mapping[str, Any]) -> None:
+        self.model = model
+        self._entries: dict[str, SamplingEntry] = {}
+
+    def get_entry(self, infoset: str) -> Optional[SamplingEntry]:
+        entry = self._entries.get(infoset)
+        if entry is None:
+            # Misses are not cached, since any string can be asked for
+            action_data = self.model.get(infoset)
+            if action_data is None:
+                return None
+            entry = self._entries[infoset] = SamplingEntry(infoset, *action_data)
+        return entry
+
+    def decide(self, infoset: str, rng: Random) -> str:
+        entry = self.get_entry(infoset)
+        if entry is None:
+            return DEFAULT_ACTION
+        return entry.sample(rng)
+
+    def decide_many(self, infosets: Sequence[str], rngs: Sequence[Random]) -> list[str]:
+        """Decides for many tables at once, the i-th info set is sampled with the i-th RNG."""
+        if len(infosets) != len(rngs):
+            raise ValueError("decide_many needs one RNG per info set.")
+        return [self.decide(infoset, rng) for infoset, rng in zip(infosets, rngs)]
@@ -0,0 +1,273 @@
+from __future__ import annotations
+
+import asyncio
+import math
+import random
+from contextlib import suppress
+from dataclasses import dataclass, replace
+from typing import Any, Optional
+
+import websockets
+
+from .blind_structure import BlindStructure
+from .common_types import ChipMode
+from .config import GameConfig, build_session_config
+from .game import Game, Round
+from .pacing import PacingMode, build_pacing
+from .player import Player
+from .protocol import BotSessionRequest
+from .random_control import resolve_random_seed
+from .serialization import decode, encode
+from .simulator import SimulationSummary, build_hand_result
+
+# The bot plays the first seat of every table, the dealer button still moves between the seats every hand
+BOT_SEAT = 0
+
+
+@dataclass(frozen=True)
+class LegalActions:
+    """
+    What the player to act may do, in the action strings of the info sets.
+
+    Raises are written `r<N>` like the blueprint's, putting `N - min_turn_value_to_continue` chips in, and are
+    legal for `min_raise <= N <= max_raise` when the player can raise at all.
+    """
+
+    actions: tuple[str, ...]
+    min_raise: Optional[int] = None
+    max_raise: Optional[int] = None
+
+    def to_message(self) -> dict[str, Any]:
+        message: dict[str, Any] = {"a": list(self.actions)}
+        if self.min_raise is not None:
+            message["r"] = [self.min_raise, self.max_raise]
+        return message
+
+    def is_legal(self, action: Any) -> bool:
+        if not isinstance(action, str):
+            return False
+        if action in self.actions:
+            return True
+        if self.min_raise is None or not action.startswith("r") or not action[1:].isdigit():
+            return False
+        return self.min_raise <= int(action[1:]) <= self.max_raise
+
+    def get_default(self) -> str:
+        return "f" if "f" in self.actions else "k"
+
+
+def get_legal_actions(player: Player, min_turn_value_to_continue: int, min_bet: int) -> LegalActions:
+    if min_turn_value_to_continue == 0:
+        actions: tuple[str, ...] = ("k",)
+    else:
+        # A short stack calls all in for less, as play_ai_turn plays it
+        actions = ("f", "c")
+
+    # The same bounds receive_human_action puts on a human's bet
+    lowest_bet = max(
+        min(2 * min_turn_value_to_continue, player.chips),
+        min(min_bet, player.chips),
+        min_turn_value_to_continue + 1,
+    )
+    if lowest_bet > player.chips:
+        return LegalActions(actions)
+    return LegalActions(
+        actions,
+        lowest_bet + min_turn_value_to_continue,
+        player.chips + min_turn_value_to_continue,
+    )
+
+
+class BotConnection:
+    """
+    The websocket of a bot session, shared by all its tables.
+
+    Every frame sent holds a list of messages: what all the tables had to say since the previous frame. Each
+    decision request carries an id and the bot answers with `{"id": id, "a": action}`, or a list of such replies,
+    in any order. Tables wait for their own replies only, so a bot keeps as many decisions in flight as the
+    session has tables, and can answer all of a frame's requests in one frame.
+    """
+
+    def __init__(self, websocket, encoding: str) -> None:
+        self.websocket = websocket
+        self.encoding = encoding
+        self.illegal_actions = 0
+        self._next_id = 0
+        self._pending: dict[int, asyncio.Future] = {}
+        self._outbox: list[dict[str, Any]] = []
+        self._writer: Optional[asyncio.Task] = None
+
+    def send(self, message: dict[str, Any]) -> None:
+        self._outbox.append(message)
+        if self._writer is None:
+            # Runs after the tables woken up with this one, so their messages share the frame
+            self._writer = asyncio.ensure_future(self._write())
+
+    async def _write(self) -> None:
+        try:
+            with suppress(websockets.exceptions.ConnectionClosed):
+                while self._outbox:
+                    messages, self._outbox = self._outbox, []
+                    await self.websocket.send(encode(messages, self.encoding))
+        finally:
+            self._outbox = []
+            self._writer = None
+
+    async def flush(self) -> None:
+        if self._writer is not None:
+            await self._writer
+
+    async def request_action(self, table_index: int, info_set: str, legal_actions: LegalActions) -> str:
+        decision_id = self._next_id
+        self._next_id += 1
+        future = asyncio.get_running_loop().create_future()
+        self._pending[decision_id] = future
+        self.send({"t": "d", "id": decision_id, "g": table_index, "i": info_set, **legal_actions.to_message()})
+
+        action = await future
+        if legal_actions.is_legal(action):
+            return action
+        self.illegal_actions += 1
+        return legal_actions.get_default()
+
+    async def read_replies(self) -> None:
+        """Resolves pending decisions until the bot disconnects."""
+        with suppress(websockets.exceptions.ConnectionClosed):
+            async for message in self.websocket:
+                try:
+                    payload = decode(message)
+                except (TypeError, ValueError):
+                    continue
+
+                for reply in payload if isinstance(payload, list) else [payload]:
+                    future = self._pending.pop(reply.get("id"), None) if isinstance(reply, dict) else None
+                    if future is not None and not future.done():
+                        future.set_result(reply.get("a"))
+
+
+class RemoteBotPolicy:
+    """Seat policy forwarding each decision of its player to a BotConnection."""
+
+    def __init__(self, connection: BotConnection, player: Player, table_index: int) -> None:
+        self.connection = connection
+        self.player = player
+        self.table_index = table_index
+
+    async def decide_next_action(self, infoset: str) -> str:
+        game = self.player.game
+        legal_actions = get_legal_actions(self.player, game.min_turn_value_to_continue, game.min_bet)
+        return await self.connection.request_action(self.table_index, infoset, legal_actions)
+
+
+def build_bot_table_config(base_config: GameConfig, random_seed: int, num_hands: int) -> GameConfig:
+    """The bot against one blueprint seat for `num_hands` hands, stacks reset every hand and no waiting."""
+    table_config = build_session_config(
+        base_config,
+        ChipMode.RESET_EACH_ROUND,
+        num_ai_players=2,
+        num_human_players=0,
+        random_seed=random_seed,
+        pacing=build_pacing(PacingMode.INSTANT),
+    )
+    return replace(table_config, max_rounds=num_hands)
+
+
+async def play_bot_table(
+    connection: BotConnection,
+    table_index: int,
+    game_type: str,
+    config: GameConfig,
+    summary: SimulationSummary,
+) -> SimulationSummary:
+    game = Game(None, game_type, config)
+    bot_player = game.players.get_players("all")[BOT_SEAT]
+    bot_player.policy = RemoteBotPolicy(connection, bot_player, table_index)
+
+    while not game.is_finished():
+        dealer = game.get_current_dealer().id
+        small_blind, big_blind = game.get_blinds()
+        round_instance = Round(game, small_blind, big_blind)
+        await round_instance.start()
+        hand_result = build_hand_result(game, round_instance, dealer)
+        summary = summary.add(hand_result.chip_deltas)
+
+        # The other seats' cards are only shown when they reached the showdown
+        opponent_cards = [
+            cards for seat, cards in enumerate(hand_result.cards) if seat != BOT_SEAT and hand_result.is_showdown
+        ]
+        connection.send(
+            {
+                "t": "r",
+                "g": table_index,
+                "n": hand_result.hand,
+                "h": hand_result.history,
+                "b": hand_result.board,
+                "o": opponent_cards,
+                "c": hand_result.chip_deltas[BOT_SEAT],
+            }
+        )
+        game.finish_round()
+
+    return summary
+
+
+async def serve_bot_session(websocket, request: BotSessionRequest, base_config: GameConfig) -> None:
+    """
+    Plays `request.hands` hands of the bot against the blueprint, spread over `request.tables` tables played at
+    the same time, then sends the session's summary.
+
+    No game state is sent. The bot gets a decision request on each of its turns and the result of each hand.
+    Table i is seeded with `seed + i`, so a session with a fixed seed deals the same cards every time.
+    """
+    connection = BotConnection(websocket, request.encoding)
+    base_seed = resolve_random_seed(request.random_seed)
+    if base_seed is None:
+        base_seed = random.SystemRandom().randrange(2**32)
+
+    big_blind = BlindStructure(request.game_type == "Leduc").get_blinds()[1]
+    empty_summary = SimulationSummary.empty(2, big_blind)
+    hands_per_table, extra_hands = divmod(request.hands, request.tables)
+    tables = asyncio.gather(
+        *(
+            play_bot_table(
+                connection,
+                table_index,
+                request.game_type,
+                build_bot_table_config(
+                    base_config,
+                    base_seed + table_index,
+                    hands_per_table + (table_index < extra_hands),
+                ),
+                empty_summary,
+            )
+            for table_index in range(request.tables)
+        )
+    )
+    reader = asyncio.ensure_future(connection.read_replies())
+    try:
+        await asyncio.wait({tables, reader}, return_when=asyncio.FIRST_COMPLETED)
+        if not tables.done():
+            # The bot left in the middle of the session
+            return
+
+        summary = empty_summary
+        for table_summary in tables.result():
+            summary = summary.merge(table_summary)
+        standard_error = summary.get_standard_error(BOT_SEAT)
+        connection.send(
+            {
+                "t": "s",
+                "hands": summary.hands,
+                "chips": summary.chip_totals[BOT_SEAT],
+                "mbbPerHand": summary.get_mbb_per_hand(BOT_SEAT),
+                "standardError": 1000 * standard_error / big_blind if math.isfinite(standard_error) else None,
+                "illegalActions": connection.illegal_actions,
+                "seed": base_seed,
+            }
+        )
+        await connection.flush()
+    finally:
+        tables.cancel()
+        reader.cancel()
+        with suppress(asyncio.CancelledError, websockets.exceptions.ConnectionClosed):
+            await tables
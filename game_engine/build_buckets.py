@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+from typing import Optional, Sequence
+
+from .abstraction import (
+    BUILDABLE_STREETS,
+    DEFAULT_BUCKET_TABLE_PATH,
+    DEFAULT_NUM_BUCKETS,
+    write_bucket_table,
+)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Build the Hold'em equity bucket table. Needs numpy and the rank table from build_rank_table."
+    )
+    parser.add_argument(
+        "--output",
+        type=Path,
+        default=DEFAULT_BUCKET_TABLE_PATH,
+        help="Output path, the server reads POKER_ML_BUCKET_TABLE or this default.",
+    )
+    parser.add_argument("--buckets", type=int, default=DEFAULT_NUM_BUCKETS, help="Equity buckets per street.")
+    parser.add_argument(
+        "--streets",
+        nargs="+",
+        default=list(BUILDABLE_STREETS),
+        choices=BUILDABLE_STREETS,
+        help="Streets to precompute, the others are bucketed on demand.",
+    )
+    parser.add_argument(
+        "--samples",
+        type=int,
+        default=None,
+        help="Deals sampled per hand class, defaults to 50000 preflop and 2500 on the flop.",
+    )
+    parser.add_argument("--random-seed", type=int, default=0)
+    return parser
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    args = build_parser().parse_args(argv)
+    if args.buckets < 1 or args.buckets > 256:
+        build_parser().error("--buckets must be between 1 and 256.")
+
+    output_path = write_bucket_table(
+        args.output,
+        num_buckets=args.buckets,
+        streets=args.streets,
+        samples=args.samples,
+        random_seed=args.random_seed,
+    )
+    print(output_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+from typing import Optional, Sequence
+
+from .rank_table import DEFAULT_RANK_TABLE_PATH, write_rank_table
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Build the 7-card Texas Hold'em rank table used at showdowns.")
+    parser.add_argument(
+        "--output",
+        type=Path,
+        default=DEFAULT_RANK_TABLE_PATH,
+        help="Output path, the server reads POKER_ML_RANK_TABLE or this default.",
+    )
+    return parser
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    args = build_parser().parse_args(argv)
+    print(write_rank_table(args.output))
+
+
+if __name__ == "__main__":
+    main()
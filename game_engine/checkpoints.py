@@ -0,0 +1,261 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import secrets
+import tempfile
+from contextlib import suppress
+from pathlib import Path
+from typing import Any, Optional
+
+from .common_types import serialize_enum
+from .player import PlayerTurnState
+from .protocol import is_session_token
+
+CHECKPOINT_VERSION = 1
+DEFAULT_DRAIN_TIMEOUT = 30.0
+# "Service restart", sent to the clients of the sessions suspended by a drain
+SERVICE_RESTART_CLOSE_CODE = 1012
+# "Try again later", sent to a client resuming a session whose game did not stop in time
+SESSION_BUSY_CLOSE_CODE = 1013
+
+
+def new_session_token() -> str:
+    return secrets.token_urlsafe(18)
+
+
+def capture_checkpoint(game: Any) -> dict[str, Any]:
+    """Everything a game carries from one round to the next, taken between rounds."""
+    rng_version, rng_internal_state, rng_gauss_next = game.rng.getstate()
+    return {
+        "version": CHECKPOINT_VERSION,
+        "game_type": game.game_type,
+        "chip_mode": game.chip_mode.value,
+        "random_seed": game.random_seed,
+        "rng_state": [rng_version, list(rng_internal_state), rng_gauss_next],
+        "round_num": game.round_num,
+        "blind_level": game._blind_structure.current_level,
+        "dealer_id": game.get_current_dealer().id,
+        "game_over": game.is_game_over,
+        "winner_name": game.winner_name,
+        "players": [
+            {
+                "id": player.id,
+                "is_human": not player.is_robot,
+                "chips": player.chips,
+                "round_start_chips": player.round_start_chips,
+                "round_end_chips": player.round_end_chips,
+                "chip_balance": player.chip_balance,
+                "chips_won_history": player.chips_won_history,
+                "turn_state": serialize_enum(player.turn_state),
+            }
+            for player in game.players.get_players("all")
+        ],
+    }
+
+
+def restore_checkpoint(game: Any, checkpoint: dict[str, Any]) -> None:
+    """Puts a freshly built game back where `checkpoint` was taken, raises ValueError if it was another game."""
+    players = game.players.get_players("all")
+    if checkpoint.get("version") != CHECKPOINT_VERSION:
+        raise ValueError(f"Unsupported checkpoint version {checkpoint.get('version')}.")
+    if checkpoint["game_type"] != game.game_type or checkpoint["chip_mode"] != game.chip_mode.value:
+        raise ValueError("The checkpoint belongs to another kind of game.")
+    if [(player["id"], player["is_human"]) for player in checkpoint["players"]] != [
+        (player.id, not player.is_robot) for player in players
+    ]:
+        raise ValueError("The checkpoint has other seats than the game.")
+
+    # Everything is read before anything is changed, so a damaged checkpoint leaves the game as it was
+    rng_version, rng_internal_state, rng_gauss_next = checkpoint["rng_state"]
+    rng_state = (rng_version, tuple(rng_internal_state), rng_gauss_next)
+    player_states = [
+        (
+            int(player_checkpoint["chips"]),
+            int(player_checkpoint["round_start_chips"]),
+            int(player_checkpoint["round_end_chips"]),
+            int(player_checkpoint["chip_balance"]),
+            [int(chips_won) for chips_won in player_checkpoint["chips_won_history"]],
+            PlayerTurnState(player_checkpoint["turn_state"]),
+        )
+        for player_checkpoint in checkpoint["players"]
+    ]
+    dealer = players[checkpoint["dealer_id"]]
+    round_num, blind_level = int(checkpoint["round_num"]), int(checkpoint["blind_level"])
+    random_seed, winner_name = checkpoint["random_seed"], checkpoint["winner_name"]
+    game_over = bool(checkpoint["game_over"])
+    game.rng.setstate(rng_state)
+
+    game.random_seed = random_seed
+    game.round_num = round_num
+    game._blind_structure.current_level = blind_level
+    game.is_game_over = game_over
+    game.winner_name = winner_name
+    for player, player_state in zip(players, player_states):
+        (
+            player.chips,
+            player.round_start_chips,
+            player.round_end_chips,
+            player.chip_balance,
+            player.chips_won_history,
+            player.turn_state,
+        ) = player_state
+    game.players.current_dealer = dealer
+
+
+class CheckpointStore:
+    """One JSON file per session token in `directory`. Files are replaced atomically, off the event loop."""
+
+    def __init__(self, directory: str | Path) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _get_path(self, token: str) -> Path:
+        if not is_session_token(token):
+            raise ValueError(f"Invalid session token {token!r}.")
+        return self.directory / f"{token}.json"
+
+    def _write(self, token: str, checkpoint: dict[str, Any]) -> None:
+        path = self._get_path(token)
+        descriptor, temporary_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(descriptor, "w") as checkpoint_file:
+                json.dump(checkpoint, checkpoint_file, separators=(",", ":"))
+            os.replace(temporary_path, path)
+        except BaseException:
+            with suppress(OSError):
+                os.unlink(temporary_path)
+            raise
+
+    def _read(self, token: str) -> Optional[dict[str, Any]]:
+        try:
+            with self._get_path(token).open() as checkpoint_file:
+                return json.load(checkpoint_file)
+        except (OSError, ValueError):
+            return None
+
+    async def save(self, token: str, checkpoint: dict[str, Any]) -> None:
+        await asyncio.to_thread(self._write, token, checkpoint)
+
+    async def load(self, token: str) -> Optional[dict[str, Any]]:
+        if not is_session_token(token):
+            return None
+        return await asyncio.to_thread(self._read, token)
+
+    async def delete(self, token: str) -> None:
+        with suppress(OSError):
+            await asyncio.to_thread(self._get_path(token).unlink)
+
+
+class SessionCheckpointer:
+    """
+    Keeps the checkpoint of one session in a CheckpointStore.
+
+    `save` captures the game right away and returns, the file is written by a background task. When rounds end
+    faster than the disk keeps up, only the latest checkpoint is written.
+    """
+
+    def __init__(self, store: CheckpointStore, token: str) -> None:
+        self.store = store
+        self.token = token
+        self._latest: Optional[dict[str, Any]] = None
+        self._writer: Optional[asyncio.Task] = None
+
+    def save(self, game: Any) -> None:
+        self._latest = capture_checkpoint(game)
+        if self._writer is None:
+            self._writer = asyncio.ensure_future(self._write())
+
+    async def _write(self) -> None:
+        try:
+            while self._latest is not None:
+                checkpoint, self._latest = self._latest, None
+                await self.store.save(self.token, checkpoint)
+        finally:
+            self._writer = None
+
+    async def flush(self) -> None:
+        if self._writer is not None:
+            await self._writer
+
+    async def discard(self) -> None:
+        """Removes the checkpoint of a finished match."""
+        await self.flush()
+        await self.store.delete(self.token)
+
+
+async def attach_checkpointer(game: Any, store: CheckpointStore, session_token: Optional[str] = None) -> bool:
+    """
+    Makes `game` save a checkpoint at every round boundary. It continues the match of `session_token` when the
+    store has one that fits the game, and starts a new session otherwise. Returns whether it resumed.
+    """
+    checkpoint = None if session_token is None else await store.load(session_token)
+    resumed = False
+    if checkpoint is not None and not checkpoint.get("game_over"):
+        with suppress(KeyError, TypeError, ValueError):
+            restore_checkpoint(game, checkpoint)
+            resumed = True
+
+    game.checkpointer = SessionCheckpointer(store, session_token if resumed else new_session_token())
+    game.checkpointer.save(game)
+    return resumed
+
+
+class SessionRegistry:
+    """
+    The resumable sessions running in one server process and the store their checkpoints go to.
+
+    A client resuming a session that still runs, because the server did not notice the old connection drop,
+    takes it over: the old connection is closed, so its game stops at the end of the hand and saves its
+    checkpoint. `drain` does the same for every session before a deploy. A token has one game at a time, the
+    resume is refused while the old game still runs.
+    """
+
+    def __init__(self, store: CheckpointStore) -> None:
+        self.store = store
+        self.is_draining = False
+        self._sessions: dict[str, tuple[Any, Any, asyncio.Event]] = {}
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def register(self, token: str, game: Any, websocket: Any) -> None:
+        self._sessions[token] = (game, websocket, asyncio.Event())
+
+    def unregister(self, token: str, game: Any) -> None:
+        # Only the game registered under the token, not one that finished after losing it
+        session = self._sessions.get(token)
+        if session is not None and session[0] is game:
+            del self._sessions[token]
+            session[2].set()
+
+    async def take_over(self, token: str, timeout: float = DEFAULT_DRAIN_TIMEOUT) -> bool:
+        """
+        Stops the game running `token`, if any, and waits for it at most `timeout` seconds. Returns whether the
+        token is free, a game still in its hand after that keeps it.
+        """
+        session = self._sessions.get(token)
+        if session is None:
+            return True
+        game, websocket, finished = session
+        game.suspend_requested = True
+        await websocket.close()
+        try:
+            await asyncio.wait_for(finished.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    async def drain(self, timeout: float = DEFAULT_DRAIN_TIMEOUT) -> None:
+        """
+        Stops every session at its next round boundary and waits for them, at most `timeout` seconds. A session
+        still in a hand after that resumes from the start of the hand.
+        """
+        self.is_draining = True
+        for game, _, _ in self._sessions.values():
+            game.suspend_requested = True
+        waiters = [finished.wait() for _, _, finished in self._sessions.values()]
+        if waiters:
+            with suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(asyncio.gather(*waiters), timeout)
@@ -1,11 +1,14 @@
 from __future__ import annotations
 
 import os
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, replace
 from pathlib import Path
 from typing import Optional
 
+from .abstraction import CardAbstraction, resolve_card_abstraction
 from .common_types import ChipMode
+from .outbound import DEFAULT_HIGH_WATER_MARK, OverflowPolicy, resolve_overflow_policy
+from .pacing import Pacing, PacingMode, RealTimePacing, build_pacing
 from .random_control import resolve_random_seed
 
 DEFAULT_INITIAL_CHIPS = 1200
@@ -26,6 +29,8 @@ class GameConfig:
     model_path: Path = field(default_factory=lambda: DEFAULT_RUNTIME_MODEL_PATH)
     random_seed: Optional[int] = None
     max_rounds: Optional[int] = None
+    pacing: Pacing = field(default_factory=RealTimePacing)
+    card_abstraction: CardAbstraction = CardAbstraction.RANKS
 
     def __post_init__(self) -> None:
         object.__setattr__(self, "model_path", Path(self.model_path))
@@ -36,6 +41,10 @@ class ServerConfig:
     host: str = "0.0.0.0"
     port: int = 3002
     game_config: GameConfig = field(default_factory=GameConfig)
+    send_queue_high_water_mark: int = DEFAULT_HIGH_WATER_MARK
+    send_queue_overflow_policy: OverflowPolicy = OverflowPolicy.COALESCE
+    # Persistent matches save a checkpoint here at every round boundary and can be resumed, when it is set
+    checkpoint_dir: Optional[Path] = None
 
 
 def resolve_chip_mode(
@@ -63,6 +72,13 @@ def resolve_model_path(raw_value: str | Path | None = None) -> Path:
     return Path(raw_value).expanduser().resolve()
 
 
+def resolve_checkpoint_dir(raw_value: str | Path | None) -> Optional[Path]:
+    if raw_value is None or str(raw_value).strip() == "":
+        return None
+
+    return Path(raw_value).expanduser().resolve()
+
+
 def resolve_max_rounds(raw_value: str | int | None, chip_mode: ChipMode) -> Optional[int]:
     if raw_value is None or raw_value == "":
         if chip_mode == ChipMode.RESET_EACH_ROUND:
@@ -72,6 +88,12 @@ def resolve_max_rounds(raw_value: str | int | None, chip_mode: ChipMode) -> Opti
     return int(raw_value)
 
 
+def resolve_pacing(raw_value: Pacing | PacingMode | str | None) -> Pacing:
+    if isinstance(raw_value, Pacing):
+        return raw_value
+    return build_pacing(raw_value)
+
+
 def build_game_config(
     *,
     num_ai_players: int = 1,
@@ -82,6 +104,8 @@ def build_game_config(
     model_path: str | Path | None = None,
     random_seed: Optional[int] = None,
     max_rounds: str | int | None = None,
+    pacing: Pacing | PacingMode | str | None = None,
+    card_abstraction: CardAbstraction | str | None = None,
 ) -> GameConfig:
     resolved_chip_mode = resolve_chip_mode(chip_mode)
 
@@ -94,7 +118,19 @@ def build_game_config(
         model_path=resolve_model_path(model_path),
         random_seed=random_seed,
         max_rounds=resolve_max_rounds(max_rounds, resolved_chip_mode),
+        pacing=resolve_pacing(pacing),
+        card_abstraction=resolve_card_abstraction(card_abstraction),
+    )
+
+
+def build_session_config(base_config: GameConfig, chip_mode: ChipMode, **overrides) -> GameConfig:
+    """The server's game config for a session played in `chip_mode`, whose round limit follows the chip mode."""
+    session_max_rounds = (
+        base_config.max_rounds
+        if base_config.chip_mode == chip_mode
+        else build_game_config(chip_mode=chip_mode).max_rounds
     )
+    return replace(base_config, chip_mode=chip_mode, max_rounds=session_max_rounds, **overrides)
 
 
 def load_server_config() -> ServerConfig:
@@ -109,10 +145,17 @@ def load_server_config() -> ServerConfig:
         model_path=os.getenv("POKER_ML_MODEL_PATH"),
         random_seed=resolve_random_seed(),
         max_rounds=os.getenv("POKER_ML_MAX_ROUNDS"),
+        pacing=os.getenv("POKER_ML_PACING"),
+        card_abstraction=os.getenv("POKER_ML_CARD_ABSTRACTION"),
     )
 
     return ServerConfig(
         host=os.getenv("POKER_ML_WS_HOST", "0.0.0.0"),
         port=int(os.getenv("POKER_ML_WS_PORT", "3002")),
         game_config=game_config,
+        send_queue_high_water_mark=int(
+            os.getenv("POKER_ML_SEND_QUEUE_HIGH_WATER_MARK", str(DEFAULT_HIGH_WATER_MARK))
+        ),
+        send_queue_overflow_policy=resolve_overflow_policy(os.getenv("POKER_ML_SEND_QUEUE_OVERFLOW_POLICY")),
+        checkpoint_dir=resolve_checkpoint_dir(os.getenv("POKER_ML_CHECKPOINT_DIR")),
     )
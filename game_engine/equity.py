@@ -0,0 +1,312 @@
+from __future__ import annotations
+
+import math
+import random
+from dataclasses import dataclass
+from functools import lru_cache
+from itertools import combinations
+from typing import Any, Iterator, Optional, Sequence
+
+from treys import Deck
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - depends on the environment
+    np = None
+
+from .evaluation import LEDUC_DECK, evaluate_many, get_rank_table, rank_leduc_hand
+from .isomorphism import canonicalize, get_deck_suits
+
+DEFAULT_TARGET_STANDARD_ERROR = 0.002
+DEFAULT_MAX_TRIALS = 1_000_000
+# Inputs with at most this many possible deals are enumerated, the others sampled
+DEFAULT_EXACT_LIMIT = 100_000
+EQUITY_CACHE_SIZE = 4096
+# Deals ranked per step, the sampling stops between steps once it is precise enough
+VECTORIZED_BATCH_SIZE = 20_000
+SCALAR_BATCH_SIZE = 1_000
+
+
+@dataclass(frozen=True)
+class EquityResult:
+    """
+    Per hand, in the order they were given: how often it wins alone, how often it ties for the best hand and its
+    equity, the share of the pot it wins on average. `standard_error` is the largest standard error of the
+    equities, 0 when every deal was enumerated.
+    """
+
+    win: tuple[float, ...]
+    tie: tuple[float, ...]
+    equity: tuple[float, ...]
+    trials: int
+    is_exact: bool
+    standard_error: float
+
+
+@dataclass(frozen=True)
+class _Variant:
+    deck: tuple[int, ...]
+    hole_cards: int
+    board_cards: int
+
+    @property
+    def suits(self) -> tuple[int, ...]:
+        return get_deck_suits(self.deck)
+
+
+_VARIANTS = {
+    "Texas Hold'em": _Variant(tuple(Deck.GetFullDeck()), 2, 5),
+    "Leduc": _Variant(LEDUC_DECK, 1, 1),
+}
+
+
+class _Tally:
+    """Sums the pot shares of the known hands over the deals ranked so far."""
+
+    def __init__(self, num_hands: int) -> None:
+        self.num_hands = num_hands
+        self.trials = 0
+        self.wins = [0.0] * num_hands
+        self.ties = [0.0] * num_hands
+        self.shares = [0.0] * num_hands
+        self.squared_shares = [0.0] * num_hands
+
+    def add(self, ranks: Sequence[int]) -> None:
+        """`ranks` of every player in one deal, the known hands first."""
+        best_rank = min(ranks)
+        winners = [seat for seat, rank in enumerate(ranks) if rank == best_rank]
+        share = 1 / len(winners)
+        for seat in winners:
+            if seat < self.num_hands:
+                self.shares[seat] += share
+                self.squared_shares[seat] += share * share
+                if len(winners) == 1:
+                    self.wins[seat] += 1
+                else:
+                    self.ties[seat] += 1
+        self.trials += 1
+
+    def add_batch(self, ranks: Any) -> None:
+        """`ranks` array of shape (deals, players), the known hands first."""
+        is_winner = ranks == ranks.min(axis=1, keepdims=True)
+        num_winners = is_winner.sum(axis=1, keepdims=True)
+        is_known_winner = is_winner[:, : self.num_hands]
+        shares = is_known_winner / num_winners
+        for seat, (wins, ties, share, squared_share) in enumerate(
+            zip(
+                (is_known_winner & (num_winners == 1)).sum(axis=0).tolist(),
+                (is_known_winner & (num_winners > 1)).sum(axis=0).tolist(),
+                shares.sum(axis=0).tolist(),
+                (shares * shares).sum(axis=0).tolist(),
+            )
+        ):
+            self.wins[seat] += wins
+            self.ties[seat] += ties
+            self.shares[seat] += share
+            self.squared_shares[seat] += squared_share
+        self.trials += len(ranks)
+
+    def get_standard_error(self) -> float:
+        standard_error = 0.0
+        for share, squared_share in zip(self.shares, self.squared_shares):
+            mean = share / self.trials
+            variance = max(squared_share / self.trials - mean * mean, 0.0)
+            standard_error = max(standard_error, math.sqrt(variance / self.trials))
+        return standard_error
+
+    def to_result(self, is_exact: bool) -> EquityResult:
+        return EquityResult(
+            win=tuple(wins / self.trials for wins in self.wins),
+            tie=tuple(ties / self.trials for ties in self.ties),
+            equity=tuple(share / self.trials for share in self.shares),
+            trials=self.trials,
+            is_exact=is_exact,
+            standard_error=0.0 if is_exact else self.get_standard_error(),
+        )
+
+
+def _count_deals(num_cards: int, missing_board_cards: int, hole_cards: int, random_opponents: int) -> int:
+    num_deals = math.comb(num_cards, missing_board_cards)
+    num_cards -= missing_board_cards
+    for _ in range(random_opponents):
+        num_deals *= math.comb(num_cards, hole_cards)
+        num_cards -= hole_cards
+    return num_deals
+
+
+def _iterate_hands(cards: Sequence[int], hole_cards: int, num_hands: int) -> Iterator[tuple[int, ...]]:
+    if num_hands == 0:
+        yield ()
+        return
+    for hand in combinations(cards, hole_cards):
+        other_cards = [card for card in cards if card not in hand]
+        for other_hands in _iterate_hands(other_cards, hole_cards, num_hands - 1):
+            yield hand + other_hands
+
+
+def _iterate_deals(
+    cards: Sequence[int], missing_board_cards: int, hole_cards: int, random_opponents: int
+) -> Iterator[tuple[int, ...]]:
+    """Every deal of the unknown cards, the missing board cards followed by the random opponents' hands."""
+    for board in combinations(cards, missing_board_cards):
+        other_cards = [card for card in cards if card not in board]
+        for hands in _iterate_hands(other_cards, hole_cards, random_opponents):
+            yield board + hands
+
+
+class _ScalarRanker:
+    """Ranks one deal at a time, with the rank table when it was built and treys otherwise."""
+
+    def __init__(
+        self, variant: _Variant, hands: Sequence[Sequence[int]], board: Sequence[int], missing_board_cards: int
+    ) -> None:
+        self.is_leduc = variant is _VARIANTS["Leduc"]
+        self.hole_cards = variant.hole_cards
+        self.hands = [tuple(hand) for hand in hands]
+        self.board = tuple(board)
+        self.missing_board_cards = missing_board_cards
+
+    def add(self, tally: _Tally, deals: Sequence[Sequence[int]]) -> None:
+        for deal in deals:
+            board = self.board + tuple(deal[: self.missing_board_cards])
+            hands = self.hands + [
+                tuple(deal[start : start + self.hole_cards])
+                for start in range(self.missing_board_cards, len(deal), self.hole_cards)
+            ]
+            if self.is_leduc:
+                tally.add([rank_leduc_hand(hand[0], board) for hand in hands])
+            else:
+                tally.add(evaluate_many(board, hands))
+
+
+class _VectorizedRanker:
+    """Ranks Hold'em deals in numpy batches with the rank table."""
+
+    def __init__(self, hands: Sequence[Sequence[int]], board: Sequence[int], missing_board_cards: int) -> None:
+        self.rank_table = get_rank_table()
+        self.hands = np.array(hands, dtype=np.int32).reshape(len(hands), 2)
+        self.board = np.array(board, dtype=np.int32)
+        self.missing_board_cards = missing_board_cards
+
+    def add(self, tally: _Tally, deals: Any) -> None:
+        num_deals = len(deals)
+        board = np.concatenate(
+            (np.broadcast_to(self.board, (num_deals, len(self.board))), deals[:, : self.missing_board_cards]), axis=1
+        )
+        player_hands = [np.broadcast_to(hand, (num_deals, 2)) for hand in self.hands] + [
+            deals[:, start : start + 2] for start in range(self.missing_board_cards, deals.shape[1], 2)
+        ]
+        ranks = np.stack(
+            [self.rank_table.evaluate_batch(np.concatenate((hand, board), axis=1)) for hand in player_hands], axis=1
+        )
+        tally.add_batch(ranks)
+
+
+@lru_cache(maxsize=EQUITY_CACHE_SIZE)
+def _calculate_canonical_equity(
+    game_type: str,
+    hands: tuple[tuple[int, ...], ...],
+    board: tuple[int, ...],
+    dead_cards: tuple[int, ...],
+    random_opponents: int,
+    target_standard_error: float,
+    max_trials: int,
+    exact_limit: int,
+    random_seed: Optional[int],
+) -> EquityResult:
+    variant = _VARIANTS[game_type]
+    known_cards = {card for hand in hands for card in hand} | set(board) | set(dead_cards)
+    cards = [card for card in variant.deck if card not in known_cards]
+    missing_board_cards = variant.board_cards - len(board)
+    deal_size = missing_board_cards + variant.hole_cards * random_opponents
+    tally = _Tally(len(hands))
+
+    is_vectorized = game_type == "Texas Hold'em" and np is not None and get_rank_table() is not None
+    ranker = (
+        _VectorizedRanker(hands, board, missing_board_cards)
+        if is_vectorized
+        else _ScalarRanker(variant, hands, board, missing_board_cards)
+    )
+    batch_size = VECTORIZED_BATCH_SIZE if is_vectorized else SCALAR_BATCH_SIZE
+
+    num_deals = _count_deals(len(cards), missing_board_cards, variant.hole_cards, random_opponents)
+    if deal_size == 0 or num_deals <= exact_limit:
+        deals = _iterate_deals(cards, missing_board_cards, variant.hole_cards, random_opponents)
+        while True:
+            batch = [deal for _, deal in zip(range(batch_size), deals)]
+            if not batch:
+                return tally.to_result(is_exact=True)
+            if is_vectorized:
+                batch = np.array(batch, dtype=np.int32).reshape(len(batch), deal_size)
+            ranker.add(tally, batch)
+
+    if is_vectorized:
+        generator = np.random.default_rng(random_seed)
+        deck = np.array(cards, dtype=np.int32)
+    else:
+        rng = random.Random(random_seed)
+    while True:
+        num_deals = min(batch_size, max_trials - tally.trials)
+        if is_vectorized:
+            # The cards with the smallest random keys of each row are a deal without replacement
+            keys = generator.random((num_deals, len(cards)))
+            ranker.add(tally, deck[np.argpartition(keys, deal_size - 1, axis=1)[:, :deal_size]])
+        else:
+            ranker.add(tally, [rng.sample(cards, deal_size) for _ in range(num_deals)])
+        if tally.trials >= max_trials or tally.get_standard_error() <= target_standard_error:
+            return tally.to_result(is_exact=False)
+
+
+def calculate_equity(
+    hands: Sequence[Sequence[int]],
+    board: Sequence[int] = (),
+    dead_cards: Sequence[int] = (),
+    *,
+    game_type: str = "Texas Hold'em",
+    random_opponents: int = 0,
+    target_standard_error: float = DEFAULT_TARGET_STANDARD_ERROR,
+    max_trials: int = DEFAULT_MAX_TRIALS,
+    exact_limit: int = DEFAULT_EXACT_LIMIT,
+    random_seed: Optional[int] = None,
+) -> EquityResult:
+    """
+    Win, tie and equity of each of `hands` (treys cards) against each other and `random_opponents` hands dealt
+    from the unknown cards, over the boards completing `board`. `dead_cards` are dealt to nobody.
+
+    Inputs with at most `exact_limit` possible deals are enumerated. The others are sampled until the standard
+    error of every equity is at most `target_standard_error`, or `max_trials` deals were played, in numpy
+    batches ranked with the rank table when both are available. Results are cached by the input with its suits
+    relabeled, so inputs that only differ by suits are computed once.
+    """
+    variant = _VARIANTS.get(game_type)
+    if variant is None:
+        raise ValueError(f"Unsupported game type {game_type!r}.")
+    if not hands or len(hands) + random_opponents < 2 or random_opponents < 0:
+        raise ValueError("Equity needs at least one known hand and two players.")
+    if any(len(hand) != variant.hole_cards for hand in hands):
+        raise ValueError(f"{game_type} hands have {variant.hole_cards} hole cards.")
+    if len(board) > variant.board_cards:
+        raise ValueError(f"{game_type} boards have at most {variant.board_cards} cards.")
+    if target_standard_error <= 0 or max_trials < 1:
+        raise ValueError("target_standard_error and max_trials must be positive.")
+
+    known_cards = [card for hand in hands for card in hand] + list(board) + list(dead_cards)
+    if len(set(known_cards)) != len(known_cards) or not set(known_cards) <= set(variant.deck):
+        raise ValueError("Cards must be distinct cards of the game's deck.")
+    if len(variant.deck) - len(known_cards) < (
+        variant.board_cards - len(board) + variant.hole_cards * random_opponents
+    ):
+        raise ValueError("Not enough cards left to deal.")
+
+    *canonical_hands, canonical_board, canonical_dead_cards = canonicalize([*hands, board, dead_cards], variant.suits)
+    return _calculate_canonical_equity(
+        game_type,
+        tuple(canonical_hands),
+        canonical_board,
+        canonical_dead_cards,
+        random_opponents,
+        target_standard_error,
+        max_trials,
+        exact_limit,
+        random_seed,
+    )
@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import os
+from functools import lru_cache
+from itertools import combinations
+from pathlib import Path
+from typing import Optional, Sequence
+
+from treys import Card, Evaluator
+
+from .rank_table import HandRankTable, resolve_rank_table_path
+
+# In the order Round shuffles them, so seeded games deal the same cards
+LEDUC_DECK = tuple(Card.new(card) for card in ("As", "Ad", "Ks", "Kd", "Qs", "Qd"))
+# Added to a Leduc card's rank when it pairs the board, more than the difference between any two ranks
+LEDUC_PAIR_BONUS = 100
+
+
+@lru_cache(maxsize=None)
+def get_evaluator() -> Evaluator:
+    # Building an Evaluator fills its lookup tables, which takes far longer than playing a hand
+    return Evaluator()
+
+
+@lru_cache(maxsize=None)
+def _load_rank_table(path: Path) -> HandRankTable:
+    return HandRankTable(path)
+
+
+def get_rank_table() -> Optional[HandRankTable]:
+    """
+    The 7-card rank table built by game_engine.build_rank_table, None when it was not built. Only a table that
+    was found is kept, so one built while the server runs is used from the next call on.
+    """
+    path = resolve_rank_table_path(os.getenv("POKER_ML_RANK_TABLE"))
+    if not path.exists():
+        return None
+    return _load_rank_table(path)
+
+
+def get_card_rank(card: int) -> int:
+    # Bits 8 to 11 of a treys card hold its rank, from 0 for a deuce to 12 for an ace
+    return (card >> 8) & 0xF
+
+
+def rank_leduc_hand(card: int, board: Sequence[int]) -> int:
+    """Leduc hand value, lower is better like treys ranks: pairing the board card beats any high card."""
+    rank = get_card_rank(card)
+    if board and get_card_rank(board[0]) == rank:
+        return -rank - LEDUC_PAIR_BONUS
+    return -rank
+
+
+def evaluate_many(board: Sequence[int], hands: Sequence[Sequence[int]]) -> list[int]:
+    """
+    treys ranks of two-card `hands` on a shared `board`, from 1 for a royal flush to 7462 for the worst high card.
+
+    On a complete board the 5-card subsets of the board are combined once for all hands, so each hand only
+    multiplies its hole cards in and looks up its 21 subsets. A 5-card hand is a flush when the suit bits of its
+    cards have one bit in common, and both treys tables are keyed by the product of the cards' rank primes.
+    When the rank table was built, each hand is a single lookup in it instead.
+    """
+    if len(board) != 5 or any(len(hand) != 2 for hand in hands):
+        evaluator = get_evaluator()
+        return [evaluator.evaluate(list(board), list(hand)) for hand in hands]
+
+    rank_table = get_rank_table()
+    if rank_table is not None:
+        return rank_table.evaluate_many(board, hands)
+
+    evaluator = get_evaluator()
+    flush_lookup = evaluator.table.flush_lookup
+    unsuited_lookup = evaluator.table.unsuited_lookup
+
+    def combine(cards: Sequence[int]) -> tuple[int, int]:
+        suits, product = 0xF000, 1
+        for card in cards:
+            suits &= card
+            product *= card & 0xFF
+        return suits, product
+
+    board_suits, board_product = combine(board)
+    board_rank = (flush_lookup if board_suits else unsuited_lookup)[board_product]
+    board_fours = [combine(cards) for cards in combinations(board, 4)]
+    board_threes = [combine(cards) for cards in combinations(board, 3)]
+
+    ranks = []
+    for first_card, second_card in hands:
+        best_rank = board_rank
+        for card in (first_card, second_card):
+            card_prime = card & 0xFF
+            for suits, product in board_fours:
+                rank = (flush_lookup if suits & card else unsuited_lookup)[product * card_prime]
+                if rank < best_rank:
+                    best_rank = rank
+
+        hole_suits = first_card & second_card
+        hole_product = (first_card & 0xFF) * (second_card & 0xFF)
+        for suits, product in board_threes:
+            rank = (flush_lookup if suits & hole_suits else unsuited_lookup)[product * hole_product]
+            if rank < best_rank:
+                best_rank = rank
+        ranks.append(best_rank)
+    return ranks
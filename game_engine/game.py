@@ -1,18 +1,26 @@
 from __future__ import annotations
 
-import asyncio
 from collections import defaultdict
 from typing import Optional
 
-from treys import Card, Deck, Evaluator
+from treys import Card, Deck
 
 from .ai import NashBlueprintPolicy
 from .blind_structure import BlindStructure
 from .common_types import ChipMode, LeducPhases, PokerPhases
 from .config import GameConfig
+from .evaluation import LEDUC_DECK, evaluate_many, rank_leduc_hand
 from .player import Player, PlayerTurnState, Players
-from .protocol import serialize_game_state
+from .pots import Pot, award_pots, build_pots
+from .protocol import (
+    STATE_PROTOCOL_DELTA,
+    STATE_PROTOCOL_FULL,
+    GameStateStream,
+    build_static_state_fields,
+    serialize_game_state,
+)
 from .random_control import build_rng, resolve_random_seed
+from .serialization import ENCODING_JSON, cards_to_strs
 
 
 class Game:
@@ -21,14 +29,20 @@ class Game:
         websocket,
         game_type: str,
         config: GameConfig,
+        state_protocol: str = STATE_PROTOCOL_FULL,
+        encoding: str = ENCODING_JSON,
     ):
         self.websocket = websocket
+        self.encoding = encoding
+        self.state_stream = GameStateStream(encoding) if state_protocol == STATE_PROTOCOL_DELTA else None
         self.game_type = game_type
         self.is_leduc = game_type == "Leduc"
         self.chip_mode = config.chip_mode
         self.reset_chips_every_round = self.chip_mode == ChipMode.RESET_EACH_ROUND
         self.max_rounds = config.max_rounds
         self.initial_chips = config.initial_chips
+        self.pacing = config.pacing.for_game()
+        self.card_abstraction = config.card_abstraction
         self.random_seed = resolve_random_seed(config.random_seed)
         self.rng = build_rng(self.random_seed)
         self.players = Players(self, config.num_ai_players, config.num_human_players, config.initial_chips)
@@ -41,29 +55,46 @@ class Game:
         )
         self._blind_structure = BlindStructure(self.is_leduc)
         self._increase_blind_every = config.increase_blind_every
+        self.static_state_fields = build_static_state_fields(self)
         self.table_cards: list[Card] = []
         self.round_num = 0
         self.total_pot = 0
         self.phase_pot = 0
+        # The pots of the last hand and who won them, empty while a hand is played
+        self.pots: list[Pot] = []
         self.phase_name: PokerPhases | LeducPhases | None = None
         self.min_turn_value_to_continue: int = 0
         self.min_bet = 0
         self.is_game_over = False
         self.winner_name: Optional[str] = None
+        # Set by the server for sessions that can be resumed, saves a checkpoint at every round boundary
+        self.checkpointer = None
+        self.suspend_requested = False
+        self.is_suspended = False
 
     async def start_game(self) -> None:
         while not self.is_finished():
+            if self.suspend_requested:
+                self.is_suspended = True
+                return
             small_blind, big_blind = self.get_blinds()
             round_instance = Round(self, small_blind, big_blind)
             await round_instance.start()
             self.finish_round()
+            if self.checkpointer is not None:
+                self.checkpointer.save(self)
             await self.send_game_state()
 
+    def handle_connection_lost(self) -> None:
+        """A resumable session stops at the end of the hand, the others keep folding the missing player."""
+        if self.checkpointer is not None:
+            self.suspend_requested = True
+
     def get_blinds(self) -> tuple[int, int]:
         return self._blind_structure.get_blinds()
 
     def check_win(self) -> bool:
-        return len(self.players.get_players("non_broke")) == 1
+        return self.players.count("non_broke") == 1
 
     def is_finished(self) -> bool:
         if self.chip_mode == ChipMode.RESET_EACH_ROUND:
@@ -121,8 +152,29 @@ class Game:
                 player.set_chips(self.initial_chips)
 
     async def send_game_state(self) -> None:
-        if self.websocket:
-            await self.websocket.send(serialize_game_state(self))
+        if not self.websocket:
+            return
+        if self.state_stream is None:
+            await self.websocket.send(serialize_game_state(self, self.encoding))
+            return
+
+        message = self.state_stream.encode_game(self)
+        if message is not None:
+            await self.websocket.send(message)
+
+    async def resync_game_state(self, websocket=None) -> None:
+        """Sends the current state to one client, for delta clients that missed a message."""
+        target = websocket or self.websocket
+        if not target:
+            return
+        if self.state_stream is None:
+            await target.send(serialize_game_state(self, self.encoding))
+            return
+
+        # Before the first state goes out there is nothing to catch up on
+        message = self.state_stream.snapshot()
+        if message is not None:
+            await target.send(message)
 
 
 class Round:
@@ -135,19 +187,12 @@ class Round:
         self.game.min_bet = big_blind
         self.players_in_the_hand: list[Player] = []
         self.is_showdown = False
+        self.game.pots = []
         self.players.initiate_players_for_round()
-        leduc_deck = [
-            Card.new("As"),
-            Card.new("Ad"),
-            Card.new("Ks"),
-            Card.new("Kd"),
-            Card.new("Qs"),
-            Card.new("Qd"),
-        ]
-        self.deck = leduc_deck if self.game.is_leduc else Deck().GetFullDeck()
+        self.deck = list(LEDUC_DECK) if self.game.is_leduc else Deck().GetFullDeck()
         self.game.rng.shuffle(self.deck)
         self.table_str: list[str] = []
-        self.ai_player_cards_str = []
+        self.player_cards_str: dict[int, list[str]] = {}
 
     async def start(self) -> None:
         self.give_players_cards(self.deck)
@@ -156,7 +201,7 @@ class Round:
             first_player, table_cards_to_show_count = self.get_phase_variables(current_phase)
             new_table_cards = [self.deck.pop() for _ in range(table_cards_to_show_count)]
             self.game.table_cards.extend(new_table_cards)
-            self.table_str = [Card.int_to_str(card) for card in self.game.table_cards]
+            self.table_str = cards_to_strs(self.game.table_cards)
             phase = Phase(self, current_phase, self.small_blind, self.big_blind, first_player)
             await phase.start()
 
@@ -165,7 +210,8 @@ class Round:
                 self.players_in_the_hand.extend(players_in_the_hand)
                 self.is_showdown = False
                 break
-            if current_phase == PokerPhases.RIVER or current_phase == LeducPhases.FLOP:
+            # Phases are str enums and PokerPhases.FLOP == LeducPhases.FLOP, so they are compared by identity
+            if current_phase is LeducPhases.FLOP or current_phase is PokerPhases.RIVER:
                 self.players_in_the_hand.extend(players_in_the_hand)
                 self.is_showdown = True
 
@@ -197,9 +243,7 @@ class Round:
 
             num_cards_to_draw = 1 if self.game.is_leduc else 2
             player.cards = [deck.pop() for _ in range(num_cards_to_draw)]
-
-        if self.game.ai_player:
-            self.ai_player_cards_str = [Card.int_to_str(card) for card in self.game.ai_player.cards]
+            self.player_cards_str[player.id] = cards_to_strs(player.cards)
 
     def reset_round_player(self, player: Player) -> None:
         player.reset_round_player()
@@ -208,71 +252,45 @@ class Round:
         else:
             player.set_turn_state(PlayerTurnState.WAITING_FOR_TURN)
 
-    def take_from_player_round_bet(self, player: Player, amount: int) -> int:
-        if player.round_bet_value < amount:
-            amount = player.round_bet_aux
-        player.round_bet_aux -= amount
-        self.game.total_pot -= amount
-        return amount
-
-    def distribute_pot(self, order_of_best_hands: list[list[Player]]) -> None:
-        for equivalent_hand_group in order_of_best_hands:
-            if all(player.round_bet_aux == 0 for player in self.players.get_players("non_broke")):
-                break
-
-            sorted_hand_group = sorted(
-                equivalent_hand_group,
-                key=lambda player: player.round_bet_aux,
-            )
-
-            for hand_group_player in sorted_hand_group:
-                hand_group_player_pot = hand_group_player.round_bet_aux
-                remaining_players_to_receive = [
-                    player
-                    for player in sorted_hand_group
-                    if player.round_bet_aux >= hand_group_player_pot
-                ]
-                if not remaining_players_to_receive:
-                    continue
-
-                chips_for_remaining_players = 0
-                for non_broke_player in self.players.get_players("non_broke"):
-                    if non_broke_player.round_bet_aux == 0:
-                        continue
-                    amount_taken = self.take_from_player_round_bet(
-                        non_broke_player,
-                        hand_group_player_pot,
-                    )
-                    chips_for_remaining_players += amount_taken
-
-                remaining_players_to_receive_count = len(remaining_players_to_receive)
-                chips_remaining = chips_for_remaining_players % remaining_players_to_receive_count
-                random_player = self.game.rng.choice(remaining_players_to_receive)
-                random_player.add_chips(chips_remaining)
-                chips_for_remaining_players -= chips_remaining
-
-                chips_per_player = chips_for_remaining_players // remaining_players_to_receive_count
-                for group_player in remaining_players_to_receive:
-                    group_player.add_chips(chips_per_player)
+    def distribute_pot(self, order_of_best_hands: list[list[Player]]) -> list[Pot]:
+        non_broke_players = self.players.get_players("non_broke")
+        pots = award_pots(
+            build_pots(
+                {player.id: player.round_bet_value for player in non_broke_players},
+                [player.id for player in self.players_in_the_hand],
+            ),
+            [[player.id for player in hand_group] for hand_group in order_of_best_hands],
+        )
 
+        players_by_id = {player.id: player for player in non_broke_players}
+        for pot in pots:
+            winners = [players_by_id[player_id] for player_id in pot.winner_ids]
+            chips_per_player, odd_chips = divmod(pot.amount, len(winners))
+            for winner in winners:
+                winner.add_chips(chips_per_player)
+            # Drawn for every pot, even without odd chips, so the hands dealt after it do not depend on the split
+            self.game.rng.choice(winners).add_chips(odd_chips)
+            self.game.total_pot -= pot.amount
+
+        self.game.pots = pots
         self.game.finalize_round_balances()
         assert self.game.total_pot == 0
+        return pots
 
     def calculate_winners(self) -> list[list[Player]]:
-        evaluator = Evaluator()
-
-        for player in self.players_in_the_hand:
+        # A hand won by the others folding is not ranked, before the flop Hold'em has no 5 cards to rank anyway
+        if self.is_showdown:
+            table_cards = self.game.table_cards
             if self.game.is_leduc:
-                hand_card_value = Card.get_rank_int(player.cards[0])
-                pair_value = (
-                    100
-                    if self.is_showdown
-                    and Card.get_rank_int(self.game.table_cards[0]) == Card.get_rank_int(player.cards[0])
-                    else 0
-                )
-                player.show_down_hand["value"] = -hand_card_value - pair_value
+                values = [rank_leduc_hand(player.cards[0], table_cards) for player in self.players_in_the_hand]
             else:
-                player.show_down_hand["value"] = evaluator.evaluate(self.game.table_cards, player.cards)
+                values = evaluate_many(table_cards, [player.cards for player in self.players_in_the_hand])
+            for player, value in zip(self.players_in_the_hand, values):
+                player.show_down_hand["value"] = value
+        else:
+            # The winner's hand is not shown, clients read a null value rather than one left from another hand
+            for player in self.players_in_the_hand:
+                player.show_down_hand["value"] = None
 
         sorted_players = sorted(self.players_in_the_hand, key=lambda player: player.show_down_hand["value"])
         rank_groups = defaultdict(list)
@@ -286,10 +304,6 @@ class Round:
         assert self.game.total_pot == sum(
             player.round_bet_value for player in self.players.get_players("non_broke")
         )
-        assert all(
-            player.round_bet_aux == player.round_bet_value
-            for player in self.players.get_players("non_broke")
-        )
 
         order_of_best_hands = self.calculate_winners()
         self.distribute_pot(order_of_best_hands)
@@ -332,24 +346,22 @@ class Phase:
             await small_blind_player.pay_blind(self.small_blind)
             await big_blind_player.pay_blind(self.big_blind)
 
-        while len(self.players.get_players("active_in_hand")) > 1:
+        while self.players.count("active_in_hand") > 1:
             current_player = self.get_current_turn_player()
             assert self.get_min_phase_value_to_continue() >= 0
             if current_player is None:
                 break
 
-            players_waiting_for_turn = self.players.get_players("can_bet_in_current_turn")
             if (
                 current_player.get_played_current_phase()
                 and self.get_min_phase_value_to_continue() == current_player.phase_bet_value
             ):
                 break
-            if current_player in players_waiting_for_turn and players_waiting_for_turn:
+            if self.players.contains("can_bet_in_current_turn", current_player):
                 turn = Turn(self, current_player, self.get_min_phase_value_to_continue())
                 await turn.start()
 
-            players_that_can_bet = self.players.get_players("can_bet_in_current_turn")
-            if players_that_can_bet:
+            if self.players.count("can_bet_in_current_turn"):
                 self.set_current_turn_player(
                     self.players.get_next("can_bet_in_current_turn", current_player.id)
                 )
@@ -358,7 +370,7 @@ class Phase:
                 break
 
         await self.round.game.send_game_state()
-        await asyncio.sleep(0.2)
+        await self.round.game.pacing.after_phase()
         self.finish_phase()
         return self.round.game.phase_pot
 
@@ -399,7 +411,7 @@ class Turn:
         bet, action = await self.player.play(
             self.phase.round.game.min_turn_value_to_continue,
             self.phase.round.game.min_bet,
-            self.phase.round.ai_player_cards_str,
+            self.phase.round.player_cards_str[self.player.id],
             self.phase.round.table_str,
             self.phase.round.history,
         )
@@ -0,0 +1,52 @@
+import numpy as np
+
+
+class CFRVariant:
+    """
+       A regret and average strategy update rule, applied to the regret and strategy sum arrays of a trainer at
+       the end of every discount interval t = 1, 2, ... (an interval is discount_every iterations).
+       Positive regrets are multiplied by t^alpha / (t^alpha + 1), negative regrets by t^beta / (t^beta + 1) and
+       the strategy sums by (t / (t + 1))^gamma, a None exponent leaves the values as they are.
+       With clamp_regrets the regrets are floored at 0, as in regret-matching+.
+    """
+    def __init__(self, name, alpha=None, beta=None, gamma=None, clamp_regrets=False):
+        self.name = name
+        self.alpha = alpha
+        self.beta = beta
+        self.gamma = gamma
+        self.clamp_regrets = clamp_regrets
+
+    @property
+    def is_vanilla(self):
+        return self.alpha is None and self.beta is None and self.gamma is None and not self.clamp_regrets
+
+    def apply(self, regret_sum, strategy_sum, t):
+        """Updates the arrays in place at the end of discount interval t."""
+        if self.alpha is not None or self.beta is not None:
+            positive_factor = 1.0 if self.alpha is None else t ** self.alpha / (t ** self.alpha + 1)
+            negative_factor = 1.0 if self.beta is None else t ** self.beta / (t ** self.beta + 1)
+            regret_sum *= np.where(regret_sum > 0, positive_factor, negative_factor)
+        if self.clamp_regrets:
+            np.maximum(regret_sum, 0, out=regret_sum)
+        if self.gamma is not None:
+            strategy_sum *= (t / (t + 1)) ** self.gamma
+
+
+CFR_VARIANTS = {
+    'vanilla': CFRVariant('vanilla'),
+    # Regret-matching+ with linearly weighted averaging
+    'cfr+': CFRVariant('cfr+', gamma=1, clamp_regrets=True),
+    # Linear CFR, regrets and strategies of interval t weighted by t
+    'lcfr': CFRVariant('lcfr', alpha=1, beta=1, gamma=1),
+    # Discounted CFR with the parameters recommended by Brown and Sandholm
+    'dcfr': CFRVariant('dcfr', alpha=1.5, beta=0, gamma=2),
+}
+
+
+def get_cfr_variant(cfr_variant):
+    """Accepts a CFRVariant or the name of one of CFR_VARIANTS."""
+    if isinstance(cfr_variant, CFRVariant):
+        return cfr_variant
+    if cfr_variant not in CFR_VARIANTS:
+        raise Exception("CFR variant not found: " + str(cfr_variant))
+    return CFR_VARIANTS[cfr_variant]
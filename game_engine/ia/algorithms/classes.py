@@ -1,7 +1,10 @@
 import random
+from array import array
 from functions import color_print
 from enum import Enum
 
+import numpy as np
+
 class Card(Enum):
     Q = 1
     K = 2
@@ -23,23 +26,129 @@ class HistoryNode:
         self.full_history = history + name
 
 
+class RegretTable:
+    """
+       The regret sums, current strategies, strategy sums and counters of every info set, in contiguous arrays
+       indexed by the dense ids of an InfoSetEncoder. The actions of info set i use the slots offsets[i]:offsets[i + 1].
+       InfoSetNode objects built with a table are views over their slots, so the whole model is a few buffers
+       that can be copied, diffed and written at once.
+    """
+    COUNTERS = ('times_regret_sum_updated', 'times_strategy_sum_updated', 'times_got_strategy_without_0_rw', 'times_got_strategy_without_0_strat')
+    ARRAYS = ('regret_sum', 'strategy', 'strategy_sum', 'times_action_got_positive_reward', 'counters', 'is_visited')
+
+    def __init__(self, num_actions):
+        num_info_sets = len(num_actions)
+        self.offsets = np.zeros(num_info_sets + 1, dtype=np.int64)
+        self.offsets[1:] = np.cumsum(num_actions)
+        num_slots = int(self.offsets[-1])
+
+        self.regret_sum = np.zeros(num_slots, dtype=np.float64)
+        self.strategy = np.zeros(num_slots, dtype=np.float64)
+        self.strategy_sum = np.zeros(num_slots, dtype=np.float64)
+        self.times_action_got_positive_reward = np.zeros(num_slots, dtype=np.int64)
+        self.counters = np.zeros(num_info_sets * len(self.COUNTERS), dtype=np.int64)
+        # An info set is visited once a node was created for it, only visited info sets are exported
+        self.is_visited = np.zeros(num_info_sets, dtype=bool)
+
+    def get_views(self, info_set_id):
+        """Marks the info set as visited and returns memoryviews over its regret, strategy, strategy sum, positive reward and counter slots."""
+        self.is_visited[info_set_id] = True
+        start, end = int(self.offsets[info_set_id]), int(self.offsets[info_set_id + 1])
+        counters_start = info_set_id * len(self.COUNTERS)
+        action_views = tuple(memoryview(array)[start:end] for array in (self.regret_sum, self.strategy, self.strategy_sum, self.times_action_got_positive_reward))
+        return action_views + (memoryview(self.counters)[counters_start:counters_start + len(self.COUNTERS)],)
+
+    def visited_info_set_ids(self):
+        return np.flatnonzero(self.is_visited).tolist()
+
+    def num_visited(self):
+        return int(np.count_nonzero(self.is_visited))
+
+    def copy_arrays(self):
+        return {name: getattr(self, name).copy() for name in self.ARRAYS}
+
+    def get_delta(self, snapshot):
+        """Returns, for every array, the indices that changed since copy_arrays returned the snapshot and by how much."""
+        delta = {}
+        for name in self.ARRAYS:
+            array, base_array = getattr(self, name), snapshot[name]
+            indices = np.flatnonzero(array != base_array)
+            delta[name] = indices, array[indices] if array.dtype == bool else array[indices] - base_array[indices]
+        return delta
+
+    def add_delta(self, delta):
+        for name, (indices, values) in delta.items():
+            array = getattr(self, name)
+            if array.dtype == bool:
+                array[indices] |= values
+            else:
+                array[indices] += values
+
+    def save(self, path):
+        np.savez(path, offsets=self.offsets, **self.copy_arrays())
+
+    def load(self, path):
+        with np.load(path) as arrays:
+            if not np.array_equal(arrays['offsets'], self.offsets):
+                raise ValueError(f"{path} was saved for a different game")
+            for name in self.ARRAYS:
+                getattr(self, name)[:] = arrays[name]
+
+
 class InfoSetNode:
-    """ A node is an information set, which is the cards of the player and the history of the game."""
-    def __init__(self, info_set, actions, strategy):
+    """ A node is an information set, which is the cards of the player and the history of the game.
+    With a RegretTable its sums live in the table's arrays, otherwise in lists of its own."""
+    __slots__ = ('actions', 'num_actions', 'info_set', 'regret_sum', 'strategy', 'strategy_sum', 'times_action_got_positive_reward', 'counters')
+
+    def __init__(self, info_set, actions, strategy, table=None, info_set_id=None):
 
-        self.actions = list(actions)
-        self.actions_names = {}
+        # The actions list is shared with the caller, it is never modified
+        self.actions = actions
         self.num_actions = len(actions)
         self.info_set = info_set
         # The regret and strategies of a node refer to the last action taken to reach the node
-        self.regret_sum = [0.0] * self.num_actions
-        self.strategy = [0.0] * self.num_actions if strategy is None else strategy
-        self.strategy_sum = [0.0] * self.num_actions
-        self.times_regret_sum_updated = 0
-        self.times_strategy_sum_updated = 0
-        self.times_action_got_positive_reward = [0] * self.num_actions
-        self.times_got_strategy_without_0_rw = 0
-        self.times_got_strategy_without_0_strat = 0
+        if table is None:
+            self.regret_sum = [0.0] * self.num_actions
+            self.strategy = [0.0] * self.num_actions if strategy is None else strategy
+            self.strategy_sum = [0.0] * self.num_actions
+            self.times_action_got_positive_reward = [0] * self.num_actions
+            self.counters = [0] * len(RegretTable.COUNTERS)
+        else:
+            self.regret_sum, self.strategy, self.strategy_sum, self.times_action_got_positive_reward, self.counters = table.get_views(info_set_id)
+            if strategy is not None:
+                self.strategy[:] = array('d', strategy)
+
+    @property
+    def times_regret_sum_updated(self):
+        return self.counters[0]
+
+    @times_regret_sum_updated.setter
+    def times_regret_sum_updated(self, value):
+        self.counters[0] = value
+
+    @property
+    def times_strategy_sum_updated(self):
+        return self.counters[1]
+
+    @times_strategy_sum_updated.setter
+    def times_strategy_sum_updated(self, value):
+        self.counters[1] = value
+
+    @property
+    def times_got_strategy_without_0_rw(self):
+        return self.counters[2]
+
+    @times_got_strategy_without_0_rw.setter
+    def times_got_strategy_without_0_rw(self, value):
+        self.counters[2] = value
+
+    @property
+    def times_got_strategy_without_0_strat(self):
+        return self.counters[3]
+
+    @times_got_strategy_without_0_strat.setter
+    def times_got_strategy_without_0_strat(self, value):
+        self.counters[3] = value
 
     def get_strategy(self, realization_weight, is_exploring_phase, is_current_model_fixed, min_reality_weight, decrese_weight_of_initial_strategies, info_set):
         """Turn sum of regrets into a probability distribution for actions."""
@@ -47,22 +156,30 @@ class InfoSetNode:
         if not is_current_model_fixed:
             # r = random.random()
             # test_bad_actions = r < 0.05
-            normalizing_sum = sum(max(regret, 0) for regret in self.regret_sum)
-            for i in range(len(self.actions)):
+            regret_sum, strategy, strategy_sum = self.regret_sum, self.strategy, self.strategy_sum
+            normalizing_sum = sum(max(regret, 0) for regret in regret_sum)
+            # The counters are only written once per call, since they may live in a RegretTable
+            times_got_strategy_without_0_strat = 0
+            times_strategy_sum_updated = 0
+            for i in range(self.num_actions):
                 if normalizing_sum > 0:
-                    self.strategy[i] = max(self.regret_sum[i], 0) / normalizing_sum
+                    strategy[i] = max(regret_sum[i], 0) / normalizing_sum
                 else:
-                    self.strategy[i] = 1.0 / self.num_actions
+                    strategy[i] = 1.0 / self.num_actions
                     linear_strategy = decrese_weight_of_initial_strategies
-                if realization_weight != 0:
-                    self.times_got_strategy_without_0_rw += 1
-                if self.strategy[i] != 0:
-                    self.times_got_strategy_without_0_strat += 1
+                if strategy[i] != 0:
+                    times_got_strategy_without_0_strat += 1
                 
-                strategy_factor = min_reality_weight if linear_strategy else self.strategy[i]
+                strategy_factor = min_reality_weight if linear_strategy else strategy[i]
                 strategy_sum_increment = max(realization_weight, min_reality_weight) * strategy_factor
-                self.strategy_sum[i] += strategy_sum_increment 
-                self.times_strategy_sum_updated += bool(strategy_sum_increment)
+                strategy_sum[i] += strategy_sum_increment 
+                times_strategy_sum_updated += bool(strategy_sum_increment)
+
+            counters = self.counters
+            if realization_weight != 0:
+                counters[2] += self.num_actions
+            counters[1] += times_strategy_sum_updated
+            counters[3] += times_got_strategy_without_0_strat
         return self.strategy
     
     def get_action(self, strategy):
@@ -0,0 +1,69 @@
+import sys
+import pickle
+
+import numpy as np
+
+from classes import Card
+from leduc_tree import LeducTree, NUM_COLUMNS
+
+
+def get_best_response_value(tree, edge_probabilities, br_player):
+    """
+       Expected utility of br_player when it best responds to the other player following edge_probabilities,
+       computed with one backward pass over the tree for all deals at once.
+       At each of its info sets the best responder picks the edge with the highest counterfactual value, which is the
+       value of the child summed over the deals of the info set, weighted by their chance and opponent reach.
+    """
+    opponent_reach = tree.forward_reach(edge_probabilities)[1 - br_player] * tree.deal_weights
+    sign = 1.0 if br_player == 0 else -1.0
+    values = sign * tree.payoffs
+    for player, level_internal_nodes, edge_start, edge_end, reduce_starts in reversed(tree.levels):
+        children_values = values[edge_start + 1:edge_end + 1]
+        if player != br_player:
+            values[level_internal_nodes] = np.add.reduceat(edge_probabilities[edge_start:edge_end] * children_values, reduce_starts, axis=0)
+            continue
+
+        num_edges = edge_end - edge_start
+        counterfactual_values = children_values * opponent_reach[edge_start + 1:edge_end + 1]
+        level_columns = tree.edge_flat_columns[edge_start:edge_end] - edge_start * NUM_COLUMNS
+        edge_grid = np.bincount(level_columns.ravel(), weights=counterfactual_values.ravel(), minlength=num_edges * NUM_COLUMNS).reshape(num_edges, NUM_COLUMNS)
+        counts = tree.num_children[level_internal_nodes]
+        best_values = np.repeat(np.maximum.reduceat(edge_grid, reduce_starts, axis=0), counts, axis=0)
+        # Tied edges have the same counterfactual value, so splitting the choice among them gives the same value
+        is_best = (edge_grid >= best_values).astype(np.float64)
+        choice = is_best / np.repeat(np.add.reduceat(is_best, reduce_starts, axis=0), counts, axis=0)
+        edge_choice = np.take_along_axis(choice, tree.edge_columns[edge_start:edge_end], axis=1)
+        values[level_internal_nodes] = np.add.reduceat(edge_choice * children_values, reduce_starts, axis=0)
+
+    return float(values[0] @ tree.deal_weights)
+
+
+def get_exploitability(tree, strategy_grid):
+    """Average, over both seats, of what a best response to strategy_grid wins per hand, in chips."""
+    edge_probabilities = tree.per_deal(strategy_grid)
+    return (get_best_response_value(tree, edge_probabilities, 0) + get_best_response_value(tree, edge_probabilities, 1)) / 2
+
+
+def get_exploitability_mbb(tree, strategy_grid):
+    """Exploitability in milli-big-blinds per hand."""
+    return get_exploitability(tree, strategy_grid) / tree.bb * 1000
+
+
+def evaluate_blueprint(node_dict, cards, total_chips, bb, is_bet_relative, tree=None):
+    """Exploitability, in milli-big-blinds per hand, of a blueprint dict in the NashBlueprintPolicy pickle format."""
+    tree = tree or LeducTree(cards, total_chips, bb, is_bet_relative)
+    return get_exploitability_mbb(tree, tree.strategy_grid_from_dict(node_dict))
+
+
+if __name__ == "__main__":
+
+    cards = [Card.Q, Card.Q, Card.K, Card.K, Card.A, Card.A]
+    total_chips = 12
+    bb = 1
+    is_bet_relative = False
+
+    tree = LeducTree(cards, total_chips, bb, is_bet_relative)
+    for blueprint_path in sys.argv[1:]:
+        with open(blueprint_path, 'rb') as f:
+            node_dict = pickle.load(f)
+        print(f'{blueprint_path}: {evaluate_blueprint(node_dict, cards, total_chips, bb, is_bet_relative, tree)} mbb/hand')
@@ -51,8 +51,31 @@ def generate_random_string(length):
     letters = string.ascii_letters
     return ''.join(random.choice(letters) for _ in range(length))
 
-def get_possible_actions(history, cards, player, opponent, players, phase, all_actions, bb, total_chips, is_bet_relative):
-    """Returns the reward if it's a terminal node, or the possible actions if it's not."""    
+def create_actions(total_chips, bb, is_bet_relative):
+    """Returns the list of betting actions of the modified Leduc game: pass plus every raise size."""
+    actions = [{"name": "k", "value": 0}]
+    min_bet = bb if is_bet_relative else 2*bb
+    for i in range(min_bet, total_chips + (0 if is_bet_relative else bb)):
+        actions.append({"name": f"r{i}", "value": i})
+    return actions
+
+def get_result_multiplier(cards, player, opponent):
+    """1 if the player wins the showdown, -1 if the opponent wins it and 0 on a tie."""
+    if cards[player] == cards[2]:
+        return 1
+    elif cards[opponent] == cards[2]:
+        return -1
+    elif cards[player] > cards[opponent]:
+        return 1
+    elif cards[player] < cards[opponent]:
+        return -1
+    else:
+        # cards[player] == cards[opponent]
+        return 0
+
+def get_betting_state(history, player, opponent, players, phase, all_actions, bb, total_chips, is_bet_relative):
+    """Returns (possible actions, reward, is showdown, next phase started) for a betting state.
+    The reward of a fold is final, a showdown's reward still has to be multiplied by get_result_multiplier."""
     my_previous_bets = players[player][ROUND_BET_VALUE]
     bet_difference_to_continue = players[opponent][ROUND_BET_VALUE] - my_previous_bets
 
@@ -83,54 +106,48 @@ def get_possible_actions(history, cards, player, opponent, players, phase, all_a
 
     def half(value):
         return value // 2
-    
-    def result_multiplier():
-        if cards[player] == cards[2]:
-            return 1
-        elif cards[opponent] == cards[2]:
-            return -1
-        elif cards[player] > cards[opponent]:
-            return 1
-        elif cards[player] < cards[opponent]:
-            return -1
-        else:
-            # cards[player] == cards[opponent]
-            return 0
         
     if bet_difference_to_continue < 0:
         # The opponent folded
         my_bet_total = players[player][ROUND_BET_VALUE]
         opponent_bet_total = players[opponent][ROUND_BET_VALUE]
         total_bet = my_bet_total + opponent_bet_total + bet_difference_to_continue
-        return None, half(total_bet), False
+        return None, half(total_bet), False, False
     
     if not players[player][PLAYED_CURRENT_PHASE] and bet_difference_to_continue == 0:
         possible_actions = filter_actions(0, players[player][CHIPS])
-        return possible_actions, None, False
+        return possible_actions, None, False, False
     
     if players[player][PLAYED_CURRENT_PHASE] and bet_difference_to_continue == 0:
         if phase == 'preflop':
             # if player 0 would end pre-flop, then the second player would start the flop, which is not what we want
             if player == 1:
                 possible_actions = filter_actions(0, 0)
-                return possible_actions, None, False
+                return possible_actions, None, False, False
             possible_actions = filter_actions(bet_difference_to_continue, players[player][CHIPS])
             assert players[player][ROUND_BET_VALUE] == players[opponent][ROUND_BET_VALUE]
-            return possible_actions, None, True
+            return possible_actions, None, False, True
         else:
-            # Showdown
+            # Showdown, both bets are equal so the pot is even and half of it is exact
             my_bet_total = players[player][ROUND_BET_VALUE]
             opponent_bet_total = players[opponent][ROUND_BET_VALUE]
             total_bet = my_bet_total + opponent_bet_total
             assert my_bet_total == opponent_bet_total
-            return None, half(total_bet * result_multiplier()), False
+            return None, half(total_bet), True, False
         
     if bet_difference_to_continue > 0:
         possible_actions = filter_actions(bet_difference_to_continue, players[player][CHIPS])
-        return possible_actions, None, False
+        return possible_actions, None, False, False
     
     raise Exception("Action or reward not found for history: " + history)
 
+def get_possible_actions(history, cards, player, opponent, players, phase, all_actions, bb, total_chips, is_bet_relative):
+    """Returns the reward if it's a terminal node, or the possible actions if it's not."""    
+    possible_actions, rewards, is_showdown, next_phase_started = get_betting_state(history, player, opponent, players, phase, all_actions, bb, total_chips, is_bet_relative)
+    if is_showdown:
+        rewards *= get_result_multiplier(cards, player, opponent)
+    return possible_actions, rewards, next_phase_started
+
 
 def set_bet_value(player, players, action_value, next_phase_started, is_bet_relative, possible_actions):
     opponent = 1 - player
@@ -167,6 +184,72 @@ def set_bet_value(player, players, action_value, next_phase_started, is_bet_rela
     result = '-' if is_filler_play else 'k' if is_check else 'c' if is_call else 'f' if is_fold else f'r{action_value*100}' if is_raise else None
     return tuple(new_players), result
 
+
+class BettingTable:
+    """
+       Cached get_possible_actions and set_bet_value for one game configuration. The betting states of the
+       modified Leduc game (chips, bets and played flags of both players, phase and player to act) are few,
+       so each one gets an id the first time it is reached and its legal actions, terminal reward and
+       transitions are computed only once. The training loop then moves between state ids instead of
+       rebuilding the action list and copying the player tuples on every edge.
+    """
+    def __init__(self, all_actions, bb, total_chips, is_bet_relative):
+        self.all_actions = all_actions
+        self.bb = bb
+        self.total_chips = total_chips
+        self.is_bet_relative = is_bet_relative
+
+        self.state_ids = {}
+        self.players = []
+        self.phases = []
+        self.acting_players = []
+        self.possible_actions = []
+        self.rewards = []
+        self.is_showdown = []
+        self.next_phase_started = []
+        # The phase in which the state's player acts, which is the flop when the state starts it
+        self.acting_phases = []
+        # Per state, action value -> (next state id, bet result)
+        self.transitions = []
+
+        initial_player = (total_chips - bb, bb, bb, False)
+        self.initial_state = self.get_state_id((initial_player, initial_player), 'preflop', 0)
+
+    def get_state_id(self, players, phase, player):
+        key = (players, phase, player)
+        state_id = self.state_ids.get(key)
+        if state_id is None:
+            possible_actions, rewards, is_showdown, next_phase_started = get_betting_state('', player, 1 - player, players, phase, self.all_actions, self.bb, self.total_chips, self.is_bet_relative)
+            state_id = self.state_ids[key] = len(self.players)
+            self.players.append(players)
+            self.phases.append(phase)
+            self.acting_players.append(player)
+            self.possible_actions.append(possible_actions)
+            self.rewards.append(rewards)
+            self.is_showdown.append(is_showdown)
+            self.next_phase_started.append(next_phase_started)
+            self.acting_phases.append('flop' if next_phase_started else phase)
+            self.transitions.append({})
+        return state_id
+
+    def get_possible_actions(self, state_id, cards):
+        """Same result as get_possible_actions for the state and the dealt cards."""
+        rewards = self.rewards[state_id]
+        if self.is_showdown[state_id]:
+            player = self.acting_players[state_id]
+            rewards *= get_result_multiplier(cards, player, 1 - player)
+        return self.possible_actions[state_id], rewards, self.next_phase_started[state_id]
+
+    def transition(self, state_id, action_value):
+        """Returns (next state id, bet result) of playing the action, as set_bet_value would."""
+        transition = self.transitions[state_id].get(action_value)
+        if transition is None:
+            player = self.acting_players[state_id]
+            updated_players, bet_result = set_bet_value(player, self.players[state_id], action_value, self.next_phase_started[state_id], self.is_bet_relative, self.possible_actions[state_id])
+            next_state_id = self.get_state_id(updated_players, self.acting_phases[state_id], 1 - player)
+            transition = self.transitions[state_id][action_value] = (next_state_id, bet_result)
+        return transition
+
 def create_json_from_pickle(pickle_file_path):
     with open(pickle_file_path, 'rb') as pickle_file:
         node_dict = pickle.load(pickle_file)
@@ -0,0 +1,99 @@
+from classes import Card
+from leduc_tree import NO_PUBLIC_CARD, NUM_COLUMNS, NUM_PUBLIC_SLOTS, NUM_RANKS, count_plays, info_set_key, walk_betting_tree
+
+
+class InfoSetEncoder:
+    """
+       Dense integer ids for the histories and info sets of the modified Leduc game, so the training hot loop
+       moves between histories with one list lookup per action instead of building and parsing strings.
+       The ids follow the walk of leduc_tree.walk_betting_tree, the one LeducTree numbers its nodes with, so every
+       process that builds an encoder with the same game parameters gets the same ids. The info set strings used as
+       keys by the blueprint pickles and by NashBlueprintPolicy are only produced when exporting, with info_set_string.
+    """
+    ROOT = 0
+
+    def __init__(self, all_actions, bb, total_chips, is_bet_relative):
+        self.all_actions = all_actions
+        self.bb = bb
+        self.total_chips = total_chips
+        self.is_bet_relative = is_bet_relative
+
+        self.history_strings = []
+        self.plays = []
+        self.children = []
+        # Values of the legal actions of each history where a player acts, None elsewhere
+        self.action_values = []
+        self.info_set_ids = []
+        self.info_set_histories = []
+        self.info_set_columns = []
+        self._history_ids = None
+
+        nodes = list(walk_betting_tree(all_actions, total_chips, bb, is_bet_relative))
+        # A phase change adds the '/' history between a node and its actions
+        node_history_ids = [self._add_history(history, count_plays(history)) for history, *_ in nodes]
+        acting_history_ids = [
+            self._add_child(history_id, '/') if next_phase_started else history_id
+            for history_id, (_, _, _, _, next_phase_started) in zip(node_history_ids, nodes)
+        ]
+
+        first_child = 1
+        for history_id, (_, _, phase, possible_actions, next_phase_started) in zip(acting_history_ids, nodes):
+            if possible_actions is None:
+                continue
+            self.action_values[history_id] = [action['value'] for action in possible_actions]
+            public_slots = range(NUM_RANKS) if next_phase_started or phase == 'flop' else [NO_PUBLIC_CARD]
+            for private_rank in range(NUM_RANKS):
+                for public_slot in public_slots:
+                    column = private_rank * NUM_PUBLIC_SLOTS + public_slot
+                    self.info_set_ids[history_id * NUM_COLUMNS + column] = len(self.info_set_histories)
+                    self.info_set_histories.append(history_id)
+                    self.info_set_columns.append(column)
+
+            for child in range(first_child, first_child + len(possible_actions)):
+                token = nodes[child][0][len(self.history_strings[history_id]):]
+                self.children[history_id][token] = node_history_ids[child]
+            first_child += len(possible_actions)
+
+    def _add_history(self, history_string, plays):
+        self.history_strings.append(history_string)
+        self.plays.append(plays)
+        self.children.append({})
+        self.action_values.append(None)
+        self.info_set_ids.extend([-1] * NUM_COLUMNS)
+        return len(self.history_strings) - 1
+
+    def _add_child(self, history_id, token):
+        child_id = self._add_history(self.history_strings[history_id] + token, self.plays[history_id])
+        self.children[history_id][token] = child_id
+        return child_id
+
+    @property
+    def num_info_sets(self):
+        return len(self.info_set_histories)
+
+    def get_action_values(self, info_set_id):
+        return self.action_values[self.info_set_histories[info_set_id]]
+
+    def child(self, history_id, token):
+        return self.children[history_id][token]
+
+    def get_info_set_id(self, history_id, private_card, public_card):
+        """Info set of the player holding private_card after history_id, public_card is None before the flop."""
+        public_slot = NO_PUBLIC_CARD if public_card is None else public_card.value - 1
+        return self.info_set_ids[history_id * NUM_COLUMNS + (private_card.value - 1) * NUM_PUBLIC_SLOTS + public_slot]
+
+    def info_set_string(self, info_set_id):
+        return info_set_key(self.history_strings[self.info_set_histories[info_set_id]], self.info_set_columns[info_set_id])
+
+    def encode(self, info_set_string):
+        """Id of an info set string from a blueprint pickle, or None if the game has no such info set."""
+        if self._history_ids is None:
+            self._history_ids = {history_string: history_id for history_id, history_string in enumerate(self.history_strings)}
+        history_string, cards_string = info_set_string.split(':|')
+        history_id = self._history_ids.get(history_string)
+        if history_id is None:
+            return None
+        private_card = Card[cards_string[0]]
+        public_card = Card[cards_string[2]] if len(cards_string) > 1 else None
+        info_set_id = self.get_info_set_id(history_id, private_card, public_card)
+        return None if info_set_id == -1 else info_set_id
@@ -0,0 +1,236 @@
+import re
+from collections import Counter, deque
+from itertools import permutations
+
+import numpy as np
+
+from classes import Card
+from functions import create_actions, get_possible_actions, set_bet_value
+
+PREFLOP, FLOP = 0, 1
+PHASE_NAMES = ['preflop', 'flop']
+RANKS = sorted(Card, key=lambda card: card.value)
+NUM_RANKS = len(RANKS)
+# Observation columns are private_rank * NUM_PUBLIC_SLOTS + public_slot, the last public slot means "no public card yet"
+NUM_PUBLIC_SLOTS = NUM_RANKS + 1
+NO_PUBLIC_CARD = NUM_RANKS
+NUM_COLUMNS = NUM_RANKS * NUM_PUBLIC_SLOTS
+
+
+def get_initial_players(total_chips, bb):
+    initial_player = (total_chips - bb, bb, bb, False)
+    return (initial_player, initial_player)
+
+
+def count_plays(history):
+    return len(re.sub(r'\d', '', history).replace('/', ''))
+
+
+def info_set_key(history, column):
+    """The info set string used as key by the blueprint pickles and NashBlueprintPolicy."""
+    private_rank, public_slot = divmod(int(column), NUM_PUBLIC_SLOTS)
+    public_card = '' if public_slot == NO_PUBLIC_CARD else f'/{RANKS[public_slot]}'
+    return f'{history}:|{RANKS[private_rank]}{public_card}'
+
+
+def walk_betting_tree(actions, total_chips, bb, is_bet_relative):
+    """
+       Walks the betting tree of the modified Leduc game breadth-first, with the rules get_possible_actions and
+       set_bet_value apply during training, and yields (history, players, phase, possible_actions, next_phase_started)
+       for every node. The history and phase are the ones before the '/' a phase change adds, possible_actions is None
+       at terminal nodes. The children of a node are yielded in the order of its possible actions, after the children
+       of every node yielded before it, so LeducTree and InfoSetEncoder number the same tree the same way.
+    """
+    placeholder_cards = [RANKS[0], RANKS[1], RANKS[2]]
+    queue = deque([('', get_initial_players(total_chips, bb), 'preflop')])
+    while queue:
+        history, players, phase = queue.popleft()
+        player = count_plays(history) % 2
+        possible_actions, _, next_phase_started = get_possible_actions(history, placeholder_cards, player, 1 - player, players, phase, actions, bb, total_chips, is_bet_relative)
+        yield history, players, phase, possible_actions, next_phase_started
+        if possible_actions is None:
+            continue
+
+        updated_phase = 'flop' if next_phase_started else phase
+        updated_history = history + '/' if next_phase_started else history
+        for action in possible_actions:
+            updated_players, bet_result = set_bet_value(player, players, action['value'], next_phase_started, is_bet_relative, possible_actions)
+            queue.append((updated_history + bet_result, updated_players, updated_phase))
+
+
+def get_deals(cards):
+    """Returns every distinct (p0 card, p1 card, public card) rank triple of the deck and its probability."""
+    deal_counter = Counter((a.value - 1, b.value - 1, c.value - 1) for a, b, c in permutations(cards, 3))
+    total_deals = sum(deal_counter.values())
+    deals = sorted(deal_counter)
+    weights = [deal_counter[deal] / total_deals for deal in deals]
+    return np.array(deals, dtype=np.int64), np.array(weights, dtype=np.float64)
+
+
+class LeducTree:
+    """
+       The betting tree of the modified Leduc game in flat array form, enumerated once with the same rules that
+       get_possible_actions and set_bet_value apply during training.
+       Nodes are numbered breadth-first, so each depth is a contiguous slice of nodes and of edges, and the
+       children of node n are the edges child_offsets[n]:child_offsets[n + 1], whose child nodes are also contiguous.
+       Payoffs are stored for player 0 and for every chance outcome (deal), so a CFR pass can handle all deals at once.
+    """
+    def __init__(self, cards, total_chips, bb, is_bet_relative, actions=None):
+        self.total_chips = total_chips
+        self.bb = bb
+        self.is_bet_relative = is_bet_relative
+        self.actions = actions if actions is not None else create_actions(total_chips, bb, is_bet_relative)
+        self.deals, self.deal_weights = get_deals(cards)
+        self.num_deals = len(self.deals)
+
+        self._enumerate_nodes()
+        self._build_payoffs(cards)
+        self._build_columns()
+
+    def _enumerate_nodes(self):
+        histories, players_states, depths = [], [], []
+        node_player, node_phase, is_terminal = [], [], []
+        child_offsets, edge_parent, edge_action_value, edge_action_index = [0], [], [], []
+        action_indices = {action['value']: index for index, action in enumerate(self.actions)}
+
+        for node, (history, players, phase, possible_actions, next_phase_started) in enumerate(walk_betting_tree(self.actions, self.total_chips, self.bb, self.is_bet_relative)):
+            plays = count_plays(history)
+            histories.append(history + '/' if next_phase_started else history)
+            players_states.append(players)
+            depths.append(plays)
+            node_player.append(plays % 2)
+            node_phase.append(PHASE_NAMES.index('flop' if next_phase_started else phase))
+            is_terminal.append(possible_actions is None)
+            if possible_actions is not None:
+                for action in possible_actions:
+                    edge_parent.append(node)
+                    edge_action_value.append(action['value'])
+                    edge_action_index.append(action_indices[action['value']])
+            child_offsets.append(len(edge_parent))
+
+        self.histories = histories
+        self._players_states = players_states
+        self.num_nodes = len(histories)
+        self.num_edges = len(edge_parent)
+        self.node_player = np.array(node_player, dtype=np.int64)
+        self.node_phase = np.array(node_phase, dtype=np.int64)
+        self.node_depth = np.array(depths, dtype=np.int64)
+        self.is_terminal = np.array(is_terminal, dtype=bool)
+        self.child_offsets = np.array(child_offsets, dtype=np.int64)
+        self.num_children = np.diff(self.child_offsets)
+        self.edge_parent = np.array(edge_parent, dtype=np.int64)
+        # Node 0 is the root, every other node is the child of exactly one edge, in edge order
+        self.edge_child = np.arange(1, self.num_nodes, dtype=np.int64)
+        self.edge_action_value = np.array(edge_action_value, dtype=np.int64)
+        self.edge_action_index = np.array(edge_action_index, dtype=np.int64)
+        self.edge_player = self.node_player[self.edge_parent]
+        self.edge_phase = self.node_phase[self.edge_parent]
+        self.internal_nodes = np.flatnonzero(~self.is_terminal)
+        self.terminal_nodes = np.flatnonzero(self.is_terminal)
+
+        # Every edge is one play, so the depth of a node tells whose turn it is and a whole level has a single player
+        assert (self.node_player == self.node_depth % 2).all()
+        self.max_depth = int(self.node_depth.max())
+        self.levels = []
+        for depth in range(self.max_depth + 1):
+            level_internal_nodes = self.internal_nodes[self.node_depth[self.internal_nodes] == depth]
+            if len(level_internal_nodes) == 0:
+                continue
+            edge_start = int(self.child_offsets[level_internal_nodes[0]])
+            edge_end = int(self.child_offsets[level_internal_nodes[-1] + 1])
+            reduce_starts = self.child_offsets[level_internal_nodes] - edge_start
+            self.levels.append((depth % 2, level_internal_nodes, edge_start, edge_end, reduce_starts))
+
+    def _build_payoffs(self, cards):
+        """Utility of player 0 at every terminal node for every deal, from get_possible_actions' terminal rewards."""
+        cards_by_rank = {card.value - 1: card for card in cards}
+        self.payoffs = np.zeros((self.num_nodes, self.num_deals), dtype=np.float64)
+        for node in self.terminal_nodes:
+            player = int(self.node_player[node])
+            sign = 1 if player == 0 else -1
+            phase = PHASE_NAMES[self.node_phase[node]]
+            for deal_index, deal in enumerate(self.deals):
+                deal_cards = [cards_by_rank[rank] for rank in deal]
+                _, rewards, _ = get_possible_actions(self.histories[node], deal_cards, player, 1 - player, self._players_states[node], phase, self.actions, self.bb, self.total_chips, self.is_bet_relative)
+                self.payoffs[node, deal_index] = sign * rewards
+        del self._players_states
+
+    def _build_columns(self):
+        """Observation column of each player, in each phase, for each deal, and the same per edge."""
+        self.observation_columns = np.zeros((2, 2, self.num_deals), dtype=np.int64)
+        for player in range(2):
+            private_ranks = self.deals[:, player]
+            self.observation_columns[player, PREFLOP] = private_ranks * NUM_PUBLIC_SLOTS + NO_PUBLIC_CARD
+            self.observation_columns[player, FLOP] = private_ranks * NUM_PUBLIC_SLOTS + self.deals[:, 2]
+        self.edge_columns = self.observation_columns[self.edge_player, self.edge_phase]
+        self.edge_flat_columns = np.arange(self.num_edges)[:, None] * NUM_COLUMNS + self.edge_columns
+
+        # A (node, column) pair is an info set only if some deal with positive probability reaches it
+        self.node_has_column = np.zeros((self.num_nodes, NUM_COLUMNS), dtype=bool)
+        for node in self.internal_nodes:
+            self.node_has_column[node, self.observation_columns[self.node_player[node], self.node_phase[node]]] = True
+
+    def info_set_key(self, node, column):
+        """The info set string used as key by the blueprint pickles and NashBlueprintPolicy."""
+        return info_set_key(self.histories[node], column)
+
+    def info_sets(self):
+        """Yields (info set key, node, column) for every info set of the tree."""
+        for node in self.internal_nodes:
+            for column in np.flatnonzero(self.node_has_column[node]):
+                yield self.info_set_key(node, column), int(node), int(column)
+
+    def sum_by_column(self, edge_values):
+        """Sums an [edges, deals] array into the [edges, columns] grid of the info sets each deal belongs to."""
+        return np.bincount(self.edge_flat_columns.ravel(), weights=edge_values.ravel(), minlength=self.num_edges * NUM_COLUMNS).reshape(self.num_edges, NUM_COLUMNS)
+
+    def per_deal(self, edge_grid):
+        """Gathers an [edges, columns] grid into the [edges, deals] values seen by each deal."""
+        return np.take_along_axis(edge_grid, self.edge_columns, axis=1)
+
+    def normalize(self, edge_grid):
+        """Normalizes non-negative edge values over the siblings of each info set, uniform when they sum to 0."""
+        starts = self.child_offsets[self.internal_nodes]
+        counts = self.num_children[self.internal_nodes]
+        sums = np.repeat(np.add.reduceat(edge_grid, starts, axis=0), counts, axis=0)
+        uniform = np.repeat(1.0 / counts, counts)[:, None]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(sums > 0, edge_grid / sums, uniform)
+
+    def strategy_grid_from_dict(self, node_dict):
+        """Builds an [edges, columns] strategy grid from a blueprint dict, uniform for missing info sets."""
+        grid = self.normalize(np.zeros((self.num_edges, NUM_COLUMNS)))
+        for key, node, column in self.info_sets():
+            if key not in node_dict:
+                continue
+            action_values, strategy = node_dict[key]
+            probabilities = dict(zip(action_values, strategy))
+            start, end = self.child_offsets[node], self.child_offsets[node + 1]
+            for edge in range(start, end):
+                grid[edge, column] = probabilities.get(int(self.edge_action_value[edge]), 0.0)
+        return grid
+
+    def strategy_grid_to_dict(self, edge_grid):
+        """Exports an [edges, columns] strategy grid in the blueprint pickle format, sorted by info set."""
+        node_dict = {}
+        for key, node, column in sorted(self.info_sets()):
+            start, end = self.child_offsets[node], self.child_offsets[node + 1]
+            node_dict[key] = (self.edge_action_value[start:end].tolist(), edge_grid[start:end, column].tolist())
+        return node_dict
+
+    def forward_reach(self, edge_probabilities):
+        """Reach probability of each player, [2, nodes, deals], given the per-deal probability of every edge."""
+        reach = np.ones((2, self.num_nodes, self.num_deals))
+        for player, _, edge_start, edge_end, _ in self.levels:
+            children = slice(edge_start + 1, edge_end + 1)
+            reach[:, children] = reach[:, self.edge_parent[edge_start:edge_end]]
+            reach[player, children] *= edge_probabilities[edge_start:edge_end]
+        return reach
+
+    def backward_values(self, edge_probabilities):
+        """Expected utility of player 0 at every node, [nodes, deals], when both players follow the edge probabilities."""
+        values = self.payoffs.copy()
+        for _, level_internal_nodes, edge_start, edge_end, reduce_starts in reversed(self.levels):
+            weighted = edge_probabilities[edge_start:edge_end] * values[edge_start + 1:edge_end + 1]
+            values[level_internal_nodes] = np.add.reduceat(weighted, reduce_starts, axis=0)
+        return values
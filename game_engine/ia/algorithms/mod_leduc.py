@@ -3,12 +3,14 @@ import collections
 import logging
 from enum import Enum
 import os
-from functions import color_print, create_file, float_to_custom_string, get_possible_actions, set_bet_value, generate_random_string
-from classes import HistoryNode, InfoSetNode, Card
+from functions import BettingTable, color_print, create_actions, create_file, float_to_custom_string, generate_random_string
+from classes import HistoryNode, InfoSetNode, RegretTable, Card
+from info_set_encoder import InfoSetEncoder
+from cfr_variants import get_cfr_variant
+from exploitability import get_exploitability_mbb
+from leduc_tree import LeducTree
 import time
 import pickle
-import multiprocessing
-import re
 from types import MappingProxyType
 from concurrent.futures import ProcessPoolExecutor
 
@@ -16,6 +18,22 @@ total_regret_sum = 0
 # num_processes = multiprocessing.cpu_count()
 # pool = multiprocessing.Pool(processes=num_processes)  # Create a Pool of worker processes
 
+
+def run_training_shard(args):
+    """Runs iterations first..last-1 on a worker's copy of the trainer and returns what they added to the tables."""
+    global total_regret_sum
+    trainer, first, last, model_A_is_p0, seed = args
+    random.seed(seed)
+    snapshot = trainer.get_table_snapshot()
+    initial_total_regret_sum = total_regret_sum
+    rewards = [0, 0]
+    for i in range(first, last):
+        rewardA, rewardB = trainer.run_iteration(i, model_A_is_p0)
+        rewards[0] += rewardA
+        rewards[1] += rewardB
+    return rewards, total_regret_sum - initial_total_regret_sum, trainer.get_table_delta(snapshot)
+
+
 class ModLeducTrainer:
     """
        The AI's wil play a version of Leduc Poker with 5 possible actions: pass, bet 1, bet 2, bet 3, and bet 4. 
@@ -34,16 +52,18 @@ class ModLeducTrainer:
     """
     # How can we handle situations where not all actions are alowed?
 
-    def __init__(self, iterations, algorithm, cards, exploring_phase, exploration_type, total_action_symbol, min_reality_weight, decrese_weight_of_initial_strategies, total_chips, sb, bb, is_bet_relative, fixed_strategyA=None, fixed_strategyB=None):
+    def __init__(self, iterations, algorithm, cards, exploring_phase, exploration_type, total_action_symbol, min_reality_weight, decrese_weight_of_initial_strategies, total_chips, sb, bb, is_bet_relative, fixed_strategyA=None, fixed_strategyB=None, num_workers=1, merge_every=10000, seed=None, cfr_variant='vanilla', discount_every=1, exploitability_every=None, target_exploitability=None):
         self.max_bet = total_chips - 1
         self.total_chips = total_chips
         self.sb, self.bb = sb, bb
-        self.Actions = [{"name": "k", "value": 0}]
-        min_bet = bb if is_bet_relative else 2*bb
-        for i in range(min_bet, total_chips + (0 if is_bet_relative else bb)):
-            self.Actions.append({"name": f"r{i}", "value": i})
+        self.Actions = create_actions(total_chips, bb, is_bet_relative)
         self.is_bet_relative = is_bet_relative
+        self.encoder = InfoSetEncoder(self.Actions, bb, total_chips, is_bet_relative)
+        self.betting_table = BettingTable(self.Actions, bb, total_chips, is_bet_relative)
 
+        # The node maps are keyed by the encoder's info set ids, the info set strings are only used to export.
+        # The learning nodes are views over regret_table, which holds the sums of every info set
+        self.regret_table = RegretTable([len(self.encoder.get_action_values(info_set_id)) for info_set_id in range(self.encoder.num_info_sets)])
         self.node_history_map = {}
         self.node_history_mapA = self.node_history_map
         self.node_history_mapB = self.node_history_map
@@ -56,7 +76,13 @@ class ModLeducTrainer:
         self.exploration_type = exploration_type
         self.fixed_strategyA = fixed_strategyA
         self.fixed_strategyB = fixed_strategyB
-        self.model_name = f'{self.algorithm}-{len(self.cards)}cards-{self.max_bet}maxbet-EP{self.exploration_type}{float_to_custom_string(self.exploring_phase)}-mRW{float_to_custom_string(min_reality_weight)}-iter{self.iterations}'
+        self.cfr_variant = get_cfr_variant(cfr_variant)
+        self.discount_every = discount_every
+        if not self.cfr_variant.is_vanilla and num_workers > 1:
+            # Shards would train on regrets the variant only clamps and discounts once per merge
+            raise ValueError(f'The {self.cfr_variant.name} variant needs num_workers=1, only vanilla CFR trains in parallel.')
+        variant_name = '' if self.cfr_variant.is_vanilla else f'-{self.cfr_variant.name}'
+        self.model_name = f'{self.algorithm}-{len(self.cards)}cards-{self.max_bet}maxbet-EP{self.exploration_type}{float_to_custom_string(self.exploring_phase)}-mRW{float_to_custom_string(min_reality_weight)}-iter{self.iterations}{variant_name}'
 
         self.is_model_fixed = (fixed_strategyA is not None), (fixed_strategyB is not None)
         self.is_there_a_learning_model = not (self.is_model_fixed[0] and self.is_model_fixed[1])
@@ -68,11 +94,44 @@ class ModLeducTrainer:
         self.min_reality_weight = min_reality_weight
         self.decrese_weight_of_initial_strategies = decrese_weight_of_initial_strategies
 
+        # With more than one worker, each worker trains on its own copy of the tables for merge_every iterations,
+        # then the regret and strategy deltas are merged in worker order, so a seed and worker count give one result.
+        # A single process is seeded with seed when one is given
+        self.num_workers = num_workers
+        self.merge_every = merge_every
+        self.seed = seed if seed is not None or num_workers == 1 else random.getrandbits(64)
+
+        # Every exploitability_every iterations the average strategy is evaluated against a best response,
+        # training stops early once it is at most target_exploitability milli-big-blinds per hand
+        self.exploitability_every = exploitability_every
+        self.target_exploitability = target_exploitability
+        self.exploitability_log = []
+        self.tree = None
+
         self.create_nodes_from_pickle(fixed_strategyA, fixed_strategyB)
         self.log(f'../analysis/logs/{self.model_name}.log')
         self.train()
         
 
+    def __getstate__(self):
+        # Memoryviews can't be pickled, so the learning nodes are left out and recreated from regret_table on their next visit.
+        state = dict(self.__dict__)
+        state['node_history_map'] = None
+        # The evaluation tree is only needed by the process that merges the shards
+        state['tree'] = None
+        for key in ('node_history_mapA', 'node_history_mapB'):
+            if state[key] is self.node_history_map:
+                state[key] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.node_history_map = {}
+        if self.node_history_mapA is None:
+            self.node_history_mapA = self.node_history_map
+        if self.node_history_mapB is None:
+            self.node_history_mapB = self.node_history_map
+
     def create_nodes_from_pickle(self, fileA, fileB):
         current_directory = os.path.dirname(os.path.abspath(__file__))
 
@@ -82,9 +141,12 @@ class ModLeducTrainer:
             with open(blueprints_directory_pA, 'rb') as f:
                 dict_map_pA = pickle.load(f)
             for key, value in dict_map_pA.items():
+                info_set_id = self.encoder.encode(key)
+                if info_set_id is None:
+                    continue
                 action_values, strategy = value
                 actions = list(filter(lambda a: a['value'] in action_values, self.Actions))
-                node_history_mapA[key] = InfoSetNode(key, actions, strategy)
+                node_history_mapA[info_set_id] = InfoSetNode(key, actions, strategy)
             # self.node_history_mapA = MappingProxyType(node_history_mapA)
             self.node_history_mapA = node_history_mapA
         if fileB is not None:
@@ -93,9 +155,12 @@ class ModLeducTrainer:
             with open(blueprints_directory_pB, 'rb') as f:
                 dict_map_pB = pickle.load(f)
             for key, value in dict_map_pB.items():
+                info_set_id = self.encoder.encode(key)
+                if info_set_id is None:
+                    continue
                 action_values, strategy = value
                 actions = list(filter(lambda a: a['value'] in action_values, self.Actions))
-                node_history_mapB[key] = InfoSetNode(key, actions, strategy)
+                node_history_mapB[info_set_id] = InfoSetNode(key, actions, strategy)
             # self.node_history_mapB = MappingProxyType(node_history_mapB)
             self.node_history_mapB = node_history_mapB
 
@@ -119,9 +184,10 @@ class ModLeducTrainer:
             columns += f"{action['name']} ".ljust(13)
             
         print(f"Columns             : {columns}")
-        for n in sorted(self.node_history_map.values()):
+        learning_nodes = sorted(self.get_learning_nodes())
+        for n in learning_nodes:
             print(n.color_print_node(self.Actions))
-        print(f"Size of model node map = {len(self.node_history_map)}, should be 249\n")
+        print(f"Size of model node map = {len(learning_nodes)}, should be 249\n")
 
     def train(self):
         """If you call the train method multiple times with the same parameters, it won't produce the
@@ -132,19 +198,12 @@ class ModLeducTrainer:
         print(f"Parameters: {self.model_name}\n")
 
         sum_of_rewards = [0] * 2
-        """ p0 and p1 store, respectively, the probability of the player 0 and player 1 reaching the current node,
-        from its "parent" node """
         iterations = self.iterations
-        p0 = 1
-        p1 = 1
-        chips = self.total_chips - self.bb
-        turn_bet_value = self.bb
-        round_bet_value = self.bb
-        played_current_phase = False
         final_avg_game_valueA = 0
 
         start_time = time.time()
         times_running = 1 if not self.is_model_fixed[0] and not self.is_model_fixed[1] else 2
+        executor = ProcessPoolExecutor(max_workers=self.num_workers) if self.num_workers > 1 else None
         for p in range(times_running):
             model_A_is_p0 = 1 - p
             if self.is_model_fixed[0] is not None or self.is_model_fixed[1] is not None:
@@ -153,47 +212,51 @@ class ModLeducTrainer:
                 else:
                     print(f"Player {self.fixed_strategyB or 'training model'} is starting.")
 
-            for i in range(iterations):
-                total_iteration = i + p * iterations + 1
-                random.shuffle(self.cards)
-                initial_player = (chips, turn_bet_value, round_bet_value, played_current_phase)
-                players = (initial_player, initial_player)
-                is_exploring_phase = i < self.exploring_phase * iterations
-                iteration_reward = self.nash_equilibrium_algorithm(self.cards, "", p0, p1, players, 'preflop', is_exploring_phase, model_A_is_p0, None, self.node_history_mapA, self.node_history_mapB)
-                sum_of_rewards[0] += model_A_is_p0 * (iteration_reward * (not is_exploring_phase))
-                sum_of_rewards[1] += (not model_A_is_p0) * (iteration_reward * (not is_exploring_phase))
-                
-                if i % 1 == 0: #quando fazer o log
-                    # avg_regret = 0
-                    # for n in self.node_history_mapA.values():
-                    #     avg_regret += sum(n.regret_sum)
-                    # for n in self.node_history_mapB.values():
-                    #     avg_regret += sum(n.regret_sum)
-                    # avg_regret2 = sum((sum(n.regret_sum) / len(n.regret_sum)) for n in self.node_history_mapA.values()) / (len(self.node_history_mapA.values()) * total_iteration)
-                    
-                    sample_iteration = {
-                        'index': i,
-                        'avg_game_valueA': final_avg_game_valueA or sum_of_rewards[0], #/ max((i + 1) - self.exploring_phase * iterations, 1),
-                        # 'avg_game_valueB': sum_of_rewards[1] / max((i + 1) - self.exploring_phase * iterations, 1),
-                        # 'avg_regretA': avg_regret2
-                        'avg_regretA': total_regret_sum / (len(self.node_history_mapA.values()) * total_iteration)
-                        # 'avg_regretB': sum((sum(n.regret_sum) / len(n.regret_sum)) for n in self.node_history_mapB.values()) / (len(self.node_history_mapB.values()) * total_iteration),
-                    }
-                    self.logger.info('', extra=sample_iteration)
-
-                if i % 400000 == 0: #quando fazer o pkl
-                    print("iteration: ", i)
-                    pickle_name = f'{self.model_name}-it{i}.pkl'
-                    iteration_strategy_path = f'../analysis/strategy_snapshots/{pickle_name}'
-                    create_file(iteration_strategy_path)
-                    node_dict = {}
-                    for n in sorted(self.node_history_map.values()):
-                        node_dict[n.info_set] = (list(map(lambda a: a['value'], n.actions)), n.get_average_strategy())
-                    with open(iteration_strategy_path, 'wb') as file:
-                        pickle.dump(node_dict, file)
-                
+            if executor is None:
+                if self.seed is not None:
+                    random.seed(f'{self.seed}-{p}')
+                for i in range(iterations):
+                    rewards = self.run_iteration(i, model_A_is_p0)
+                    sum_of_rewards[0] += rewards[0]
+                    sum_of_rewards[1] += rewards[1]
+                    self.apply_cfr_variant(i, i + 1)
+                    self.log_iteration(i, i + p * iterations + 1, final_avg_game_valueA or sum_of_rewards[0])
+                    if i % 400000 == 0: #quando fazer o pkl
+                        self.save_snapshot(i)
+                    if self.exploitability_every and (i + 1) % self.exploitability_every == 0 and self.is_target_reached(i + p * iterations + 1):
+                        # The averages below use the iterations that actually ran
+                        iterations = i + 1
+                        break
+            else:
+                epoch_size = self.num_workers * self.merge_every
+                for epoch, epoch_start in enumerate(range(0, iterations, epoch_size)):
+                    shards = []
+                    for worker in range(self.num_workers):
+                        first = epoch_start + worker * self.merge_every
+                        last = min(first + self.merge_every, iterations)
+                        if first < last:
+                            shards.append((self, first, last, model_A_is_p0, f'{self.seed}-{p}-{epoch}-{worker}'))
+                    for rewards, regret_sum_delta, table_delta in executor.map(run_training_shard, shards):
+                        sum_of_rewards[0] += rewards[0]
+                        sum_of_rewards[1] += rewards[1]
+                        self.merge_table_delta(table_delta, regret_sum_delta)
+
+                    last_iteration = min(epoch_start + epoch_size, iterations) - 1
+                    self.log_iteration(last_iteration, last_iteration + p * iterations + 1, final_avg_game_valueA or sum_of_rewards[0])
+                    next_snapshot_iteration = -(-epoch_start // 400000) * 400000
+                    if next_snapshot_iteration <= last_iteration:
+                        self.save_snapshot(last_iteration)
+                    is_evaluation_due = self.exploitability_every and epoch_start // self.exploitability_every < (last_iteration + 1) // self.exploitability_every
+                    if is_evaluation_due and self.is_target_reached(last_iteration + p * iterations + 1):
+                        iterations = last_iteration + 1
+                        break
 
             final_avg_game_valueA = sum_of_rewards[0] / (iterations * (1 - self.exploring_phase))
+            if iterations < self.iterations:
+                break
+
+        if executor is not None:
+            executor.shutdown()
 
         # if at least one of the players is not a fixed strategy, print their average strategy
         algorithm_id = generate_random_string(3)
@@ -214,13 +277,8 @@ class ModLeducTrainer:
             # self.print_model(self.Actions, sum_of_rewards, iterations)
             pickle_name = f'{algorithm_id}{adversary_id}-{self.model_name}.pkl'
             final_strategy_path = f'../analysis/blueprints/{pickle_name}'
-            create_file(final_strategy_path)
-            node_dict = {}
-            for n in sorted(self.node_history_map.values()):
-                node_dict[n.info_set] = (list(map(lambda a: a['value'], n.actions)), n.get_average_strategy())
-            with open(final_strategy_path, 'wb') as file:
-                pickle.dump(node_dict, file)
-            
+            self.save_node_dict(final_strategy_path)
+
         end_time = time.time()
         elapsed_time = end_time - start_time
         if adversary_name:
@@ -228,20 +286,117 @@ class ModLeducTrainer:
         if self.is_there_a_learning_model:
             print(f"{algorithm_id}{adversary_id}-{self.model_name} took {elapsed_time} seconds to run.")
 
-    def get_info_set_node(self, info_set, is_model_B, is_current_model_fixed, possible_actions, my_cards, node_history_mapA, node_history_mapB):
-        """Returns a node for the given information set. Creates the node if it doesn't exist."""
+    def run_iteration(self, i, model_A_is_p0):
+        """Plays one training iteration and returns the rewards it adds to model A and to model B."""
+        """ p0 and p1 store, respectively, the probability of the player 0 and player 1 reaching the current node,
+        from its "parent" node """
+        p0 = 1
+        p1 = 1
+
+        random.shuffle(self.cards)
+        is_exploring_phase = i < self.exploring_phase * self.iterations
+        iteration_reward = self.nash_equilibrium_algorithm(self.cards, InfoSetEncoder.ROOT, self.betting_table.initial_state, p0, p1, is_exploring_phase, model_A_is_p0, None, self.node_history_mapA, self.node_history_mapB)
+        return model_A_is_p0 * (iteration_reward * (not is_exploring_phase)), (not model_A_is_p0) * (iteration_reward * (not is_exploring_phase))
+
+    def apply_cfr_variant(self, first, last):
+        """Applies the CFR variant's discounting for every discount interval that ends in iterations first..last-1."""
+        if self.cfr_variant.is_vanilla:
+            return
+        for t in range(first // self.discount_every + 1, last // self.discount_every + 1):
+            self.cfr_variant.apply(self.regret_table.regret_sum, self.regret_table.strategy_sum, t)
+
+    def log_iteration(self, i, total_iteration, avg_game_valueA):
+        # avg_regret = 0
+        # for n in self.node_history_mapA.values():
+        #     avg_regret += sum(n.regret_sum)
+        # for n in self.node_history_mapB.values():
+        #     avg_regret += sum(n.regret_sum)
+        # avg_regret2 = sum((sum(n.regret_sum) / len(n.regret_sum)) for n in self.node_history_mapA.values()) / (len(self.node_history_mapA.values()) * total_iteration)
+
+        sample_iteration = {
+            'index': i,
+            'avg_game_valueA': avg_game_valueA, #/ max((i + 1) - self.exploring_phase * iterations, 1),
+            # 'avg_game_valueB': sum_of_rewards[1] / max((i + 1) - self.exploring_phase * iterations, 1),
+            # 'avg_regretA': avg_regret2
+            'avg_regretA': total_regret_sum / (self.get_num_nodes(self.node_history_mapA) * total_iteration)
+            # 'avg_regretB': sum((sum(n.regret_sum) / len(n.regret_sum)) for n in self.node_history_mapB.values()) / (len(self.node_history_mapB.values()) * total_iteration),
+        }
+        self.logger.info('', extra=sample_iteration)
+
+    def get_num_nodes(self, node_history_map):
+        if node_history_map is self.node_history_map:
+            return self.regret_table.num_visited()
+        return len(node_history_map)
+
+    def save_snapshot(self, i):
+        print("iteration: ", i)
+        pickle_name = f'{self.model_name}-it{i}.pkl'
+        self.save_node_dict(f'../analysis/strategy_snapshots/{pickle_name}')
+
+    def get_node_dict(self):
+        node_dict = {}
+        for n in sorted(self.get_learning_nodes()):
+            node_dict[n.info_set] = (list(map(lambda a: a['value'], n.actions)), n.get_average_strategy())
+        return node_dict
+
+    def save_node_dict(self, path):
+        create_file(path)
+        node_dict = self.get_node_dict()
+        with open(path, 'wb') as file:
+            pickle.dump(node_dict, file)
+
+    def is_target_reached(self, total_iteration):
+        """Logs the exploitability of the learning model's average strategy and tells if it reached the target."""
+        if self.tree is None:
+            self.tree = LeducTree(self.cards, self.total_chips, self.bb, self.is_bet_relative, self.Actions)
+        exploitability = get_exploitability_mbb(self.tree, self.tree.strategy_grid_from_dict(self.get_node_dict()))
+        self.exploitability_log.append((total_iteration, exploitability))
+        print(f"iteration: {total_iteration}, exploitability: {exploitability} mbb/hand")
+        return self.target_exploitability is not None and exploitability <= self.target_exploitability
+
+    def get_table_snapshot(self):
+        """Copies the arrays of the regret table, to later compute what a training shard changed."""
+        return self.regret_table.copy_arrays()
+
+    def get_table_delta(self, snapshot):
+        """Returns the slots of the regret table changed since the snapshot and how much each one changed."""
+        return self.regret_table.get_delta(snapshot)
+
+    def merge_table_delta(self, table_delta, regret_sum_delta):
+        global total_regret_sum
+        self.regret_table.add_delta(table_delta)
+        total_regret_sum += regret_sum_delta
+
+    def create_learning_node(self, info_set_id, actions):
+        node = self.node_history_map[info_set_id] = InfoSetNode(self.encoder.info_set_string(info_set_id), actions, None, self.regret_table, info_set_id)
+        return node
+
+    def get_learning_nodes(self):
+        """Nodes of every info set the learning model visited, including the ones merged from training shards."""
+        nodes = []
+        for info_set_id in self.regret_table.visited_info_set_ids():
+            node = self.node_history_map.get(info_set_id)
+            if node is None:
+                action_values = self.encoder.get_action_values(info_set_id)
+                node = self.create_learning_node(info_set_id, [action for action in self.Actions if action['value'] in action_values])
+            nodes.append(node)
+        return nodes
+
+    def get_info_set_node(self, info_set_id, is_model_B, is_current_model_fixed, possible_actions, node_history_mapA, node_history_mapB):
+        """Returns a node for the given information set id. Creates the node if it doesn't exist."""
         if not is_current_model_fixed:
-            # assert node_history_mapA == node_history_mapB
-            # return node_history_mapA.next_histories.setdefault(my_cards, InfoSetNode(my_cards, possible_actions, None))
-            return self.node_history_map.setdefault(info_set, InfoSetNode(info_set, possible_actions, None))
-        else:
+            node = self.node_history_map.get(info_set_id)
+            if node is None:
+                node = self.create_learning_node(info_set_id, possible_actions)
+            return node
+
+        node_history_map = self.node_history_mapB if is_model_B else self.node_history_mapA
+        node = node_history_map.get(info_set_id)
+        if node is None:
             num_of_possible_actions = len(possible_actions)
             filler_strategy = [1/num_of_possible_actions for _ in range(num_of_possible_actions)]
-
-            if is_model_B:
-                return self.node_history_mapB.setdefault(info_set, InfoSetNode(info_set, possible_actions, filler_strategy))
-            else:
-                return self.node_history_mapA.setdefault(info_set, InfoSetNode(info_set, possible_actions, filler_strategy))
+            node = node_history_map[info_set_id] = InfoSetNode(self.encoder.info_set_string(info_set_id), possible_actions, filler_strategy)
+        return node
             
     # def create_history_node(self, node_history_mapA, node_history_mapB, bet_result):
     #     historyA = node_history_mapA.full_history
@@ -256,55 +411,48 @@ class ModLeducTrainer:
     #     return node_history_mapA.info_sets[cards], node_history_mapB.info_sets[cards]
 
 
-    def perform_action_wrapper(self, args):
-        (cards, updated_history, p0, p1, updated_players, updated_phase, strategy, player, action, action_index, is_exploring_phase, model_A_is_p0, action_string, alternative_play, node_history_mapA, node_history_mapB) = args
-        return self.perform_action(cards, updated_history, p0, p1, updated_players, updated_phase, strategy, player, action, action_index, is_exploring_phase, model_A_is_p0, action_string, alternative_play, node_history_mapA, node_history_mapB), action_index
-
-    def perform_action(self, cards, history, p0, p1, players, phase, strategy, player, action, action_index, is_exploring_phase, model_A_is_p0, action_string, alternative_play, node_history_mapA, node_history_mapB):
+    def perform_action(self, cards, history_id, state_id, p0, p1, strategy, player, action, action_index, is_exploring_phase, model_A_is_p0, action_string, alternative_play, node_history_mapA, node_history_mapB):
         action_char = action_string or self.action_symbol[action['value']]
-        next_history = history + action_char
+        next_history_id = self.encoder.child(history_id, action_char)
         # node_action_utility receives a negative values because we are alternating between players,
         # and in the Leduc Poker game, the reward for a player is the opposite of the other player's reward
         if player == 0:
-            node_action_utility = -self.nash_equilibrium_algorithm(cards, next_history, p0 * strategy[action_index], p1, players, phase, is_exploring_phase, model_A_is_p0, alternative_play, node_history_mapA, node_history_mapB)
+            node_action_utility = -self.nash_equilibrium_algorithm(cards, next_history_id, state_id, p0 * strategy[action_index], p1, is_exploring_phase, model_A_is_p0, alternative_play, node_history_mapA, node_history_mapB)
         else:
-            node_action_utility = -self.nash_equilibrium_algorithm(cards, next_history, p0, p1 * strategy[action_index], players, phase, is_exploring_phase, model_A_is_p0, alternative_play, node_history_mapA, node_history_mapB)
+            node_action_utility = -self.nash_equilibrium_algorithm(cards, next_history_id, state_id, p0, p1 * strategy[action_index], is_exploring_phase, model_A_is_p0, alternative_play, node_history_mapA, node_history_mapB)
 
         return node_action_utility
 
-    def nash_equilibrium_algorithm(self, cards, history, p0, p1, players, phase, is_exploring_phase, model_A_is_p0, alternative_play, node_history_mapA, node_history_mapB):
+    def nash_equilibrium_algorithm(self, cards, history_id, state_id, p0, p1, is_exploring_phase, model_A_is_p0, alternative_play, node_history_mapA, node_history_mapB):
         # On the first iteration, the history is empty, so the first player starts
         global total_regret_sum
-        history_without_numbers = re.sub(r'\d', '', history)
-        plays = len(history_without_numbers.replace("/", ""))
-        player = plays % 2
+        player = self.encoder.plays[history_id] % 2
         opponent = 1 - player
         model_A_is_p0 == player
         is_model_B = player == model_A_is_p0
 
         is_current_model_fixed = self.is_model_fixed[is_model_B]
-        possible_actions, rewards, next_phase_started = get_possible_actions(history, cards, player, opponent, players, phase, self.Actions, self.bb, self.total_chips, self.is_bet_relative)
-        updated_phase = 'flop' if next_phase_started else phase
-        updated_history = history + '/' if next_phase_started else history
-        public_card = f'/{cards[2]}' if updated_phase == 'flop' else ""
-        my_cards = str(cards[player])
-        info_set = updated_history + ':|' + my_cards + str(public_card)
+        possible_actions, rewards, next_phase_started = self.betting_table.get_possible_actions(state_id, cards)
         explore_with_cfr = self.exploration_type == "cfr" and is_exploring_phase
 
         if possible_actions is None:
             return rewards
+
+        updated_phase = self.betting_table.acting_phases[state_id]
+        updated_history_id = self.encoder.child(history_id, '/') if next_phase_started else history_id
+        info_set_id = self.encoder.get_info_set_id(updated_history_id, cards[player], cards[2] if updated_phase == 'flop' else None)
         
         if next_phase_started:
             # Player 0 should start the leduc flop
             assert player == 0
 
         # node_info_set_mapA, node_info_set_mapB = self.create_info_set_node(node_history_mapA, node_history_mapB, my_cards, possible_actions)
-        node = self.get_info_set_node(info_set, is_model_B, is_current_model_fixed, possible_actions, my_cards, node_history_mapA, node_history_mapB)
+        node = self.get_info_set_node(info_set_id, is_model_B, is_current_model_fixed, possible_actions, node_history_mapA, node_history_mapB)
         # node = node_info_set_mapA
         if is_exploring_phase and not is_current_model_fixed:
             strategy = [1.0 / len(possible_actions)] * len(possible_actions)
         else:
-            strategy = node.get_strategy(p0 if player == 0 else p1, is_exploring_phase, is_current_model_fixed, self.min_reality_weight, self.decrese_weight_of_initial_strategies, info_set) 
+            strategy = node.get_strategy(p0 if player == 0 else p1, is_exploring_phase, is_current_model_fixed, self.min_reality_weight, self.decrese_weight_of_initial_strategies, node.info_set)
         node_actions_utilities = [0.0] * len(possible_actions)
 
         if (self.algorithm == 'mccfr' and not explore_with_cfr) or is_current_model_fixed:
@@ -313,36 +461,18 @@ class ModLeducTrainer:
             other_actions.remove(chosen_action)  # Remove the first action from the list
             chosen_action_index = node.actions.index(chosen_action)
 
-            updated_players, bet_result = set_bet_value(player, players, chosen_action["value"], next_phase_started, self.is_bet_relative, possible_actions)
-
             make_alt_plays = not is_current_model_fixed and alternative_play != opponent
             actions_to_iterate = possible_actions if make_alt_plays else [chosen_action]
             
             # Play actions
-            if plays <= -1: # wont create the node_history_map correctly, we could maybe use this after the tree was already created.
-                with ProcessPoolExecutor() as executor:
-                    arguments = []
-                    for action in actions_to_iterate:
-                        action_index = node.actions.index(action)
-                        is_chosen_action = action_index == chosen_action_index
-                        # other_node_history_mapA, other_node_history_mapB = self.create_history_node(node_history_mapA, node_history_mapB, bet_result)
-                        updated_players, bet_result = set_bet_value(player, players, action["value"], next_phase_started, self.is_bet_relative, possible_actions)
-                        args = (cards, updated_history, p0, p1, updated_players, updated_phase, strategy, player, action, action_index, is_exploring_phase, model_A_is_p0, bet_result, alternative_play if is_chosen_action else player, node_history_mapA, node_history_mapB)
-                        arguments.append(args)
-                    results = executor.map(self.perform_action_wrapper, arguments)
-                # Process results
-                for result in results:
-                    utility, index = result
-                    node_actions_utilities[index] = utility
-            else:
-                for action in actions_to_iterate:
-                    action_index = node.actions.index(action)
-                    is_chosen_action = action_index == chosen_action_index
-                    # other_node_history_mapA, other_node_history_mapB = self.create_history_node(node_history_mapA, node_history_mapB, bet_result)
-                    updated_players, bet_result = set_bet_value(player, players, action["value"], next_phase_started, self.is_bet_relative, possible_actions)
-                    args = (cards, updated_history, p0, p1, updated_players, updated_phase, strategy, player, action, action_index, is_exploring_phase, model_A_is_p0, bet_result, alternative_play if is_chosen_action else player, node_history_mapA, node_history_mapB)
-                    node_action_utility = self.perform_action(*args)
-                    node_actions_utilities[action_index] = node_action_utility
+            for action in actions_to_iterate:
+                action_index = node.actions.index(action)
+                is_chosen_action = action_index == chosen_action_index
+                # other_node_history_mapA, other_node_history_mapB = self.create_history_node(node_history_mapA, node_history_mapB, bet_result)
+                next_state_id, bet_result = self.betting_table.transition(state_id, action["value"])
+                args = (cards, updated_history_id, next_state_id, p0, p1, strategy, player, action, action_index, is_exploring_phase, model_A_is_p0, bet_result, alternative_play if is_chosen_action else player, node_history_mapA, node_history_mapB)
+                node_action_utility = self.perform_action(*args)
+                node_actions_utilities[action_index] = node_action_utility
 
             if make_alt_plays:
                 for action in possible_actions:
@@ -365,10 +495,10 @@ class ModLeducTrainer:
             node_util = 0
             for action in possible_actions:
                 action_index = node.actions.index(action)
-                updated_players, bet_result = set_bet_value(player, players, action["value"], next_phase_started, self.is_bet_relative, possible_actions)
+                next_state_id, bet_result = self.betting_table.transition(state_id, action["value"])
                 # new_node_history_mapA, new_node_history_mapB = self.create_history_node(node_history_mapA, node_history_mapB, bet_result)
                 new_node_history_mapA, new_node_history_mapB = 0,0
-                node_action_utility = self.perform_action(cards, updated_history, p0, p1, updated_players, updated_phase, strategy, player, action, action_index, is_exploring_phase, model_A_is_p0, bet_result, None, new_node_history_mapA, new_node_history_mapB)
+                node_action_utility = self.perform_action(cards, updated_history_id, next_state_id, p0, p1, strategy, player, action, action_index, is_exploring_phase, model_A_is_p0, bet_result, None, new_node_history_mapA, new_node_history_mapB)
                 node_actions_utilities[action_index] = node_action_utility
                 node_util += strategy[action_index] * node_action_utility
 
@@ -410,4 +540,17 @@ if __name__ == "__main__":
     min_reality_weight = 0.000
     decrese_weight_of_initial_strategies = False
 
-    trainer = ModLeducTrainer(_iterations, _algorithm, cards, _exploring_phase, _exploration_type, total_action_symbol, min_reality_weight, decrese_weight_of_initial_strategies, total_chips, sb, bb, is_bet_relative, _fixed_strategyA, _fixed_strategyB)
\ No newline at end of file
+    """ With more than one worker, the seed and the worker count make the run reproducible, only vanilla CFR runs on several workers """
+    num_workers = 1
+    merge_every = 10000
+
+    """ One of 'vanilla', 'cfr+', 'lcfr' and 'dcfr', the discounting is applied to the whole table every discount_every iterations,
+    1 gives the per-iteration weights of RM+, LCFR and DCFR, larger intervals trade that for fewer passes over the table """
+    cfr_variant = 'vanilla'
+    discount_every = 1
+
+    """ Evaluate the average strategy every exploitability_every iterations and stop once it's below the target, in mbb/hand """
+    exploitability_every = None
+    target_exploitability = None
+
+    trainer = ModLeducTrainer(_iterations, _algorithm, cards, _exploring_phase, _exploration_type, total_action_symbol, min_reality_weight, decrese_weight_of_initial_strategies, total_chips, sb, bb, is_bet_relative, _fixed_strategyA, _fixed_strategyB, num_workers, merge_every, None, cfr_variant, discount_every, exploitability_every, target_exploitability)
\ No newline at end of file
@@ -0,0 +1,258 @@
+import random
+import logging
+import os
+import time
+import pickle
+
+import numpy as np
+
+from functions import create_actions, create_file, float_to_custom_string, generate_random_string
+from classes import Card
+from leduc_tree import LeducTree, NUM_COLUMNS
+from cfr_variants import get_cfr_variant
+from exploitability import get_exploitability_mbb
+
+
+class VectorizedLeducTrainer:
+    """
+       NumPy engine for the same modified Leduc game as ModLeducTrainer, taking the same constructor arguments.
+       The betting tree is enumerated once into flat arrays (LeducTree), and every iteration is a full-width CFR
+       pass: a forward pass for the reach probabilities and a backward pass for the utilities, level by level,
+       for all chance outcomes at once. Regrets and strategy sums live in [edges, observation columns] grids,
+       where a column is the private card plus the public card seen by the player acting at the edge's parent.
+       Since nothing is sampled, `algorithm` only names the model, and `exploration_type` is always full-width.
+    """
+
+    def __init__(self, iterations, algorithm, cards, exploring_phase, exploration_type, total_action_symbol, min_reality_weight, decrese_weight_of_initial_strategies, total_chips, sb, bb, is_bet_relative, fixed_strategyA=None, fixed_strategyB=None, cfr_variant='vanilla', discount_every=1, exploitability_every=None, target_exploitability=None):
+        self.max_bet = total_chips - 1
+        self.total_chips = total_chips
+        self.sb, self.bb = sb, bb
+        self.Actions = create_actions(total_chips, bb, is_bet_relative)
+        self.is_bet_relative = is_bet_relative
+        self.log_file = None
+
+        self.iterations = iterations
+        self.algorithm = algorithm
+        self.cards = cards
+        self.exploring_phase = exploring_phase
+        self.exploration_type = exploration_type
+        self.fixed_strategyA = fixed_strategyA
+        self.fixed_strategyB = fixed_strategyB
+        self.cfr_variant = get_cfr_variant(cfr_variant)
+        self.discount_every = discount_every
+        variant_name = '' if self.cfr_variant.is_vanilla else f'-{self.cfr_variant.name}'
+        self.model_name = f'vec{self.algorithm}-{len(self.cards)}cards-{self.max_bet}maxbet-EP{self.exploration_type}{float_to_custom_string(self.exploring_phase)}-mRW{float_to_custom_string(min_reality_weight)}-iter{self.iterations}{variant_name}'
+
+        self.is_model_fixed = (fixed_strategyA is not None), (fixed_strategyB is not None)
+        self.is_there_a_learning_model = not (self.is_model_fixed[0] and self.is_model_fixed[1])
+
+        self.total_num_actions = len(self.Actions)
+        self.action_symbol = total_action_symbol[:self.total_num_actions]
+
+        self.min_reality_weight = min_reality_weight
+        self.decrese_weight_of_initial_strategies = decrese_weight_of_initial_strategies
+
+        self.tree = LeducTree(self.cards, total_chips, bb, is_bet_relative, self.Actions)
+        self.regret_sum = np.zeros((self.tree.num_edges, NUM_COLUMNS))
+        self.strategy_sum = np.zeros((self.tree.num_edges, NUM_COLUMNS))
+        self.num_info_sets = int(self.tree.node_has_column.sum())
+        self.total_regret_sum = 0.0
+
+        # Every exploitability_every iterations the average strategy is evaluated against a best response,
+        # training stops early once it is at most target_exploitability milli-big-blinds per hand
+        self.exploitability_every = exploitability_every
+        self.target_exploitability = target_exploitability
+        self.exploitability_log = []
+
+        self.create_strategies_from_pickle(fixed_strategyA, fixed_strategyB)
+        self.log(f'../analysis/logs/{self.model_name}.log')
+        self.train()
+
+    def create_strategies_from_pickle(self, fileA, fileB):
+        current_directory = os.path.dirname(os.path.abspath(__file__))
+        self.fixed_strategies = [None, None]
+
+        for model_index, file_name in enumerate((fileA, fileB)):
+            if file_name is None:
+                continue
+            blueprint_path = os.path.join(current_directory, f'../analysis/blueprints/{file_name}.pkl')
+            with open(blueprint_path, 'rb') as f:
+                node_dict = pickle.load(f)
+            self.fixed_strategies[model_index] = self.tree.strategy_grid_from_dict(node_dict)
+
+    def log(self, log_file):
+        create_file(log_file)
+        self.log_file = log_file
+        log_format = 'Iteration: %(index)s\nAverage game valueA: %(avg_game_valueA)s\nAvg regretA: %(avg_regretA)s\n'
+        formatter = logging.Formatter(log_format)
+
+        file_handler = logging.FileHandler(log_file, mode='w')
+        file_handler.setFormatter(formatter)
+
+        self.logger = logging.getLogger('')
+        self.logger.setLevel(logging.DEBUG)
+        self.logger.addHandler(file_handler)
+
+    def get_average_strategy(self):
+        return self.tree.normalize(self.strategy_sum)
+
+    def get_node_dict(self):
+        return self.tree.strategy_grid_to_dict(self.get_average_strategy())
+
+    def save_node_dict(self, path):
+        create_file(path)
+        with open(path, 'wb') as file:
+            pickle.dump(self.get_node_dict(), file)
+
+    def is_target_reached(self, total_iteration):
+        """Logs the exploitability of the average strategy and tells if it reached the target."""
+        exploitability = get_exploitability_mbb(self.tree, self.get_average_strategy())
+        self.exploitability_log.append((total_iteration, exploitability))
+        print(f"iteration: {total_iteration}, exploitability: {exploitability} mbb/hand")
+        return self.target_exploitability is not None and exploitability <= self.target_exploitability
+
+    def get_seat_models(self, model_A_is_p0):
+        """Index of the model (0 for A, 1 for B) sitting in each seat, as in ModLeducTrainer's is_model_B."""
+        return [int(player == model_A_is_p0) for player in range(2)]
+
+    def iterate(self, is_exploring_phase, model_A_is_p0):
+        """Runs one full-width CFR iteration over every deal and returns the game value of player 0."""
+        tree = self.tree
+        seat_models = self.get_seat_models(model_A_is_p0)
+        is_seat_fixed = [self.is_model_fixed[model] for model in seat_models]
+
+        positive_regrets = np.maximum(self.regret_sum, 0)
+        current_strategy = tree.normalize(np.zeros_like(positive_regrets) if is_exploring_phase else positive_regrets)
+        for player, model in enumerate(seat_models):
+            if self.fixed_strategies[model] is not None:
+                player_edges = tree.edge_player == player
+                current_strategy[player_edges] = self.fixed_strategies[model][player_edges]
+
+        edge_probabilities = tree.per_deal(current_strategy)
+        reach = tree.forward_reach(edge_probabilities)
+        values = tree.backward_values(edge_probabilities)
+
+        if self.decrese_weight_of_initial_strategies:
+            sibling_regrets = np.repeat(np.add.reduceat(positive_regrets, tree.child_offsets[tree.internal_nodes], axis=0), tree.num_children[tree.internal_nodes], axis=0)
+            strategy_factor = np.where(tree.per_deal(sibling_regrets) > 0, edge_probabilities, self.min_reality_weight)
+        else:
+            strategy_factor = edge_probabilities
+
+        regrets = np.zeros_like(edge_probabilities)
+        strategy_increment = np.zeros_like(edge_probabilities)
+        for player, _, edge_start, edge_end, _ in tree.levels:
+            if is_seat_fixed[player]:
+                continue
+            edges = slice(edge_start, edge_end)
+            parents = tree.edge_parent[edges]
+            # The opponent does not act on these edges, so its reach at the child is its reach at the parent
+            opponent_reach = reach[1 - player, edge_start + 1:edge_end + 1] * tree.deal_weights
+            sign = 1.0 if player == 0 else -1.0
+            regrets[edges] = sign * (values[edge_start + 1:edge_end + 1] - values[parents]) * opponent_reach
+            if not is_exploring_phase:
+                own_reach = np.maximum(reach[player, parents], self.min_reality_weight)
+                strategy_increment[edges] = own_reach * strategy_factor[edges] * tree.deal_weights
+
+        regret_update = tree.sum_by_column(regrets)
+        self.regret_sum += regret_update
+        self.total_regret_sum += regret_update.sum()
+        if not is_exploring_phase:
+            self.strategy_sum += tree.sum_by_column(strategy_increment)
+
+        return float(values[0] @ tree.deal_weights)
+
+    def train(self):
+        print(f"Parameters: {self.model_name}\n")
+
+        sum_of_rewards = [0] * 2
+        iterations = self.iterations
+        final_avg_game_valueA = 0
+
+        start_time = time.time()
+        times_running = 1 if not self.is_model_fixed[0] and not self.is_model_fixed[1] else 2
+        for p in range(times_running):
+            model_A_is_p0 = 1 - p
+            if self.is_model_fixed[0] or self.is_model_fixed[1]:
+                if model_A_is_p0:
+                    print(f"Player {self.fixed_strategyA or 'training model'} is starting.")
+                else:
+                    print(f"Player {self.fixed_strategyB or 'training model'} is starting.")
+
+            for i in range(iterations):
+                total_iteration = i + p * iterations + 1
+                is_exploring_phase = i < self.exploring_phase * iterations
+                iteration_reward = self.iterate(is_exploring_phase, model_A_is_p0)
+                if not self.cfr_variant.is_vanilla and (i + 1) % self.discount_every == 0:
+                    self.cfr_variant.apply(self.regret_sum, self.strategy_sum, (i + 1) // self.discount_every)
+                sum_of_rewards[0] += model_A_is_p0 * (iteration_reward * (not is_exploring_phase))
+                sum_of_rewards[1] += (not model_A_is_p0) * (iteration_reward * (not is_exploring_phase))
+
+                sample_iteration = {
+                    'index': i,
+                    'avg_game_valueA': final_avg_game_valueA or sum_of_rewards[0],
+                    'avg_regretA': self.total_regret_sum / (self.num_info_sets * total_iteration)
+                }
+                self.logger.info('', extra=sample_iteration)
+
+                if i % 400000 == 0:
+                    print("iteration: ", i)
+                    self.save_node_dict(f'../analysis/strategy_snapshots/{self.model_name}-it{i}.pkl')
+
+                if self.exploitability_every and (i + 1) % self.exploitability_every == 0 and self.is_target_reached(total_iteration):
+                    # The averages below use the iterations that actually ran
+                    iterations = i + 1
+                    break
+
+            final_avg_game_valueA = sum_of_rewards[0] / (iterations * (1 - self.exploring_phase))
+            if iterations < self.iterations:
+                break
+
+        algorithm_id = generate_random_string(3)
+        avg_game_valueA = sum_of_rewards[0] / iterations
+        print(f"Average game value for {self.fixed_strategyA or algorithm_id} as p0: {avg_game_valueA}")
+        avg_game_valueB = sum_of_rewards[1] / iterations
+        print(f"Average game value for {self.fixed_strategyB or algorithm_id} as p0: {avg_game_valueB}")
+        adversary_id = ''
+        adversary_name = ''
+        if self.is_there_a_learning_model:
+            if self.is_model_fixed[0]:
+                adversary_id = '-' + self.fixed_strategyA[:3]
+                adversary_name = self.fixed_strategyA
+            elif self.is_model_fixed[1]:
+                adversary_id = '-' + self.fixed_strategyB[:3]
+                adversary_name = self.fixed_strategyB
+
+            self.save_node_dict(f'../analysis/blueprints/{algorithm_id}{adversary_id}-{self.model_name}.pkl')
+
+        elapsed_time = time.time() - start_time
+        if adversary_name:
+            print(f'model was trained against: {adversary_name}')
+        if self.is_there_a_learning_model:
+            print(f"{algorithm_id}{adversary_id}-{self.model_name} took {elapsed_time} seconds to run.")
+
+
+if __name__ == "__main__":
+
+    random.seed(42)
+
+    _iterations = 20000
+    _algorithm = 'cfr'
+    cards = [Card.Q, Card.Q, Card.K, Card.K, Card.A, Card.A]
+    _exploring_phase = 0.0
+    _exploration_type = "cfr"
+
+    _fixed_strategyA = None
+    _fixed_strategyB = None
+    total_chips = 12
+    sb, bb = 1, 1
+    is_bet_relative = False
+
+    total_action_symbol = ['p', 'b', 'B', '3', '4', '5', '6', '7', '8', '9', 'q', 'u', 'v']
+    min_reality_weight = 0.000
+    decrese_weight_of_initial_strategies = False
+    cfr_variant = 'vanilla'
+    discount_every = 1
+    exploitability_every = None
+    target_exploitability = None
+
+    trainer = VectorizedLeducTrainer(_iterations, _algorithm, cards, _exploring_phase, _exploration_type, total_action_symbol, min_reality_weight, decrese_weight_of_initial_strategies, total_chips, sb, bb, is_bet_relative, _fixed_strategyA, _fixed_strategyB, cfr_variant, discount_every, exploitability_every, target_exploitability)
@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import asyncio
+from contextlib import suppress
+from typing import Awaitable, Callable, Optional
+
+import websockets.exceptions
+
+from .protocol import is_resync_request
+from .serialization import decode_client_message
+
+
+class InboundReader:
+    """
+    Reads a client's connection for as long as the client plays, instead of only while one of its seats is on turn.
+
+    Resync requests are answered as soon as they arrive, with `on_resync`, so a delta client that missed a message
+    catches up while the AI players act. Every other message waits for `recv`, in order. Once the connection
+    closes, `recv` raises the ConnectionClosed error, as the websocket's own recv would.
+    """
+
+    def __init__(self, websocket, on_resync: Callable[[], Awaitable[None]]) -> None:
+        self.websocket = websocket
+        self.on_resync = on_resync
+        self._messages: asyncio.Queue[str | bytes | websockets.exceptions.ConnectionClosed] = asyncio.Queue()
+        self._reader: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._reader is None:
+            self._reader = asyncio.ensure_future(self._read())
+
+    async def _read(self) -> None:
+        while True:
+            try:
+                message = await self.websocket.recv()
+            except websockets.exceptions.ConnectionClosed as closed:
+                self._messages.put_nowait(closed)
+                return
+
+            if is_resync_request(decode_client_message(message)):
+                await self.on_resync()
+            else:
+                self._messages.put_nowait(message)
+
+    async def recv(self) -> str | bytes:
+        self.start()
+        message = await self._messages.get()
+        if isinstance(message, websockets.exceptions.ConnectionClosed):
+            # Later reads fail the same way
+            self._messages.put_nowait(message)
+            raise message
+        return message
+
+    async def close(self) -> None:
+        if self._reader is not None:
+            self._reader.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._reader
+            self._reader = None
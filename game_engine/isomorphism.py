@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+from typing import Iterable, Sequence
+
+# Bits 12 to 15 of a treys card hold its suit, one bit per suit
+SUIT_MASK = 0xF000
+SUIT_BITS = (0x1000, 0x2000, 0x4000, 0x8000)
+
+
+def relabel_suits(card: int, suit_map: dict[int, int]) -> int:
+    return (card & ~SUIT_MASK) | suit_map[card & SUIT_MASK]
+
+
+def get_deck_suits(deck: Iterable[int]) -> tuple[int, ...]:
+    return tuple(sorted({card & SUIT_MASK for card in deck}))
+
+
+def canonicalize(
+    card_groups: Sequence[Sequence[int]], suits: tuple[int, ...] = SUIT_BITS
+) -> tuple[tuple[int, ...], ...]:
+    """
+    The same cards with their suits relabeled, so that all inputs equal up to a permutation of `suits` give the
+    same result. The order of the cards inside a group does not matter and each group comes back sorted, the
+    order of the groups does. Decks without all four suits, like Leduc's, pass theirs so cards stay in the deck.
+
+    Suits are relabeled in the order of their pattern, the ranks they hold in each group. Suits with the same
+    pattern can be swapped without changing the cards, so the order between them does not matter.
+    """
+    patterns = {
+        suit: tuple(
+            tuple(sorted(card >> 8 & 0xF for card in group if card & SUIT_MASK == suit)) for group in card_groups
+        )
+        for suit in suits
+    }
+    suit_map = dict(zip(sorted(suits, key=patterns.__getitem__, reverse=True), suits))
+    return tuple(tuple(sorted(relabel_suits(card, suit_map) for card in group)) for group in card_groups)
@@ -3,9 +3,12 @@ from __future__ import annotations
 import argparse
 import asyncio
 
+from .abstraction import CardAbstraction
 from .common_types import ChipMode
 from .config import build_game_config, load_server_config, resolve_chip_mode
+from .pacing import PacingMode
 from .server import run_server, simulate_poker_game
+from .simulator import DEFAULT_HANDS_PER_GAME, build_simulation_config, run_simulation
 
 
 def parse_start_message(message: str) -> str | None:
@@ -25,6 +28,27 @@ def build_parser() -> argparse.ArgumentParser:
         choices=[chip_mode.value for chip_mode in ChipMode],
     )
     parser.add_argument("--random-seed", type=int, default=None)
+    parser.add_argument(
+        "--hands",
+        type=int,
+        default=None,
+        help="With --no-websocket, play this many headless hands instead of one paced game.",
+    )
+    parser.add_argument("--workers", type=int, default=1, help="Processes the headless hands are spread over.")
+    parser.add_argument("--hands-per-game", type=int, default=DEFAULT_HANDS_PER_GAME)
+    parser.add_argument("--output", default=None, help="CSV file for per-hand results, gzipped if it ends in .gz.")
+    parser.add_argument(
+        "--model-path",
+        action="append",
+        default=None,
+        help="Blueprint of each seat, given once per seat. Defaults to the runtime model for every seat.",
+    )
+    parser.add_argument(
+        "--card-abstraction",
+        default=CardAbstraction.RANKS.value,
+        choices=[card_abstraction.value for card_abstraction in CardAbstraction],
+        help="Hold'em info sets from the ranks of the cards or from their equity buckets.",
+    )
     return parser
 
 
@@ -32,18 +56,38 @@ def main() -> None:
     args = build_parser().parse_args()
     chip_mode = resolve_chip_mode(args.chip_mode)
 
+    if args.no_websocket and args.hands is not None:
+        model_paths = args.model_path or []
+        summary = run_simulation(
+            args.hands,
+            game_type=args.game_type,
+            config=build_simulation_config(
+                model_path=model_paths[0] if len(model_paths) == 1 else None,
+                card_abstraction=args.card_abstraction,
+            ),
+            num_workers=args.workers,
+            hands_per_game=args.hands_per_game,
+            random_seed=args.random_seed,
+            output_path=args.output,
+            model_paths=model_paths if len(model_paths) > 1 else None,
+        )
+        print(summary.format())
+        return
+
     if args.no_websocket:
         game_config = build_game_config(
             num_ai_players=2,
             num_human_players=0,
             chip_mode=chip_mode,
             random_seed=args.random_seed,
+            pacing=PacingMode.INSTANT,
+            card_abstraction=args.card_abstraction,
         )
         asyncio.run(simulate_poker_game(None, args.game_type, game_config))
         return
 
     server_config = load_server_config()
-    asyncio.run(run_server(server_config))
+    asyncio.run(run_server(server_config, handle_signals=True))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from contextlib import suppress
+from dataclasses import dataclass
+from enum import Enum
+from typing import TYPE_CHECKING, Callable, Optional
+
+import websockets
+
+if TYPE_CHECKING:
+    from .inbound import InboundReader
+
+DEFAULT_HIGH_WATER_MARK = 32
+DEFAULT_CLOSE_TIMEOUT = 10.0
+# "Try again later", slow clients of single games and of shared tables are closed with it
+SLOW_CLIENT_CLOSE_CODE = 1013
+
+
+class OverflowPolicy(str, Enum):
+    COALESCE = "coalesce"
+    DISCONNECT = "disconnect"
+
+
+@dataclass(frozen=True)
+class OutboundQueueStats:
+    depth: int
+    max_depth: int
+    sent: int
+    coalesced: int
+    disconnected: bool
+
+
+def resolve_overflow_policy(
+    raw_value: OverflowPolicy | str | None,
+    *,
+    default: OverflowPolicy = OverflowPolicy.COALESCE,
+) -> OverflowPolicy:
+    if isinstance(raw_value, OverflowPolicy):
+        return raw_value
+    if raw_value is None:
+        return default
+
+    normalized_value = raw_value.strip().lower()
+    for overflow_policy in OverflowPolicy:
+        if overflow_policy.value == normalized_value:
+            return overflow_policy
+
+    return default
+
+
+class OutboundQueue:
+    """
+    Stands in for a session's websocket, so the game never waits for a client to read what it sends.
+
+    `send` only queues the message, a writer task sends the queue in order. When more than `high_water_mark`
+    messages are waiting, the client is lagging: with the coalesce policy the waiting messages are replaced by
+    `coalesce(latest_message)`, a message holding the latest state by itself, and with the disconnect policy the
+    connection is closed. `recv` reads the websocket through `inbound` when given, directly otherwise.
+    """
+
+    def __init__(
+        self,
+        websocket,
+        *,
+        high_water_mark: int = DEFAULT_HIGH_WATER_MARK,
+        overflow_policy: OverflowPolicy = OverflowPolicy.COALESCE,
+        coalesce: Optional[Callable[[str | bytes], Optional[str | bytes]]] = None,
+        inbound: Optional[InboundReader] = None,
+    ) -> None:
+        if high_water_mark < 1:
+            raise ValueError("high_water_mark must be at least 1.")
+
+        self.websocket = websocket
+        self.high_water_mark = high_water_mark
+        self.overflow_policy = overflow_policy
+        # Full states supersede each other, so by default the latest message is kept as it is
+        self.coalesce = coalesce or (lambda latest_message: latest_message)
+        self.inbound = inbound
+        self._pending: deque[str | bytes] = deque()
+        self._wakeup = asyncio.Event()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._writer: Optional[asyncio.Task] = None
+        self._max_depth = 0
+        self._sent = 0
+        self._coalesced = 0
+        self._disconnected = False
+
+    @property
+    def depth(self) -> int:
+        return len(self._pending)
+
+    def stats(self) -> OutboundQueueStats:
+        return OutboundQueueStats(self.depth, self._max_depth, self._sent, self._coalesced, self._disconnected)
+
+    async def send(self, message: str | bytes) -> None:
+        if self._disconnected:
+            return
+
+        self._pending.append(message)
+        if len(self._pending) > self.high_water_mark:
+            self._handle_overflow(message)
+            if self._disconnected:
+                return
+        self._max_depth = max(self._max_depth, len(self._pending))
+
+        self._idle.clear()
+        self._wakeup.set()
+        if self._writer is None:
+            self._writer = asyncio.ensure_future(self._write())
+
+    def _handle_overflow(self, latest_message: str | bytes) -> None:
+        dropped = len(self._pending)
+        self._pending.clear()
+
+        if self.overflow_policy == OverflowPolicy.DISCONNECT:
+            self._coalesced += dropped
+            self._disconnect()
+            return
+
+        coalesced_message = self.coalesce(latest_message)
+        if coalesced_message is not None:
+            self._pending.append(coalesced_message)
+        self._coalesced += dropped - len(self._pending)
+
+    def _disconnect(self) -> None:
+        self._disconnected = True
+        self._idle.set()
+        asyncio.ensure_future(self.websocket.close(code=SLOW_CLIENT_CLOSE_CODE, reason="Client too slow"))
+
+    async def _write(self) -> None:
+        while not self._disconnected:
+            if not self._pending:
+                self._idle.set()
+                await self._wakeup.wait()
+                self._wakeup.clear()
+                continue
+
+            try:
+                await self.websocket.send(self._pending.popleft())
+            except websockets.exceptions.ConnectionClosed:
+                self._pending.clear()
+                self._disconnected = True
+                self._idle.set()
+                return
+            self._sent += 1
+
+    async def recv(self):
+        if self.inbound is not None:
+            return await self.inbound.recv()
+        return await self.websocket.recv()
+
+    async def drain(self) -> None:
+        """Waits until every queued message was sent, or the connection is gone."""
+        await self._idle.wait()
+
+    async def close(self, timeout: float = DEFAULT_CLOSE_TIMEOUT) -> None:
+        """Gives the queue `timeout` seconds to drain, then stops the writer and the reader."""
+        if self.inbound is not None:
+            await self.inbound.close()
+        with suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(self.drain(), timeout)
+        if self._writer is not None:
+            self._writer.cancel()
+            self._writer = None
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import asyncio
+from enum import Enum
+
+DEFAULT_PHASE_DELAY = 0.2
+DEFAULT_AI_TURN_DELAY = 0.3
+
+
+class PacingMode(str, Enum):
+    REAL_TIME = "real_time"
+    INSTANT = "instant"
+    VIRTUAL = "virtual"
+
+
+class Pacing:
+    """
+    Decides how long the engine waits at the end of each phase and before each AI turn.
+
+    The base class never waits, which is what bot tables and tests want. Its coroutines never suspend, so a
+    game paced by it can be driven without an event loop. A config holds one pacing for all its games, each
+    game paces itself with `for_game()`.
+    """
+
+    mode = PacingMode.INSTANT
+    # Whether waiting can suspend the game's coroutines
+    suspends = False
+
+    def __init__(self, phase_delay: float = 0.0, ai_turn_delay: float = 0.0) -> None:
+        self.phase_delay = phase_delay
+        self.ai_turn_delay = ai_turn_delay
+
+    def for_game(self) -> Pacing:
+        """The pacing of one game. Pacings without state are shared by every game of a config."""
+        return self
+
+    async def wait(self, seconds: float) -> None:
+        return None
+
+    async def after_phase(self) -> None:
+        if self.phase_delay:
+            await self.wait(self.phase_delay)
+
+    async def before_ai_turn(self) -> None:
+        if self.ai_turn_delay:
+            await self.wait(self.ai_turn_delay)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}(phase_delay={self.phase_delay}, ai_turn_delay={self.ai_turn_delay})"
+
+
+class RealTimePacing(Pacing):
+    """Sleeps between phases and AI turns, so people at the table can follow the hand."""
+
+    mode = PacingMode.REAL_TIME
+    suspends = True
+
+    def __init__(self, phase_delay: float = DEFAULT_PHASE_DELAY, ai_turn_delay: float = DEFAULT_AI_TURN_DELAY) -> None:
+        super().__init__(phase_delay, ai_turn_delay)
+
+    async def wait(self, seconds: float) -> None:
+        await asyncio.sleep(seconds)
+
+
+class VirtualClockPacing(Pacing):
+    """
+    Adds the real-time delays to a clock instead of sleeping, so simulations can tell how long their hands
+    would take at a table without waiting for them. Every game gets its own clock, starting at 0.
+    """
+
+    mode = PacingMode.VIRTUAL
+
+    def __init__(self, phase_delay: float = DEFAULT_PHASE_DELAY, ai_turn_delay: float = DEFAULT_AI_TURN_DELAY) -> None:
+        super().__init__(phase_delay, ai_turn_delay)
+        self.now = 0.0
+
+    def for_game(self) -> VirtualClockPacing:
+        return VirtualClockPacing(self.phase_delay, self.ai_turn_delay)
+
+    async def wait(self, seconds: float) -> None:
+        self.now += seconds
+
+
+def build_pacing(mode: PacingMode | str | None, *, default: PacingMode = PacingMode.REAL_TIME) -> Pacing:
+    if not isinstance(mode, PacingMode):
+        normalized_value = "" if mode is None else mode.strip().lower()
+        mode = next((pacing_mode for pacing_mode in PacingMode if pacing_mode.value == normalized_value), default)
+
+    if mode == PacingMode.REAL_TIME:
+        return RealTimePacing()
+    if mode == PacingMode.VIRTUAL:
+        return VirtualClockPacing()
+    return Pacing()
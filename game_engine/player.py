@@ -1,20 +1,34 @@
 from __future__ import annotations
 
 import asyncio
+import inspect
 import math
 import re
 from enum import Enum
-from typing import List, Optional
+from typing import List, Optional, get_args
 
 import websockets
 from treys import Card
 
+from .abstraction import CardAbstraction, get_bucket_path
 from .common_types import PlayerGroups
 from .functions import reorder_list
+from .protocol import is_resync_request
+from .serialization import decode_client_message
 
 BET_PATTERN = re.compile(r"^Bet (\d+)$")
 
 
+async def _run_off_loop(function, *args):
+    # Served games share the event loop with every connection, so slow work runs in a thread. Headless games drive
+    # their coroutines without a loop, see simulator.run_sync, and call it directly.
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return function(*args)
+    return await asyncio.to_thread(function, *args)
+
+
 class PlayerTurnState(str, Enum):
     NOT_PLAYING = "NOT_PLAYING"
     WAITING_FOR_TURN = "WAITING_FOR_TURN"
@@ -25,9 +39,12 @@ class PlayerTurnState(str, Enum):
 
 class Player:
     def __init__(self, game, player_id: int, name: str, chips: int, is_human: bool = False):
+        # The Players index this player is in, told about every change of chips and turn state
+        self.group_index: Optional[Players] = None
+        self._chips = chips
+        self._turn_state = PlayerTurnState.NOT_PLAYING
         self.id = player_id
         self.name = name
-        self.chips = chips
         self.round_start_chips = chips
         self.round_end_chips = chips
         self.cards: list[Card] = []
@@ -39,13 +56,15 @@ class Player:
         self.turn_bet_value = 0
         self.phase_bet_value = 0
         self.round_bet_value = 0
-        self.round_bet_aux = 0
         self.is_robot = not is_human
-        self.turn_state: PlayerTurnState = PlayerTurnState.NOT_PLAYING
         self.played_current_phase = False
         self.chip_balance = 0
         self.chips_won_history: list[int] = []
         self.game = game
+        # Seat-specific policy, the game's policy is used when it is None
+        self.policy = None
+        # Connection of the person in this seat at a shared table, the game's websocket is used when it is None
+        self.websocket = None
         self.is_all_in = False
 
     def reset_round_player(self) -> None:
@@ -53,7 +72,6 @@ class Player:
         self.turn_bet_value = 0
         self.phase_bet_value = 0
         self.round_bet_value = 0
-        self.round_bet_aux = 0
         self.played_current_phase = False
         self.round_start_chips = self.chips
         self.round_end_chips = self.chips
@@ -64,8 +82,28 @@ class Player:
             "descendingSortHand": [],
         }
 
+    @property
+    def chips(self) -> int:
+        return self._chips
+
+    @chips.setter
+    def chips(self, chips: int) -> None:
+        self._chips = chips
+        if self.group_index is not None:
+            self.group_index.update(self)
+
+    @property
+    def turn_state(self) -> PlayerTurnState:
+        return self._turn_state
+
+    @turn_state.setter
+    def turn_state(self, turn_state: PlayerTurnState) -> None:
+        self._turn_state = turn_state
+        if self.group_index is not None:
+            self.group_index.update(self)
+
     def is_broke(self) -> bool:
-        return self.chips == 0 and self.turn_state != PlayerTurnState.ALL_IN
+        return self._chips == 0 and self._turn_state != PlayerTurnState.ALL_IN
 
     def is_not_broke(self) -> bool:
         return not self.is_broke()
@@ -90,16 +128,26 @@ class Player:
         table_cards: list[str],
         history: list[str],
     ) -> str:
-        if self.game.policy is None:
+        policy = self.game.policy if self.policy is None else self.policy
+        if policy is None:
             await self.ai_play(min_turn_value_to_continue, min_bet)
             return self.get_action(min_turn_value_to_continue)
 
-        info_set = self.get_info_set(ai_player_cards, table_cards, history)
-        action = self.game.policy.decide_next_action(info_set)
+        if self.game.card_abstraction == CardAbstraction.BUCKETS and not self.game.is_leduc:
+            # Buckets missing from the table are computed from thousands of deals
+            info_set = await _run_off_loop(self.get_info_set, ai_player_cards, table_cards, history)
+        else:
+            info_set = self.get_info_set(ai_player_cards, table_cards, history)
+        action = policy.decide_next_action(info_set)
+        if inspect.isawaitable(action):
+            # Remote bots answer over their connection
+            action = await action
         if action == "f":
             self.set_turn_state(PlayerTurnState.FOLDED)
         elif action == "c":
-            if await self.make_bet(min_turn_value_to_continue) and self.get_turn_state() == PlayerTurnState.PLAYING_TURN:
+            # A short stack calls all in for less, which is what opens a side pot
+            call_value = min(min_turn_value_to_continue, self.chips)
+            if await self.make_bet(call_value) and self.get_turn_state() == PlayerTurnState.PLAYING_TURN:
                 self.set_turn_state(PlayerTurnState.WAITING_FOR_TURN)
         elif action == "k":
             await self.make_bet(0)
@@ -114,7 +162,7 @@ class Player:
         return self.get_action(min_turn_value_to_continue)
 
     async def ai_play(self, min_turn_value_to_continue: int, min_bet: int) -> None:
-        await asyncio.sleep(0.3)
+        await self.game.pacing.before_ai_turn()
         if self.chips < 100:
             await self.make_bet_up_to(100)
         elif min_turn_value_to_continue == min_bet:
@@ -143,17 +191,23 @@ class Player:
         min_turn_value_to_continue: int,
         min_bet: int,
     ) -> str:
-        if self.game.websocket is None:
+        websocket = self.websocket or self.game.websocket
+        if websocket is None:
             self.set_turn_state(PlayerTurnState.FOLDED)
             return "Fold"
 
         while self.get_turn_state() == PlayerTurnState.PLAYING_TURN:
             try:
-                action = await self.game.websocket.recv()
+                action = decode_client_message(await websocket.recv())
             except websockets.exceptions.ConnectionClosed:
                 self.set_turn_state(PlayerTurnState.FOLDED)
+                self.game.handle_connection_lost()
                 return "Fold"
 
+            if is_resync_request(action):
+                await self.game.resync_game_state(websocket)
+                continue
+
             bet_value = self.parse_bet_input(action)
             if action == "Fold":
                 self.set_turn_state(PlayerTurnState.FOLDED)
@@ -164,8 +218,9 @@ class Player:
                 self.set_turn_state(PlayerTurnState.WAITING_FOR_TURN)
                 return action
 
-            if action == "Call" and min_turn_value_to_continue <= self.chips:
-                await self.make_bet(min_turn_value_to_continue)
+            if action == "Call":
+                # A short stack calls all in for less, as AI players and bots do
+                await self.make_bet(min(min_turn_value_to_continue, self.chips))
                 if self.get_turn_state() == PlayerTurnState.PLAYING_TURN:
                     self.set_turn_state(PlayerTurnState.WAITING_FOR_TURN)
                 return action
@@ -214,8 +269,16 @@ class Player:
         return action
 
     def get_info_set(self, player_cards: list[str], table_cards: list[str], history: list[str]) -> str:
-        parsed_player_cards = "".join(card[0] for card in player_cards)
-        parsed_table_cards = "".join(card[0] for card in table_cards)
+        if self.game.card_abstraction == CardAbstraction.BUCKETS and not self.game.is_leduc:
+            # The equity bucket of each street in place of the cards, e.g. ":|7/4/9" on the turn
+            buckets = get_bucket_path(
+                [Card.new(card) for card in player_cards], [Card.new(card) for card in table_cards]
+            )
+            parsed_player_cards = str(buckets[0])
+            parsed_table_cards = "/".join(str(bucket) for bucket in buckets[1:])
+        else:
+            parsed_player_cards = "".join(card[0] for card in player_cards)
+            parsed_table_cards = "".join(card[0] for card in table_cards)
         history_with_bets_rounded_up = [self.round_up_bets(action) for action in history]
         history_abbreviated = [
             self.parse_action_to_info_set(action)
@@ -306,7 +369,6 @@ class Player:
 
     def set_round_bet_value(self, amount: int) -> None:
         self.round_bet_value = amount
-        self.round_bet_aux = amount
 
     def set_played_current_phase(self, played_current_phase: bool) -> None:
         self.played_current_phase = played_current_phase
@@ -331,10 +393,54 @@ class Player:
         return f"{self.name} has {self.chips} chips, and has the hand: {', '.join(map(str, self.cards))}"
 
 
+GROUP_NAMES: tuple[str, ...] = get_args(PlayerGroups)
+GROUP_BITS = {group: 1 << index for index, group in enumerate(GROUP_NAMES)}
+_ALL = GROUP_BITS["all"]
+_NON_BROKE = GROUP_BITS["non_broke"]
+_CAN_BET = GROUP_BITS["can_bet_in_current_turn"]
+_ACTIVE_IN_HAND = GROUP_BITS["active_in_hand"]
+_ALL_IN = GROUP_BITS["all_in"]
+_HUMAN = GROUP_BITS["human"]
+_NOT_HUMAN = GROUP_BITS["not_human"]
+
+
+def get_player_groups(player: Player) -> int:
+    """The groups `player` is in right now, one bit per PlayerGroups value."""
+    groups = _ALL | (_NOT_HUMAN if player.is_robot else _HUMAN)
+    turn_state = player.turn_state
+    if turn_state == PlayerTurnState.ALL_IN:
+        groups |= _ALL_IN
+    elif player.chips == 0:
+        return groups
+
+    groups |= _NON_BROKE
+    if turn_state != PlayerTurnState.FOLDED:
+        groups |= _ACTIVE_IN_HAND
+        if turn_state != PlayerTurnState.ALL_IN:
+            groups |= _CAN_BET
+    return groups
+
+
 class Players:
+    """
+    The seats of a game and the groups they are in.
+
+    Each group is kept as a bitmask of seats, bit i being the player with id i, and players report every change
+    of their chips or turn state, so group queries never scan the seats. The player after a seat in a group is
+    found by rotating the group's mask, which treats the seats as a ring.
+    """
+
     def __init__(self, game, num_ai_players: int, num_human_players: int, initial_chips: int):
         self.game = game
         self.initial_players = self._set_initial_players(game, num_ai_players, num_human_players, initial_chips)
+        self._seat_count = len(self.initial_players)
+        self._full_mask = (1 << self._seat_count) - 1
+        self._player_groups = [0] * self._seat_count
+        self._group_masks = dict.fromkeys(GROUP_NAMES, 0)
+        self._group_lists: dict[str, list[Player]] = {}
+        for player in self.initial_players:
+            player.group_index = self
+            self.update(player)
         self.current_dealer = self._set_initial_dealer()
         self.current_turn_player: Optional[Player] = None
 
@@ -357,38 +463,54 @@ class Players:
         randomly_determined_initial_dealer = self.game.rng.randrange(len(non_broke_players))
         return non_broke_players[randomly_determined_initial_dealer]
 
-    def get_players(self, group: PlayerGroups):
-        if group == "all":
-            condition = lambda player: True
-        elif group == "non_broke":
-            condition = lambda player: player.is_not_broke()
-        elif group == "can_bet_in_current_turn":
-            condition = lambda player: player.is_not_broke() and player.get_turn_state() not in {
-                PlayerTurnState.FOLDED,
-                PlayerTurnState.ALL_IN,
-            }
-        elif group == "active_in_hand":
-            condition = lambda player: player.is_not_broke() and player.get_turn_state() != PlayerTurnState.FOLDED
-        elif group == "all_in":
-            condition = lambda player: player.get_turn_state() == PlayerTurnState.ALL_IN
-        elif group == "human":
-            condition = lambda player: not player.is_robot
-        elif group == "not_human":
-            condition = lambda player: player.is_robot
-        else:
-            raise ValueError(f"Unknown player group: {group}")
-
-        return [player for player in self.initial_players if condition(player)]
+    def update(self, player: Player) -> None:
+        groups = get_player_groups(player)
+        changed_groups = groups ^ self._player_groups[player.id]
+        if not changed_groups:
+            return
+
+        self._player_groups[player.id] = groups
+        seat_bit = 1 << player.id
+        for group in GROUP_NAMES:
+            if changed_groups & GROUP_BITS[group]:
+                self._group_masks[group] ^= seat_bit
+                self._group_lists.pop(group, None)
+
+    def _get_group_mask(self, group: PlayerGroups) -> int:
+        try:
+            return self._group_masks[group]
+        except KeyError:
+            raise ValueError(f"Unknown player group: {group}") from None
+
+    def get_players(self, group: PlayerGroups) -> list[Player]:
+        group_players = self._group_lists.get(group)
+        if group_players is None:
+            mask = self._get_group_mask(group)
+            group_players = self._group_lists[group] = [
+                player for player in self.initial_players if mask >> player.id & 1
+            ]
+        return group_players.copy()
+
+    def count(self, group: PlayerGroups) -> int:
+        return self._get_group_mask(group).bit_count()
+
+    def contains(self, group: PlayerGroups, player: Player) -> bool:
+        return bool(self._get_group_mask(group) >> player.id & 1)
 
     def order_players_by_id(self, players: List[Player], raw_id: int) -> list[Player]:
-        player_id = raw_id % len(self.get_players("all"))
+        player_id = raw_id % self._seat_count
         return reorder_list(players, lambda player: player.id == player_id)
 
     def get_closest_group_player(self, group: PlayerGroups, raw_id: int) -> Optional[Player]:
-        player_id = raw_id % len(self.get_players("all"))
-        ordered_players = self.order_players_by_id(self.initial_players, player_id)
-        group_players = set(self.get_players(group))
-        return next((player for player in ordered_players if player in group_players), None)
+        """The first player of `group` at seat `raw_id` or after it, going around the table."""
+        mask = self._get_group_mask(group)
+        if not mask:
+            return None
+
+        start = raw_id % self._seat_count
+        rotated_mask = (mask >> start | mask << (self._seat_count - start)) & self._full_mask
+        offset = (rotated_mask & -rotated_mask).bit_length() - 1
+        return self.initial_players[(start + offset) % self._seat_count]
 
     def get_next(self, group: PlayerGroups, player_id: int) -> Optional[Player]:
         return self.get_closest_group_player(group, player_id + 1)
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, replace
+from typing import Any, Collection, Mapping, Sequence
+
+
+@dataclass(frozen=True)
+class Pot:
+    """
+    One layer of a hand's chips, the main pot or a side pot. Every player who contributed is in the pot up to what
+    they put in, only the players still in the hand are eligible to win it.
+    """
+
+    amount: int
+    # Sorted from the smallest contribution, each pot's eligible players are the last ones of the pot before it
+    eligible_player_ids: tuple[int, ...]
+    winner_ids: tuple[int, ...] = ()
+
+    def to_message(self) -> dict[str, Any]:
+        return {"amount": self.amount, "eligible": list(self.eligible_player_ids), "winners": list(self.winner_ids)}
+
+
+def build_pots(contributions: Mapping[int, int], eligible_player_ids: Collection[int]) -> list[Pot]:
+    """
+    The main pot and then each side pot of the chips in `contributions`, by player id. Contributions are sorted
+    once, and a pot closes at every contribution of an eligible player. Chips folded players put in above every
+    eligible player's go to the last pot. Every id of `eligible_player_ids` must be in `contributions`.
+    """
+    eligible_set = set(eligible_player_ids)
+    ordered_contributions = sorted(
+        (amount, player_id) for player_id, amount in contributions.items() if amount > 0 or player_id in eligible_set
+    )
+    eligible_order = tuple(player_id for _, player_id in ordered_contributions if player_id in eligible_set)
+
+    pots: list[Pot] = []
+    pot_amount = 0
+    previous_level = 0
+    num_eligible_left = len(eligible_order)
+    for index, (level, player_id) in enumerate(ordered_contributions):
+        # Each player still contributing puts the chips between the previous level and this one in
+        pot_amount += (level - previous_level) * (len(ordered_contributions) - index)
+        previous_level = level
+        if player_id not in eligible_set:
+            continue
+        if pot_amount:
+            pots.append(Pot(pot_amount, eligible_order[len(eligible_order) - num_eligible_left :]))
+            pot_amount = 0
+        num_eligible_left -= 1
+
+    if pot_amount and pots:
+        pots[-1] = replace(pots[-1], amount=pots[-1].amount + pot_amount)
+    elif pot_amount:
+        # Only folded players put chips in, like a big blind that was walked
+        pots.append(Pot(pot_amount, eligible_order))
+    return pots
+
+
+def award_pots(pots: Sequence[Pot], order_of_best_hands: Sequence[Sequence[int]]) -> list[Pot]:
+    """
+    `pots` with the players of the best hand eligible for each as its winners, `order_of_best_hands` holding groups
+    of player ids with equal hands from the best. Pots are walked from the last one, so each eligible player is
+    looked at once.
+    """
+    hand_positions = {
+        player_id: position for position, hand_group in enumerate(order_of_best_hands) for player_id in hand_group
+    }
+    awarded_pots: list[Pot] = []
+    best_position = len(order_of_best_hands)
+    winner_ids: list[int] = []
+    num_seen = 0
+    for pot in reversed(pots):
+        for player_id in pot.eligible_player_ids[: len(pot.eligible_player_ids) - num_seen]:
+            position = hand_positions[player_id]
+            if position < best_position:
+                best_position = position
+                winner_ids = [player_id]
+            elif position == best_position:
+                winner_ids.append(player_id)
+        num_seen = len(pot.eligible_player_ids)
+        awarded_pots.append(replace(pot, winner_ids=tuple(sorted(winner_ids))))
+    return awarded_pots[::-1]
@@ -1,15 +1,25 @@
 from __future__ import annotations
 
+import copy
 import json
+import re
 from dataclasses import dataclass
-from typing import Any, Optional
-
-from treys import Card
+from typing import Any, Callable, Optional
 
 from .common_types import ChipMode, serialize_enum
 from .config import resolve_chip_mode
+from .serialization import ENCODING_JSON, cards_to_strs, encode, resolve_encoding
 
 SUPPORTED_GAME_TYPES = {"Texas Hold'em", "Leduc"}
+STATE_PROTOCOL_FULL = "full"
+STATE_PROTOCOL_DELTA = "delta"
+SUPPORTED_STATE_PROTOCOLS = {STATE_PROTOCOL_FULL, STATE_PROTOCOL_DELTA}
+STATE_PATCH_VERSION = 1
+TABLE_ACTIONS = {"create-table", "join-table", "spectate-table", "list-tables"}
+MAX_HUMAN_SEATS = 6
+BOT_SESSION_TYPE = "bot-session"
+SESSION_TOKEN_PATTERN = re.compile(r"^[A-Za-z0-9_-]{16,64}$")
+MAX_BOT_TABLES = 64
 LEGACY_START_MESSAGES = {
     "start-game-Texas Hold'em": "Texas Hold'em",
     "start-game-Leduc": "Leduc",
@@ -20,18 +30,169 @@ LEGACY_START_MESSAGES = {
 class StartGameRequest:
     game_type: str
     chip_mode: ChipMode = ChipMode.PERSISTENT_MATCH
+    state_protocol: str = STATE_PROTOCOL_FULL
+    encoding: str = ENCODING_JSON
+    session_token: Optional[str] = None
+
+
+def build_start_game_message(
+    game_type: str,
+    chip_mode: ChipMode | str,
+    state_protocol: str = STATE_PROTOCOL_FULL,
+    encoding: str = ENCODING_JSON,
+    session_token: Optional[str] = None,
+) -> str:
+    payload = {
+        "type": "start-game",
+        "gameType": game_type,
+        "chipMode": resolve_chip_mode(chip_mode).value,
+        "stateProtocol": state_protocol,
+        "encoding": encoding,
+    }
+    if session_token is not None:
+        payload["sessionToken"] = session_token
+    return json.dumps(payload)
+
+
+def is_session_token(value: Any) -> bool:
+    return isinstance(value, str) and SESSION_TOKEN_PATTERN.match(value) is not None
+
+
+def build_session_message(session_token: str, resumed: bool) -> str:
+    """Sent first in resumable sessions, a client that reconnects with the token continues the match."""
+    return json.dumps({"type": "session", "sessionToken": session_token, "resumed": resumed})
+
+
+def build_session_suspended_message(session_token: str) -> str:
+    return json.dumps({"type": "session-suspended", "sessionToken": session_token})
+
+
+@dataclass(frozen=True)
+class TableRequest:
+    action: str
+    table_id: Optional[str] = None
+    game_type: str = "Leduc"
+    chip_mode: ChipMode = ChipMode.PERSISTENT_MATCH
+    human_seats: int = 1
 
 
-def build_start_game_message(game_type: str, chip_mode: ChipMode | str) -> str:
+def build_table_request_message(action: str, **fields: Any) -> str:
+    """Builds a create-table, join-table, spectate-table or list-tables message, fields use the wire names."""
+    return json.dumps({"type": action, **fields})
+
+
+def build_table_message(message_type: str, **fields: Any) -> str:
+    return json.dumps({"type": message_type, **fields})
+
+
+def parse_table_request(
+    message: str,
+    *,
+    default_chip_mode: ChipMode = ChipMode.PERSISTENT_MATCH,
+) -> Optional[TableRequest]:
+    try:
+        payload = json.loads(message)
+    except json.JSONDecodeError:
+        return None
+
+    if not isinstance(payload, dict) or payload.get("type") not in TABLE_ACTIONS:
+        return None
+
+    game_type = payload.get("gameType", "Leduc")
+    if game_type not in SUPPORTED_GAME_TYPES:
+        return None
+
+    try:
+        human_seats = int(payload.get("humanSeats", 1))
+    except (TypeError, ValueError):
+        return None
+    if not 1 <= human_seats <= MAX_HUMAN_SEATS:
+        return None
+
+    table_id = payload.get("tableId")
+    return TableRequest(
+        action=payload["type"],
+        table_id=None if table_id is None else str(table_id),
+        game_type=game_type,
+        chip_mode=resolve_chip_mode(payload.get("chipMode"), default=default_chip_mode),
+        human_seats=human_seats,
+    )
+
+
+@dataclass(frozen=True)
+class BotSessionRequest:
+    game_type: str = "Leduc"
+    hands: int = 1
+    tables: int = 1
+    random_seed: Optional[int] = None
+    encoding: str = ENCODING_JSON
+
+
+def build_bot_session_message(
+    game_type: str = "Leduc",
+    hands: int = 1,
+    tables: int = 1,
+    *,
+    random_seed: Optional[int] = None,
+    encoding: str = ENCODING_JSON,
+) -> str:
     return json.dumps(
         {
-            "type": "start-game",
+            "type": BOT_SESSION_TYPE,
             "gameType": game_type,
-            "chipMode": resolve_chip_mode(chip_mode).value,
+            "hands": hands,
+            "tables": tables,
+            "seed": random_seed,
+            "encoding": encoding,
         }
     )
 
 
+def parse_bot_session_request(message: str) -> Optional[BotSessionRequest]:
+    try:
+        payload = json.loads(message)
+    except json.JSONDecodeError:
+        return None
+
+    if not isinstance(payload, dict) or payload.get("type") != BOT_SESSION_TYPE:
+        return None
+
+    game_type = payload.get("gameType", "Leduc")
+    if game_type not in SUPPORTED_GAME_TYPES:
+        return None
+
+    try:
+        hands = int(payload.get("hands", 1))
+        tables = int(payload.get("tables", 1))
+        random_seed = None if payload.get("seed") is None else int(payload["seed"])
+    except (TypeError, ValueError):
+        return None
+    if hands < 1 or not 1 <= tables <= MAX_BOT_TABLES:
+        return None
+
+    return BotSessionRequest(
+        game_type=game_type,
+        hands=hands,
+        tables=min(tables, hands),
+        random_seed=random_seed,
+        encoding=resolve_encoding(payload.get("encoding")),
+    )
+
+
+def build_resync_message() -> str:
+    return json.dumps({"type": "resync"})
+
+
+def is_resync_request(message: str) -> bool:
+    if not message.lstrip().startswith("{"):
+        return False
+    try:
+        payload = json.loads(message)
+    except json.JSONDecodeError:
+        return False
+    return isinstance(payload, dict) and payload.get("type") == "resync"
+
+
 def parse_start_request(
     message: str,
     *,
@@ -60,21 +221,28 @@ def parse_start_request(
     if game_type not in SUPPORTED_GAME_TYPES:
         return None
 
+    state_protocol = payload.get("stateProtocol")
     return StartGameRequest(
         game_type=game_type,
         chip_mode=resolve_chip_mode(payload.get("chipMode"), default=default_chip_mode),
+        state_protocol=state_protocol if state_protocol in SUPPORTED_STATE_PROTOCOLS else STATE_PROTOCOL_FULL,
+        # Falls back to JSON when msgpack is not installed, clients tell the two apart by the frame type
+        encoding=resolve_encoding(payload.get("encoding")),
+        session_token=payload.get("sessionToken") if is_session_token(payload.get("sessionToken")) else None,
     )
 
 
-def serialize_player(player: Any) -> dict[str, Any]:
+def serialize_player(player: Any, *, copy_mutable: bool = True) -> dict[str, Any]:
+    # GameStateStream keeps the last state it sent to diff the next one against, so by default the dict and list
+    # the player keeps changing in place are copied
     return {
         "id": player.id,
         "name": player.name,
         "chips": player.chips,
         "round_start_chips": player.round_start_chips,
         "round_end_chips": player.round_end_chips,
-        "cards": [Card.int_to_str(card) for card in player.cards],
-        "show_down_hand": player.show_down_hand,
+        "cards": cards_to_strs(player.cards),
+        "show_down_hand": dict(player.show_down_hand) if copy_mutable else player.show_down_hand,
         "turn_bet_value": player.turn_bet_value,
         "phase_bet_value": player.phase_bet_value,
         "round_bet_value": player.round_bet_value,
@@ -82,38 +250,231 @@ def serialize_player(player: Any) -> dict[str, Any]:
         "turn_state": serialize_enum(player.turn_state),
         "played_current_phase": player.played_current_phase,
         "chip_balance": player.chip_balance,
-        "chips_won_history": player.chips_won_history,
+        "chips_won_history": list(player.chips_won_history) if copy_mutable else player.chips_won_history,
     }
 
 
-def serialize_players(players: Any) -> dict[str, Any]:
+def serialize_players(
+    players: Any,
+    *,
+    copy_mutable: bool = True,
+    player_serializer: Optional[Callable[[Any], dict[str, Any]]] = None,
+) -> dict[str, Any]:
+    serialize = player_serializer or (lambda player: serialize_player(player, copy_mutable=copy_mutable))
+    # The dealer and the player to act are also in initial_players, each player is serialized once
+    serialized_players = {id(player): serialize(player) for player in players.initial_players}
+
+    def get_serialized_player(player: Any) -> dict[str, Any]:
+        serialized_player = serialized_players.get(id(player))
+        return serialize(player) if serialized_player is None else serialized_player
+
     current_turn_player = (
         "EVERYONE_IN_ALL_IN"
         if players.current_turn_player is None
-        else serialize_player(players.current_turn_player)
+        else get_serialized_player(players.current_turn_player)
     )
 
     return {
-        "initial_players": [serialize_player(player) for player in players.initial_players],
-        "current_dealer": serialize_player(players.current_dealer),
+        "initial_players": list(serialized_players.values()),
+        "current_dealer": get_serialized_player(players.current_dealer),
         "current_turn_player": current_turn_player,
     }
 
 
-def serialize_game_state(game: Any) -> str:
-    return json.dumps(
-        {
-            "players": serialize_players(game.players),
-            "_increase_blind_every": game._increase_blind_every,
-            "round_num": game.round_num,
-            "table_cards": [Card.int_to_str(card) for card in game.table_cards],
-            "phase_name": serialize_enum(game.phase_name),
-            "total_pot": game.total_pot,
-            "min_turn_value_to_continue": game.min_turn_value_to_continue,
-            "min_bet": game.min_bet,
-            "chip_mode": game.chip_mode.value,
-            "game_type": game.game_type,
-            "game_over": game.is_game_over,
-            "winner_name": game.winner_name,
-        }
-    )
+def build_static_state_fields(game: Any) -> dict[str, Any]:
+    """The fields of a game's state messages that keep their value for the whole game, built once per game."""
+    return {
+        "_increase_blind_every": game._increase_blind_every,
+        "chip_mode": game.chip_mode.value,
+        "game_type": game.game_type,
+    }
+
+
+def build_game_state(
+    game: Any,
+    *,
+    copy_mutable: bool = True,
+    player_serializer: Optional[Callable[[Any], dict[str, Any]]] = None,
+) -> dict[str, Any]:
+    static_fields = game.static_state_fields
+    return {
+        "players": serialize_players(game.players, copy_mutable=copy_mutable, player_serializer=player_serializer),
+        "_increase_blind_every": static_fields["_increase_blind_every"],
+        "round_num": game.round_num,
+        "table_cards": cards_to_strs(game.table_cards),
+        "phase_name": serialize_enum(game.phase_name),
+        "total_pot": game.total_pot,
+        "pots": [pot.to_message() for pot in game.pots],
+        "min_turn_value_to_continue": game.min_turn_value_to_continue,
+        "min_bet": game.min_bet,
+        "chip_mode": static_fields["chip_mode"],
+        "game_type": static_fields["game_type"],
+        "game_over": game.is_game_over,
+        "winner_name": game.winner_name,
+    }
+
+
+def serialize_game_state(game: Any, encoding: str = ENCODING_JSON) -> str | bytes:
+    # Encoded right away, so nothing needs copying
+    return encode(build_game_state(game, copy_mutable=False), encoding)
+
+
+def diff_state(old: Any, new: Any, path: tuple[Any, ...] = ()) -> list[dict[str, Any]]:
+    """
+    Lists the operations that turn `old` into `new`, each one addresses a value by its path of keys and indexes.
+
+    `{"p": path, "v": value}` sets a value, `{"p": path, "a": values}` extends a list that only grew, like
+    chips_won_history, `{"p": path, "d": 1}` removes a key and `{"p": path, "c": source_path}` sets a value to
+    a copy of the value at another path. Only lists of dicts or lists are diffed item by item. Subtrees that are
+    the same object in both states are skipped without being compared.
+    """
+    if type(old) is not type(new):
+        return [{"p": list(path), "v": new}]
+
+    if isinstance(new, dict):
+        operations = []
+        for key, value in new.items():
+            if key not in old:
+                operations.append({"p": [*path, key], "v": value})
+            elif old[key] is not value and old[key] != value:
+                operations.extend(diff_state(old[key], value, (*path, key)))
+        operations.extend({"p": [*path, key], "d": 1} for key in old if key not in new)
+        return operations
+
+    if isinstance(new, list):
+        if len(new) == len(old) and new and isinstance(new[0], (dict, list)):
+            operations = []
+            for index, (old_value, value) in enumerate(zip(old, new)):
+                if old_value is not value and old_value != value:
+                    operations.extend(diff_state(old_value, value, (*path, index)))
+            return operations
+        if len(new) > len(old) and new[: len(old)] == old:
+            return [{"p": list(path), "a": new[len(old) :]}]
+        return [{"p": list(path), "v": new}]
+
+    if old == new:
+        return []
+    return [{"p": list(path), "v": new}]
+
+
+def apply_state_patch(state: Any, operations: list[dict[str, Any]]) -> Any:
+    """Applies the operations of a state-patch message in place, the inverse of diff_state."""
+    for operation in operations:
+        path = operation["p"]
+        if not path:
+            state = operation["v"]
+            continue
+
+        parent = state
+        for key in path[:-1]:
+            parent = parent[key]
+        key = path[-1]
+        if "a" in operation:
+            parent[key].extend(operation["a"])
+        elif "c" in operation:
+            source = state
+            for source_key in operation["c"]:
+                source = source[source_key]
+            parent[key] = copy.deepcopy(source)
+        elif "d" in operation:
+            del parent[key]
+        else:
+            parent[key] = operation["v"]
+    return state
+
+
+_PLAYER_REFERENCE_KEYS = ("current_dealer", "current_turn_player")
+
+
+def _diff_game_state(old: dict[str, Any], new: dict[str, Any]) -> list[dict[str, Any]]:
+    # The dealer and the player to act are copies of entries of initial_players. When they move to another
+    # player, copying that entry is much shorter than diffing two players, whose whole histories differ.
+    old_players, new_players = old["players"], new["players"]
+    references = {key: new_players[key] for key in _PLAYER_REFERENCE_KEYS}
+    new_without_references = {**new, "players": {key: value for key, value in new_players.items() if key not in references}}
+    old_without_references = {**old, "players": {key: value for key, value in old_players.items() if key not in references}}
+    operations = diff_state(old_without_references, new_without_references)
+
+    for key, value in references.items():
+        old_value = old_players.get(key)
+        is_same_player = isinstance(value, dict) and isinstance(old_value, dict) and value["id"] == old_value["id"]
+        if is_same_player or not isinstance(value, dict):
+            operations.extend(diff_state(old_value, value, ("players", key)))
+            continue
+
+        index = next((index for index, player in enumerate(new_players["initial_players"]) if player == value), None)
+        if index is None:
+            operations.append({"p": ["players", key], "v": value})
+        else:
+            operations.append({"p": ["players", key], "c": ["players", "initial_players", index]})
+    return operations
+
+
+class GameStateStream:
+    """
+    Encodes the states of one game for the delta protocol, every client watching the game gets the same messages.
+
+    The first message, and the first one after reset, is a full snapshot. Every later one only carries the
+    operations from the previous state, and states that did not change are not sent at all. Messages are
+    numbered, so a client that misses one, or joins late, can be sent `snapshot()` and follow from there.
+
+    `encode_game` reuses the subtrees of the last state that did not change. A player whose fields are the same is
+    the same dict as in the last state, and chips_won_history, which only grows, is copied once per new result
+    instead of on every state, so the diff skips unchanged players and histories without comparing them.
+    """
+
+    def __init__(self, encoding: str = ENCODING_JSON) -> None:
+        self.encoding = encoding
+        self.seq = 0
+        self._last_state: Optional[dict[str, Any]] = None
+        # By player id, the last serialized player and the history list it copied, with that copy
+        self._players: dict[int, dict[str, Any]] = {}
+        self._histories: dict[int, tuple[list[int], list[int]]] = {}
+
+    def reset(self) -> None:
+        self._last_state = None
+        self._players.clear()
+        self._histories.clear()
+
+    def encode_game(self, game: Any) -> Optional[str | bytes]:
+        return self.encode(build_game_state(game, player_serializer=self._serialize_player))
+
+    def _serialize_player(self, player: Any) -> dict[str, Any]:
+        history = player.chips_won_history
+        source_history, history_copy = self._histories.get(player.id, (None, None))
+        if source_history is not history or len(history_copy) > len(history):
+            history_copy = list(history)
+        elif len(history_copy) < len(history):
+            history_copy = history_copy + history[len(history_copy) :]
+        self._histories[player.id] = (history, history_copy)
+
+        serialized_player = serialize_player(player, copy_mutable=False)
+        serialized_player["show_down_hand"] = dict(player.show_down_hand)
+        serialized_player["chips_won_history"] = history_copy
+        last_serialized_player = self._players.get(player.id)
+        if last_serialized_player == serialized_player:
+            return last_serialized_player
+        self._players[player.id] = serialized_player
+        return serialized_player
+
+    def encode(self, state: dict[str, Any]) -> Optional[str | bytes]:
+        if self._last_state is None:
+            message = {"type": "state-snapshot", "version": STATE_PATCH_VERSION, "seq": self.seq + 1, "state": state}
+        else:
+            operations = _diff_game_state(self._last_state, state)
+            if not operations:
+                return None
+            message = {"type": "state-patch", "version": STATE_PATCH_VERSION, "seq": self.seq + 1, "ops": operations}
+
+        self.seq += 1
+        self._last_state = state
+        return encode(message, self.encoding)
+
+    def snapshot(self) -> Optional[str | bytes]:
+        """The last state sent, as a snapshot numbered like the message that sent it."""
+        if self._last_state is None:
+            return None
+        return encode(
+            {"type": "state-snapshot", "version": STATE_PATCH_VERSION, "seq": self.seq, "state": self._last_state},
+            self.encoding,
+        )
@@ -0,0 +1,220 @@
+from __future__ import annotations
+
+import mmap
+import struct
+import sys
+from array import array
+from collections import Counter
+from itertools import combinations, combinations_with_replacement, product
+from pathlib import Path
+from typing import Any, Optional, Sequence
+
+from treys import Card, Deck, Evaluator
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - depends on the environment
+    np = None
+
+RANK_TABLE_MAGIC = b"PMLRANK\x00"
+RANK_TABLE_VERSION = 1
+DEFAULT_RANK_TABLE_PATH = Path(__file__).resolve().parent / "models" / "runtime" / "holdem-7card.ranks"
+
+# magic, version, number of entries of the flush table, number of entries of the rank sum table
+_HEADER = struct.Struct("<8sIII")
+
+# Every multiset of 7 ranks, with at most 4 of each, adds up to its own sum of these keys, so the sum indexes
+# the table directly. Deuce first, ace last, in the order of treys ranks.
+RANK_KEYS = (0, 1, 5, 22, 98, 453, 2031, 8698, 22854, 83661, 262349, 636345, 1479181)
+# The sum of these keys over 7 cards tells which suit, if any, 5 of them share
+SUIT_KEYS = (0, 1, 8, 57)
+SUIT_KEY_BITS = 9
+SUIT_KEY_MASK = (1 << SUIT_KEY_BITS) - 1
+HAND_SIZE = 7
+
+
+def _get_suit_index(card: int) -> int:
+    # Bits 12 to 15 of a treys card hold its suit, one bit per suit
+    return ((card >> 12) & 0xF).bit_length() - 1
+
+
+def _build_flush_suits() -> list[int]:
+    flush_suits = [-1] * (SUIT_KEY_MASK + 1)
+    for suit_counts in product(range(HAND_SIZE + 1), repeat=len(SUIT_KEYS)):
+        if sum(suit_counts) == HAND_SIZE:
+            suit_sum = sum(count * key for count, key in zip(suit_counts, SUIT_KEYS))
+            flush_suits[suit_sum] = next((suit for suit, count in enumerate(suit_counts) if count >= 5), -1)
+    return flush_suits
+
+
+# Suit of the flush of a 7-card hand by its suit key sum, -1 when it has none
+FLUSH_SUITS = _build_flush_suits()
+# Both keys of each card packed in one int, the suit sum of 7 cards stays below 1 << SUIT_KEY_BITS
+CARD_KEYS = {
+    card: RANK_KEYS[(card >> 8) & 0xF] << SUIT_KEY_BITS | SUIT_KEYS[_get_suit_index(card)]
+    for card in Deck.GetFullDeck()
+}
+
+
+def _get_prime_product(ranks: Sequence[int]) -> int:
+    prime_product = 1
+    for rank in ranks:
+        prime_product *= Card.PRIMES[rank]
+    return prime_product
+
+
+def build_rank_tables() -> tuple[array, array]:
+    """
+    The treys rank of the best 5 cards of every 7-card hand, in two tables.
+
+    The flush table is indexed by the rank bits of the flush suit's cards, the other by the hand's rank key sum.
+    A 7-card hand with a flush cannot hold a full house or quads, so it is ranked from its flush cards alone.
+    """
+    lookup_table = Evaluator().table
+    flush_ranks = array("H", bytes(2 << 13))
+    for rank_bits in range(1 << 13):
+        flush_card_ranks = [rank for rank in range(13) if rank_bits >> rank & 1]
+        if 5 <= len(flush_card_ranks) <= HAND_SIZE:
+            flush_ranks[rank_bits] = min(
+                lookup_table.flush_lookup[_get_prime_product(ranks)] for ranks in combinations(flush_card_ranks, 5)
+            )
+
+    # The largest sum is four aces and three kings
+    ranks = array("H", bytes(2 * (4 * RANK_KEYS[-1] + 3 * RANK_KEYS[-2] + 1)))
+    for hand_ranks in combinations_with_replacement(range(13), HAND_SIZE):
+        if max(Counter(hand_ranks).values()) > 4:
+            continue
+        ranks[sum(RANK_KEYS[rank] for rank in hand_ranks)] = min(
+            lookup_table.unsuited_lookup[_get_prime_product(five_ranks)]
+            for five_ranks in combinations(hand_ranks, 5)
+        )
+    return flush_ranks, ranks
+
+
+def write_rank_table(path: str | Path = DEFAULT_RANK_TABLE_PATH) -> Path:
+    if sys.byteorder != "little":
+        raise ValueError("Rank tables are little-endian and can only be written on little-endian hosts.")
+
+    flush_ranks, ranks = build_rank_tables()
+    output_path = Path(path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with output_path.open("wb") as file_handle:
+        file_handle.write(_HEADER.pack(RANK_TABLE_MAGIC, RANK_TABLE_VERSION, len(flush_ranks), len(ranks)))
+        for values in (flush_ranks, ranks):
+            file_handle.write(values.tobytes())
+
+    return output_path
+
+
+def resolve_rank_table_path(raw_value: Optional[str]) -> Path:
+    if raw_value is None or not raw_value.strip():
+        return DEFAULT_RANK_TABLE_PATH
+    return Path(raw_value.strip())
+
+
+class HandRankTable:
+    """
+    Read-only 7-card Hold'em rank table written by write_rank_table, opened with mmap.
+
+    Ranks are the treys ones, from 1 for a royal flush to 7462 for the worst high card, so they mix with
+    Evaluator.evaluate results. Ranking a hand adds up its cards' keys and reads one entry, and every process
+    that opens the same file shares its pages.
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        if sys.byteorder != "little":
+            raise ValueError("Rank tables are little-endian and can only be read on little-endian hosts.")
+
+        self.path = Path(path)
+        with self.path.open("rb") as file_handle:
+            self._mmap = mmap.mmap(file_handle.fileno(), 0, access=mmap.ACCESS_READ)
+
+        buffer = memoryview(self._mmap)
+        magic, version, num_flush_ranks, num_ranks = _HEADER.unpack_from(buffer)
+        if (
+            magic != RANK_TABLE_MAGIC
+            or version != RANK_TABLE_VERSION
+            or len(buffer) != _HEADER.size + 2 * (num_flush_ranks + num_ranks)
+        ):
+            buffer.release()
+            self._mmap.close()
+            raise ValueError(f"{self.path} is not a version {RANK_TABLE_VERSION} rank table.")
+
+        self._flush_ranks_offset = _HEADER.size
+        self._ranks_offset = _HEADER.size + 2 * num_flush_ranks
+        self._flush_ranks = buffer[self._flush_ranks_offset : self._ranks_offset].cast("H")
+        self._ranks = buffer[self._ranks_offset :].cast("H")
+        self._flush_rank_array: Any = None
+        self._rank_array: Any = None
+
+    def _get_rank(self, cards: Sequence[int], key: int) -> int:
+        flush_suit = FLUSH_SUITS[key & SUIT_KEY_MASK]
+        if flush_suit < 0:
+            return self._ranks[key >> SUIT_KEY_BITS]
+
+        suit_bit = 0x1000 << flush_suit
+        rank_bits = 0
+        for card in cards:
+            if card & suit_bit:
+                rank_bits |= card >> 16
+        return self._flush_ranks[rank_bits]
+
+    def evaluate(self, cards: Sequence[int]) -> int:
+        """Rank of 7 treys cards."""
+        key = 0
+        for card in cards:
+            key += CARD_KEYS[card]
+        return self._get_rank(cards, key)
+
+    def evaluate_many(self, board: Sequence[int], hands: Sequence[Sequence[int]]) -> list[int]:
+        """Ranks of two-card `hands` on a shared 5-card `board`."""
+        board_key = sum(CARD_KEYS[card] for card in board)
+        ranks = []
+        for first_card, second_card in hands:
+            key = board_key + CARD_KEYS[first_card] + CARD_KEYS[second_card]
+            ranks.append(self._get_rank((*board, first_card, second_card), key))
+        return ranks
+
+    def evaluate_batch(self, cards: Any) -> Any:
+        """
+        Ranks of many hands at once, from an array of shape (hands, 7) of treys cards. Needs numpy, and returns
+        a uint16 array.
+        """
+        if np is None:
+            raise RuntimeError("HandRankTable.evaluate_batch needs numpy.")
+        if self._rank_array is None:
+            self._flush_rank_array = np.frombuffer(self._mmap, "<u2", len(self._flush_ranks), self._flush_ranks_offset)
+            self._rank_array = np.frombuffer(self._mmap, "<u2", len(self._ranks), self._ranks_offset)
+
+        # int32 holds every card, the key sums need all 32 bits of a uint32
+        cards = np.asarray(cards, dtype=np.int32)
+        if cards.ndim != 2 or cards.shape[1] != HAND_SIZE:
+            raise ValueError(f"Expected an array of shape (hands, {HAND_SIZE}), got {cards.shape}.")
+
+        keys = _CARD_KEY_ARRAY[(cards >> 8) & 0xFF].sum(axis=1, dtype=np.uint32)
+        ranks = self._rank_array[keys >> SUIT_KEY_BITS]
+
+        flush_suits = _FLUSH_SUIT_ARRAY[keys & SUIT_KEY_MASK]
+        flush_hands = np.flatnonzero(flush_suits >= 0)
+        if flush_hands.size:
+            # Cards of one suit have different ranks, so adding their rank bits sets each bit once
+            flush_cards = cards[flush_hands]
+            suit_bits = (0x1000 << flush_suits[flush_hands].astype(np.int32))[:, None]
+            rank_bits = np.where(flush_cards & suit_bits, flush_cards >> 16, 0).sum(axis=1)
+            ranks[flush_hands] = self._flush_rank_array[rank_bits]
+        return ranks
+
+
+if np is not None:
+    # Card keys by bits 8 to 15 of a treys card, its rank and suit
+    _CARD_KEY_ARRAY = np.zeros(1 << 8, dtype=np.uint32)
+    for _card, _card_key in CARD_KEYS.items():
+        _CARD_KEY_ARRAY[(_card >> 8) & 0xFF] = _card_key
+    _FLUSH_SUIT_ARRAY = np.array(FLUSH_SUITS, dtype=np.int8)
+
+
+def load_rank_table(path: str | Path) -> Optional[HandRankTable]:
+    """The rank table at `path`, None when it was not built."""
+    if not Path(path).exists():
+        return None
+    return HandRankTable(path)
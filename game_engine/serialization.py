@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import json
+import math
+from typing import Any, Iterable
+
+from treys import Card
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - depends on the environment
+    msgpack = None
+
+JSON_ENCODER = "stdlib" if orjson is None else "orjson"
+ENCODING_JSON = "json"
+ENCODING_MSGPACK = "msgpack"
+
+_CARD_STRINGS: dict[int, str] = {}
+
+
+def dumps(value: Any) -> str:
+    """
+    Encodes a protocol message as JSON text, with orjson when it is installed.
+
+    Both encoders write the same bytes, in orjson's form: no spaces after separators, non-ASCII characters as
+    UTF-8 instead of \\u escapes, and NaN and infinities as null. orjson's output is decoded back to str so
+    messages still go out as text frames.
+    """
+    if orjson is not None:
+        return orjson.dumps(value).decode()
+    try:
+        return json.dumps(value, separators=(",", ":"), ensure_ascii=False, allow_nan=False)
+    except ValueError:
+        return json.dumps(_replace_non_finite(value), separators=(",", ":"), ensure_ascii=False)
+
+
+def _replace_non_finite(value: Any) -> Any:
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {key: _replace_non_finite(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_replace_non_finite(item) for item in value]
+    return value
+
+
+def resolve_encoding(requested_encoding: Any) -> str:
+    """MessagePack when the client asks for it and msgpack is installed, JSON otherwise."""
+    if requested_encoding == ENCODING_MSGPACK and msgpack is not None:
+        return ENCODING_MSGPACK
+    return ENCODING_JSON
+
+
+def encode(value: Any, encoding: str = ENCODING_JSON) -> str | bytes:
+    """JSON messages go out as text frames, MessagePack ones as binary frames."""
+    if encoding == ENCODING_MSGPACK:
+        return msgpack.packb(value)
+    return dumps(value)
+
+
+def decode(message: str | bytes) -> Any:
+    """Reads a JSON text frame or a MessagePack binary frame, raises ValueError when it is neither."""
+    if isinstance(message, bytes) and msgpack is not None:
+        return msgpack.unpackb(message)
+    return json.loads(message)
+
+
+def decode_client_message(message: str | bytes) -> str:
+    """
+    Turns a message from a client into the text the protocol parsers read. MessagePack clients send actions as
+    strings and requests as maps, maps come back as their JSON text.
+    """
+    if isinstance(message, str) or msgpack is None:
+        return message if isinstance(message, str) else message.decode("utf-8", errors="replace")
+
+    try:
+        value = msgpack.unpackb(message)
+    except (ValueError, msgpack.UnpackException):
+        return ""
+    if isinstance(value, str):
+        return value
+    return json.dumps(value)
+
+
+def card_to_str(card: int) -> str:
+    card_string = _CARD_STRINGS.get(card)
+    if card_string is None:
+        card_string = _CARD_STRINGS[card] = Card.int_to_str(card)
+    return card_string
+
+
+def cards_to_strs(cards: Iterable[int]) -> list[str]:
+    return [card_to_str(card) for card in cards]
@@ -1,61 +1,186 @@
 from __future__ import annotations
 
 import asyncio
-from dataclasses import replace
+import signal
+from typing import Optional
 
 import websockets
 
-from .config import GameConfig, ServerConfig, build_game_config, load_server_config
+from .bots import serve_bot_session
+from .checkpoints import (
+    SERVICE_RESTART_CLOSE_CODE,
+    SESSION_BUSY_CLOSE_CODE,
+    CheckpointStore,
+    SessionRegistry,
+    attach_checkpointer,
+)
+from .common_types import ChipMode
+from .config import GameConfig, ServerConfig, build_session_config, load_server_config
 from .game import Game
-from .protocol import parse_start_request
+from .inbound import InboundReader
+from .outbound import DEFAULT_HIGH_WATER_MARK, OutboundQueue, OverflowPolicy
+from .protocol import (
+    STATE_PROTOCOL_FULL,
+    build_session_message,
+    build_session_suspended_message,
+    parse_bot_session_request,
+    parse_start_request,
+    parse_table_request,
+)
+from .serialization import ENCODING_JSON, decode_client_message
+from .tables import TableManager
 
 
 async def simulate_poker_game(
     websocket,
     game_type: str,
     config: GameConfig,
+    state_protocol: str = STATE_PROTOCOL_FULL,
+    encoding: str = ENCODING_JSON,
+    *,
+    high_water_mark: int = DEFAULT_HIGH_WATER_MARK,
+    overflow_policy: OverflowPolicy = OverflowPolicy.COALESCE,
+    sessions: Optional[SessionRegistry] = None,
+    session_token: Optional[str] = None,
 ) -> None:
+    outbound_queue = None
+    if websocket is not None:
+        # A lagging delta client skips the waiting patches and gets the latest snapshot instead
+        coalesce = None if state_protocol == STATE_PROTOCOL_FULL else lambda _: game.state_stream.snapshot()
+        # Resync requests are answered whenever they arrive, not only while the human is on turn
+        inbound = InboundReader(websocket, lambda: game.resync_game_state())
+        outbound_queue = OutboundQueue(
+            websocket,
+            high_water_mark=high_water_mark,
+            overflow_policy=overflow_policy,
+            coalesce=coalesce,
+            inbound=inbound,
+        )
+        inbound.start()
+
     game = Game(
-        websocket=websocket,
+        websocket=outbound_queue,
         game_type=game_type,
         config=config,
+        state_protocol=state_protocol,
+        encoding=encoding,
     )
-    await game.start_game()
+    if sessions is None or outbound_queue is None or config.chip_mode != ChipMode.PERSISTENT_MATCH:
+        try:
+            await game.start_game()
+        finally:
+            if outbound_queue is not None:
+                await outbound_queue.close()
+        return
+
+    if session_token is not None and not await sessions.take_over(session_token):
+        # Two games of one session would both play and write its checkpoint
+        await outbound_queue.close()
+        await websocket.close(code=SESSION_BUSY_CLOSE_CODE, reason="Session still running")
+        return
+    resumed = await attach_checkpointer(game, sessions.store, session_token)
+    token = game.checkpointer.token
+    sessions.register(token, game, websocket)
+    await outbound_queue.send(build_session_message(token, resumed))
+    try:
+        await game.start_game()
+    finally:
+        if game.is_game_over:
+            await game.checkpointer.discard()
+        else:
+            await game.checkpointer.flush()
+        if game.is_suspended and sessions.is_draining:
+            await outbound_queue.send(build_session_suspended_message(token))
+        await outbound_queue.close()
+        sessions.unregister(token, game)
+
+    if game.is_suspended:
+        await websocket.close(code=SERVICE_RESTART_CLOSE_CODE, reason="Session suspended")
 
 
-async def handle_client(websocket, path=None, *, server_config: ServerConfig | None = None):
+async def handle_client(
+    websocket,
+    path=None,
+    *,
+    server_config: ServerConfig | None = None,
+    table_manager: TableManager | None = None,
+    sessions: SessionRegistry | None = None,
+):
     active_server_config = server_config or load_server_config()
+    if sessions is not None and sessions.is_draining:
+        await websocket.close(code=SERVICE_RESTART_CLOSE_CODE, reason="Server is restarting")
+        return
+
+    async for raw_message in websocket:
+        message = decode_client_message(raw_message)
+        table_request = parse_table_request(
+            message,
+            default_chip_mode=active_server_config.game_config.chip_mode,
+        )
+        if table_request is not None:
+            active_table_manager = table_manager or TableManager(active_server_config.game_config)
+            await active_table_manager.serve(websocket, table_request)
+            break
+
+        bot_session_request = parse_bot_session_request(message)
+        if bot_session_request is not None:
+            await serve_bot_session(websocket, bot_session_request, active_server_config.game_config)
+            break
 
-    async for message in websocket:
         request = parse_start_request(
             message,
             default_chip_mode=active_server_config.game_config.chip_mode,
         )
         if request is not None:
-            base_config = active_server_config.game_config
-            session_max_rounds = (
-                base_config.max_rounds
-                if base_config.chip_mode == request.chip_mode
-                else build_game_config(chip_mode=request.chip_mode).max_rounds
-            )
-            session_config = replace(
-                base_config,
-                chip_mode=request.chip_mode,
-                max_rounds=session_max_rounds,
+            session_config = build_session_config(active_server_config.game_config, request.chip_mode)
+            await simulate_poker_game(
+                websocket,
+                request.game_type,
+                session_config,
+                request.state_protocol,
+                request.encoding,
+                high_water_mark=active_server_config.send_queue_high_water_mark,
+                overflow_policy=active_server_config.send_queue_overflow_policy,
+                sessions=sessions,
+                session_token=request.session_token,
             )
-            await simulate_poker_game(websocket, request.game_type, session_config)
         break
 
 
-async def run_server(server_config: ServerConfig | None = None) -> None:
+async def run_server(
+    server_config: ServerConfig | None = None,
+    *,
+    stop: Optional[asyncio.Event] = None,
+    handle_signals: bool = False,
+) -> None:
+    """
+    Serves until `stop` is set, or SIGTERM arrives when `handle_signals` is on. Resumable sessions are then
+    suspended at their next round boundary, so their clients can resume them on the next server.
+    """
     active_server_config = server_config or load_server_config()
+    table_manager = TableManager(active_server_config.game_config)
+    sessions = None
+    if active_server_config.checkpoint_dir is not None:
+        sessions = SessionRegistry(CheckpointStore(active_server_config.checkpoint_dir))
+
+    stop = stop or asyncio.Event()
+    if handle_signals:
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stop.set)
 
     async def websocket_handler(websocket, path=None):
-        await handle_client(websocket, path=path, server_config=active_server_config)
+        await handle_client(
+            websocket,
+            path=path,
+            server_config=active_server_config,
+            table_manager=table_manager,
+            sessions=sessions,
+        )
 
     async with websockets.serve(
         websocket_handler,
         active_server_config.host,
         active_server_config.port,
     ):
-        await asyncio.Future()
+        await stop.wait()
+        if sessions is not None:
+            await sessions.drain()
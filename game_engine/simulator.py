@@ -0,0 +1,284 @@
+from __future__ import annotations
+
+import csv
+import gzip
+import io
+import math
+import random
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Coroutine, Iterator, Optional, Sequence, TextIO
+
+from .ai import NashBlueprintPolicy
+from .blind_structure import BlindStructure
+from .common_types import ChipMode
+from .abstraction import CardAbstraction
+from .config import GameConfig, build_game_config
+from .game import Game, Round
+from .pacing import PacingMode, VirtualClockPacing
+from .random_control import resolve_random_seed
+
+DEFAULT_HANDS_PER_GAME = 10_000
+HAND_RESULT_FIELDS = ("game_seed", "hand", "dealer", "cards", "board", "history", "showdown", "chip_deltas")
+
+
+def run_sync(coroutine: Coroutine):
+    """
+    Runs an engine coroutine to completion without an event loop.
+
+    Without a websocket and with a pacing that does not sleep, no engine coroutine ever suspends, so a single
+    send finishes it.
+    """
+    try:
+        coroutine.send(None)
+    except StopIteration as stop:
+        return stop.value
+
+    coroutine.close()
+    raise RuntimeError("The game suspended, headless games need a pacing that does not sleep and no websocket.")
+
+
+@dataclass(frozen=True)
+class HandResult:
+    game_seed: int
+    hand: int
+    dealer: int
+    cards: tuple[str, ...]
+    board: str
+    history: str
+    is_showdown: bool
+    chip_deltas: tuple[int, ...]
+    # Seconds the hand's phase and AI turn delays would take at a table, by the game's virtual clock
+    virtual_seconds: float = 0.0
+
+    def to_row(self) -> list[object]:
+        return [
+            self.game_seed,
+            self.hand,
+            self.dealer,
+            " ".join(self.cards),
+            self.board,
+            self.history,
+            int(self.is_showdown),
+            " ".join(map(str, self.chip_deltas)),
+        ]
+
+
+@dataclass(frozen=True)
+class SimulationSummary:
+    """
+    Per-seat chip totals, enough to report the mean result of each seat and its standard error, and the time the
+    hands would take at a table with real-time pacing.
+    """
+
+    hands: int
+    chip_totals: tuple[int, ...]
+    chip_squared_totals: tuple[int, ...]
+    big_blind: int
+    virtual_seconds: float = 0.0
+
+    @classmethod
+    def empty(cls, num_seats: int, big_blind: int) -> "SimulationSummary":
+        return cls(0, (0,) * num_seats, (0,) * num_seats, big_blind)
+
+    def add(self, chip_deltas: Sequence[int], virtual_seconds: float = 0.0) -> "SimulationSummary":
+        return SimulationSummary(
+            self.hands + 1,
+            tuple(total + delta for total, delta in zip(self.chip_totals, chip_deltas)),
+            tuple(total + delta * delta for total, delta in zip(self.chip_squared_totals, chip_deltas)),
+            self.big_blind,
+            self.virtual_seconds + virtual_seconds,
+        )
+
+    def merge(self, other: "SimulationSummary") -> "SimulationSummary":
+        return SimulationSummary(
+            self.hands + other.hands,
+            tuple(a + b for a, b in zip(self.chip_totals, other.chip_totals)),
+            tuple(a + b for a, b in zip(self.chip_squared_totals, other.chip_squared_totals)),
+            self.big_blind,
+            self.virtual_seconds + other.virtual_seconds,
+        )
+
+    def get_mean(self, seat: int) -> float:
+        return self.chip_totals[seat] / self.hands if self.hands else 0.0
+
+    def get_standard_error(self, seat: int) -> float:
+        if self.hands < 2:
+            return math.inf
+        mean = self.get_mean(seat)
+        variance = (self.chip_squared_totals[seat] - self.hands * mean * mean) / (self.hands - 1)
+        return math.sqrt(max(variance, 0.0) / self.hands)
+
+    def get_mbb_per_hand(self, seat: int) -> float:
+        return 1000 * self.get_mean(seat) / self.big_blind
+
+    def format(self) -> str:
+        lines = [f"{self.hands} hands"]
+        if self.virtual_seconds:
+            lines[0] += f", {self.virtual_seconds / 3600:.1f} hours at a table"
+        for seat in range(len(self.chip_totals)):
+            lines.append(
+                f"seat {seat}: {self.get_mbb_per_hand(seat):+.1f} mbb/hand "
+                f"(+/- {1000 * 1.96 * self.get_standard_error(seat) / self.big_blind:.1f} at 95%)"
+            )
+        return "\n".join(lines)
+
+
+def build_simulation_config(
+    *,
+    initial_chips: Optional[int] = None,
+    model_path: str | Path | None = None,
+    card_abstraction: CardAbstraction | str | None = None,
+) -> GameConfig:
+    """Two AI seats, stacks reset every hand and a virtual clock, the setting the simulator plays hands in."""
+    config = build_game_config(
+        num_ai_players=2,
+        num_human_players=0,
+        chip_mode=ChipMode.RESET_EACH_ROUND,
+        model_path=model_path,
+        pacing=PacingMode.VIRTUAL,
+        card_abstraction=card_abstraction,
+    )
+    if initial_chips is not None:
+        config = replace(config, initial_chips=initial_chips)
+    return config
+
+
+def simulate_hands(
+    game_type: str,
+    config: GameConfig,
+    num_hands: int,
+    *,
+    model_paths: Optional[Sequence[str | Path]] = None,
+) -> Iterator[HandResult]:
+    """
+    Plays `num_hands` hands of one headless game and yields the result of each.
+
+    The hands go through the same Round, Phase and Turn code as websocket games, seeded by `config.random_seed`.
+    `model_paths` gives each seat its own blueprint, the seats play `config.model_path` otherwise.
+    """
+    if config.num_human_players:
+        raise ValueError("Headless games can only have AI players.")
+    if config.pacing.suspends:
+        raise ValueError(f"Headless games cannot sleep, got {config.pacing!r}.")
+
+    config = replace(config, max_rounds=num_hands)
+    game = Game(None, game_type, config)
+    players = game.players.get_players("all")
+    if model_paths is not None:
+        if len(model_paths) != len(players):
+            raise ValueError(f"Expected one model path per seat, got {len(model_paths)} for {len(players)} seats.")
+        for player, model_path in zip(players, model_paths):
+            player.policy = NashBlueprintPolicy(model_path=model_path, rng=game.rng)
+
+    while not game.is_finished():
+        dealer = game.get_current_dealer().id
+        small_blind, big_blind = game.get_blinds()
+        started_at = _get_virtual_time(game)
+        round_instance = Round(game, small_blind, big_blind)
+        run_sync(round_instance.start())
+        yield build_hand_result(game, round_instance, dealer, _get_virtual_time(game) - started_at)
+        game.finish_round()
+
+
+def _get_virtual_time(game: Game) -> float:
+    return game.pacing.now if isinstance(game.pacing, VirtualClockPacing) else 0.0
+
+
+def build_hand_result(game: Game, round_instance: Round, dealer: int, virtual_seconds: float = 0.0) -> HandResult:
+    """The result of a hand `round_instance` just played, before the game finishes the round."""
+    players = game.players.get_players("all")
+    return HandResult(
+        game_seed=game.random_seed,
+        hand=game.round_num,
+        dealer=dealer,
+        cards=tuple("".join(round_instance.player_cards_str.get(player.id, [])) for player in players),
+        board="".join(round_instance.table_str),
+        history="".join(players[0].parse_action_to_info_set(action) for action in round_instance.history),
+        is_showdown=round_instance.is_showdown,
+        chip_deltas=tuple(player.chips_won_history[-1] for player in players),
+        virtual_seconds=virtual_seconds,
+    )
+
+
+def _simulate_shard(
+    shard: tuple[str, GameConfig, int, Optional[Sequence[str | Path]], bool],
+) -> tuple[SimulationSummary, str]:
+    game_type, config, num_hands, model_paths, keep_rows = shard
+    big_blind = BlindStructure(game_type == "Leduc").get_blinds()[1]
+    summary = SimulationSummary.empty(config.num_ai_players, big_blind)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    for hand_result in simulate_hands(game_type, config, num_hands, model_paths=model_paths):
+        summary = summary.add(hand_result.chip_deltas, hand_result.virtual_seconds)
+        if keep_rows:
+            writer.writerow(hand_result.to_row())
+    return summary, buffer.getvalue()
+
+
+def _open_output(output_path: Path) -> TextIO:
+    if output_path.suffix == ".gz":
+        return gzip.open(output_path, "wt", newline="")
+    return output_path.open("w", newline="")
+
+
+def run_simulation(
+    num_hands: int,
+    *,
+    game_type: str = "Leduc",
+    config: Optional[GameConfig] = None,
+    num_workers: int = 1,
+    hands_per_game: int = DEFAULT_HANDS_PER_GAME,
+    random_seed: Optional[int] = None,
+    output_path: str | Path | None = None,
+    model_paths: Optional[Sequence[str | Path]] = None,
+) -> SimulationSummary:
+    """
+    Plays `num_hands` headless hands, split into games of at most `hands_per_game` hands.
+
+    Game i is seeded with `random_seed + i`, so a run is reproducible whatever the number of workers. Games are
+    spread over a process pool, their results are written to `output_path` as CSV (gzipped if it ends in .gz)
+    in game order, one row per hand.
+    """
+    if num_hands < 1:
+        raise ValueError("num_hands must be at least 1.")
+    if hands_per_game < 1:
+        raise ValueError("hands_per_game must be at least 1.")
+
+    config = config or build_simulation_config()
+    base_seed = resolve_random_seed(random_seed)
+    if base_seed is None:
+        base_seed = random.SystemRandom().randrange(2**32)
+
+    keep_rows = output_path is not None
+    model_paths = None if model_paths is None else [str(model_path) for model_path in model_paths]
+    shards = [
+        (game_type, replace(config, random_seed=base_seed + index), min(hands_per_game, num_hands - start), model_paths, keep_rows)
+        for index, start in enumerate(range(0, num_hands, hands_per_game))
+    ]
+
+    output_file = None if output_path is None else _open_output(Path(output_path))
+    summary: Optional[SimulationSummary] = None
+    try:
+        if output_file is not None:
+            output_file.write(",".join(HAND_RESULT_FIELDS) + "\n")
+
+        with ExitStack() as stack:
+            if num_workers > 1:
+                executor = stack.enter_context(ProcessPoolExecutor(max_workers=num_workers))
+                shard_results = executor.map(_simulate_shard, shards)
+            else:
+                shard_results = map(_simulate_shard, shards)
+
+            for shard_summary, rows in shard_results:
+                summary = shard_summary if summary is None else summary.merge(shard_summary)
+                if output_file is not None:
+                    output_file.write(rows)
+    finally:
+        if output_file is not None:
+            output_file.close()
+
+    assert summary is not None
+    return summary
@@ -0,0 +1,230 @@
+from __future__ import annotations
+
+import asyncio
+import uuid
+from contextlib import suppress
+from typing import Any, Optional
+
+import websockets
+
+from .config import GameConfig, build_session_config
+from .game import Game
+from .inbound import InboundReader
+from .outbound import SLOW_CLIENT_CLOSE_CODE
+from .player import Player
+from .protocol import STATE_PROTOCOL_DELTA, TableRequest, build_table_message, is_resync_request
+from .serialization import decode_client_message
+
+DEFAULT_MAX_BUFFERED_BYTES = 1 << 20
+
+
+class TableBroadcast:
+    """
+    Stands in for the websocket of a shared table's Game. Each state is serialized once, by the game's delta
+    stream, and written to every client of the table.
+
+    websockets.broadcast writes without waiting for slow clients, so each client's write buffer is checked after
+    every message and clients holding more than `max_buffered_bytes` unsent are disconnected instead of letting
+    the buffer grow without bound.
+    """
+
+    def __init__(self, max_buffered_bytes: int = DEFAULT_MAX_BUFFERED_BYTES) -> None:
+        self.clients: set[Any] = set()
+        self.max_buffered_bytes = max_buffered_bytes
+        self.dropped_clients = 0
+        self._closing_tasks: set[asyncio.Task] = set()
+
+    def add(self, websocket, snapshot: Optional[str] = None) -> None:
+        # Written synchronously, so no broadcast can come between the snapshot and the client joining
+        if snapshot is not None:
+            websockets.broadcast([websocket], snapshot)
+        self.clients.add(websocket)
+
+    def discard(self, websocket) -> None:
+        self.clients.discard(websocket)
+
+    async def send(self, message: str) -> None:
+        websockets.broadcast(self.clients, message)
+
+        for websocket in list(self.clients):
+            transport = websocket.transport
+            if transport is not None and transport.get_write_buffer_size() > self.max_buffered_bytes:
+                self.drop(websocket)
+
+    def drop(self, websocket) -> None:
+        self.clients.discard(websocket)
+        self.dropped_clients += 1
+        # Clients dropped for being too slow can come back as spectators and get a fresh snapshot
+        closing_task = asyncio.ensure_future(websocket.close(code=SLOW_CLIENT_CLOSE_CODE, reason="Client too slow"))
+        self._closing_tasks.add(closing_task)
+        closing_task.add_done_callback(self._closing_tasks.discard)
+
+
+class Table:
+    """A Game shared by the people seated at it and watched by any number of spectators."""
+
+    def __init__(
+        self,
+        table_id: str,
+        game_type: str,
+        config: GameConfig,
+        max_buffered_bytes: int = DEFAULT_MAX_BUFFERED_BYTES,
+    ) -> None:
+        self.id = table_id
+        self.game_type = game_type
+        self.broadcast = TableBroadcast(max_buffered_bytes)
+        self.game = Game(self.broadcast, game_type, config, state_protocol=STATE_PROTOCOL_DELTA)
+        self.seats: dict[int, Any] = {}
+        self.spectators: set[Any] = set()
+        self.finished = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def is_started(self) -> bool:
+        return self.task is not None
+
+    def get_free_seats(self) -> list[Player]:
+        return [player for player in self.game.players.get_players("human") if player.id not in self.seats]
+
+    def take_seat(self, websocket) -> Optional[Player]:
+        free_seats = self.get_free_seats()
+        if self.is_started or not free_seats:
+            return None
+
+        player = free_seats[0]
+        # The game reads the seat through the reader, which answers resync requests between the seat's turns too
+        player.websocket = InboundReader(websocket, lambda: self.game.resync_game_state(websocket))
+        self.seats[player.id] = websocket
+        self.broadcast.add(websocket)
+        return player
+
+    def leave_seat(self, player: Player) -> None:
+        """Frees a seat before the game starts, once it runs the seat folds whenever its connection is gone."""
+        if self.is_started:
+            return
+        self.broadcast.discard(self.seats.pop(player.id, None))
+        player.websocket = None
+
+    def add_spectator(self, websocket) -> None:
+        self.spectators.add(websocket)
+        snapshot = None if self.game.state_stream is None else self.game.state_stream.snapshot()
+        self.broadcast.add(websocket, snapshot)
+
+    def remove_spectator(self, websocket) -> None:
+        self.spectators.discard(websocket)
+        self.broadcast.discard(websocket)
+
+    def start(self) -> asyncio.Task:
+        for player in self._get_seated_players():
+            player.websocket.start()
+        self.task = asyncio.create_task(self._run())
+        return self.task
+
+    async def _run(self) -> None:
+        try:
+            await self.game.start_game()
+        finally:
+            for player in self._get_seated_players():
+                await player.websocket.close()
+            self.finished.set()
+
+    def _get_seated_players(self) -> list[Player]:
+        return [player for player in self.game.players.get_players("human") if player.id in self.seats]
+
+    def describe(self) -> dict[str, Any]:
+        return {
+            "tableId": self.id,
+            "gameType": self.game_type,
+            "chipMode": self.game.chip_mode.value,
+            "humanSeats": len(self.game.players.get_players("human")),
+            "freeSeats": len(self.get_free_seats()),
+            "spectators": len(self.spectators),
+            "started": self.is_started,
+        }
+
+
+class TableManager:
+    """
+    Registry of the shared tables of one server process.
+
+    A table starts once all its human seats are taken and leaves the registry when its game ends, or when
+    everyone seated at it leaves before it starts.
+    """
+
+    def __init__(self, game_config: GameConfig, max_buffered_bytes: int = DEFAULT_MAX_BUFFERED_BYTES) -> None:
+        self.game_config = game_config
+        self.max_buffered_bytes = max_buffered_bytes
+        self.tables: dict[str, Table] = {}
+
+    def create_table(self, request: TableRequest) -> Table:
+        table_config = build_session_config(
+            self.game_config,
+            request.chip_mode,
+            num_human_players=request.human_seats,
+        )
+        table = Table(uuid.uuid4().hex[:8], request.game_type, table_config, self.max_buffered_bytes)
+        self.tables[table.id] = table
+        return table
+
+    def get_table(self, table_id: Optional[str]) -> Optional[Table]:
+        return None if table_id is None else self.tables.get(table_id)
+
+    def remove_table(self, table: Table) -> None:
+        if self.tables.get(table.id) is table:
+            del self.tables[table.id]
+
+    async def serve(self, websocket, request: TableRequest) -> None:
+        """Handles one connection after its table request, until it leaves or its table's game ends."""
+        if request.action == "list-tables":
+            tables = [table.describe() for table in self.tables.values()]
+            await websocket.send(build_table_message("table-list", tables=tables))
+            return
+
+        table = self.create_table(request) if request.action == "create-table" else self.get_table(request.table_id)
+        if table is None:
+            await websocket.send(build_table_message("table-error", message=f"Unknown table {request.table_id}."))
+            return
+
+        if request.action == "spectate-table":
+            await self._spectate(table, websocket)
+        else:
+            await self._sit(table, websocket)
+
+    async def _sit(self, table: Table, websocket) -> None:
+        player = table.take_seat(websocket)
+        if player is None:
+            await websocket.send(build_table_message("table-error", message=f"Table {table.id} has no free seat."))
+            return
+
+        await websocket.send(build_table_message("table-joined", tableId=table.id, role="player", seat=player.id))
+        if not table.get_free_seats():
+            table.start().add_done_callback(lambda _: self.remove_table(table))
+
+        # The seat's reader reads this connection once the game starts, so only wait for it to close here
+        await self._wait_for_table_or_close(table, websocket.wait_closed())
+        if not table.is_started:
+            table.leave_seat(player)
+            if not table.seats:
+                self.remove_table(table)
+
+    async def _spectate(self, table: Table, websocket) -> None:
+        await websocket.send(build_table_message("table-joined", tableId=table.id, role="spectator"))
+        table.add_spectator(websocket)
+        try:
+            await self._wait_for_table_or_close(table, self._read_spectator(table, websocket))
+        finally:
+            table.remove_spectator(websocket)
+
+    async def _read_spectator(self, table: Table, websocket) -> None:
+        with suppress(websockets.exceptions.ConnectionClosed):
+            async for message in websocket:
+                if is_resync_request(decode_client_message(message)):
+                    await table.game.resync_game_state(websocket)
+
+    async def _wait_for_table_or_close(self, table: Table, connection_done) -> None:
+        waiters = {asyncio.ensure_future(connection_done), asyncio.ensure_future(table.finished.wait())}
+        try:
+            await asyncio.wait(waiters, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for waiter in waiters:
+                waiter.cancel()
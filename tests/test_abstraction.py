@@ -0,0 +1,193 @@
+import asyncio
+import os
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from treys import Card
+
+from game_engine import abstraction, equity, evaluation
+from game_engine.abstraction import (
+    BUCKET_STANDARD_ERROR,
+    DEFAULT_BUILD_SAMPLES,
+    BucketTable,
+    CardAbstraction,
+    get_bucket,
+    get_bucket_for_equity,
+    get_bucket_path,
+    get_class_key,
+    resolve_card_abstraction,
+    write_bucket_table,
+)
+from game_engine.config import build_game_config
+from game_engine.equity import calculate_equity
+from game_engine.game import Game
+from game_engine.rank_table import np, write_rank_table
+from game_engine.simulator import run_sync
+
+
+class _FoldingPolicy:
+    def __init__(self, *, model_path, rng):
+        self.info_sets: list[str] = []
+
+    def decide_next_action(self, infoset: str) -> str:
+        self.info_sets.append(infoset)
+        return "f"
+
+
+def _cards(*card_strings: str) -> list[int]:
+    return [Card.new(card_string) for card_string in card_strings]
+
+
+def _clear_caches(test_case: unittest.TestCase) -> None:
+    for cached_function in (
+        evaluation._load_rank_table,
+        equity._calculate_canonical_equity,
+        abstraction._load_bucket_table,
+        abstraction._get_canonical_bucket,
+    ):
+        cached_function.cache_clear()
+        test_case.addCleanup(cached_function.cache_clear)
+
+
+class CardAbstractionTests(unittest.TestCase):
+    def setUp(self) -> None:
+        _clear_caches(self)
+        environment = patch.dict(os.environ, {"POKER_ML_BUCKET_TABLE": "missing-buckets.bin"}, clear=False)
+        environment.start()
+        self.addCleanup(environment.stop)
+
+    def test_class_keys_ignore_suits_and_card_order(self) -> None:
+        key = get_class_key(_cards("As", "Ks"), _cards("2s", "7h", "Qd"))
+        self.assertEqual(get_class_key(_cards("Kc", "Ac"), _cards("Qs", "2c", "7d")), key)
+        self.assertNotEqual(get_class_key(_cards("As", "Kh"), _cards("2s", "7h", "Qd")), key)
+
+    def test_on_demand_buckets_follow_equity(self) -> None:
+        self.assertEqual(get_bucket_for_equity(1.0, 10), 9)
+        self.assertEqual(get_bucket_for_equity(0.25, 4), 1)
+
+        board = _cards("2s", "7h", "Qd", "Qc", "9s")
+        result = calculate_equity([_cards("As", "Qs")], board, random_opponents=1)
+        self.assertEqual(get_bucket(_cards("As", "Qs"), board), get_bucket_for_equity(result.equity[0], 10))
+        self.assertEqual(get_bucket(_cards("As", "Ah")), 8)
+        self.assertLess(get_bucket(_cards("7s", "2h")), get_bucket(_cards("As", "Ah")))
+
+        self.assertEqual(len(get_bucket_path(_cards("As", "Qs"), board)), 4)
+        self.assertEqual(get_bucket_path(_cards("As", "Qs"), board)[3], get_bucket(_cards("As", "Qs"), board))
+
+    def test_built_and_on_demand_buckets_share_a_precision(self) -> None:
+        # The largest standard error of an equity estimated from the build's deals
+        for samples in DEFAULT_BUILD_SAMPLES.values():
+            self.assertLessEqual((0.25 / samples) ** 0.5, BUCKET_STANDARD_ERROR)
+        with patch("game_engine.abstraction.calculate_equity", wraps=calculate_equity) as calculate:
+            get_bucket(_cards("9s", "8s"), _cards("2s", "7h", "Qd", "Kc"))
+        self.assertEqual(calculate.call_args.kwargs["target_standard_error"], BUCKET_STANDARD_ERROR)
+
+    def test_resolve_card_abstraction(self) -> None:
+        self.assertEqual(resolve_card_abstraction(" Buckets "), CardAbstraction.BUCKETS)
+        self.assertEqual(resolve_card_abstraction("unknown"), CardAbstraction.RANKS)
+        self.assertEqual(resolve_card_abstraction(None), CardAbstraction.RANKS)
+        self.assertEqual(build_game_config(card_abstraction="buckets").card_abstraction, CardAbstraction.BUCKETS)
+
+    def test_bucketed_info_sets(self) -> None:
+        game = Game(None, "Texas Hold'em", build_game_config(num_ai_players=2, card_abstraction="buckets"))
+        player = game.players.initial_players[0]
+        buckets = get_bucket_path(_cards("As", "Qs"), _cards("2s", "7h", "Qd"))
+        self.assertEqual(
+            player.get_info_set(["As", "Qs"], ["2s", "7h", "Qd"], []), f":|{buckets[0]}/{buckets[1]}"
+        )
+        self.assertEqual(player.get_info_set(["As", "Qs"], [], []), f":|{buckets[0]}")
+
+        leduc_game = Game(None, "Leduc", build_game_config(num_ai_players=2, card_abstraction="buckets"))
+        self.assertEqual(leduc_game.players.initial_players[0].get_info_set(["Ks"], ["Qd"], []), ":|K/Q")
+
+    def test_served_games_compute_buckets_off_the_event_loop(self) -> None:
+        threads = []
+
+        def get_bucket_path_in_thread(hole, board):
+            threads.append(threading.get_ident())
+            return (3, 5)
+
+        with patch("game_engine.game.NashBlueprintPolicy", _FoldingPolicy):
+            game = Game(None, "Texas Hold'em", build_game_config(num_ai_players=2, card_abstraction="buckets"))
+        player = game.players.initial_players[0]
+        with patch("game_engine.player.get_bucket_path", get_bucket_path_in_thread):
+            asyncio.run(player.play_ai_turn(20, 20, ["As", "Qs"], ["2s", "7h", "Qd"], []))
+            run_sync(player.play_ai_turn(20, 20, ["As", "Qs"], ["2s", "7h", "Qd"], []))
+
+        self.assertEqual(game.policy.info_sets, [":|3/5", ":|3/5"])
+        # Headless games have no loop to block and compute them in place
+        self.assertNotEqual(threads[0], threading.get_ident())
+        self.assertEqual(threads[1], threading.get_ident())
+
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class BucketTableTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.temp_dir = tempfile.TemporaryDirectory()
+        cls.rank_table_path = write_rank_table(Path(cls.temp_dir.name) / "holdem-7card.ranks")
+        cls.path = Path(cls.temp_dir.name) / "holdem-buckets.bin"
+        cls.flops = [_cards("2s", "7h", "Qd"), _cards("Ah", "Kh", "5h")]
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.temp_dir.cleanup()
+
+    def setUp(self) -> None:
+        _clear_caches(self)
+        environment = patch.dict(
+            os.environ,
+            {"POKER_ML_RANK_TABLE": str(self.rank_table_path), "POKER_ML_BUCKET_TABLE": str(self.path)},
+            clear=False,
+        )
+        environment.start()
+        self.addCleanup(environment.stop)
+        if not self.path.exists():
+            write_bucket_table(self.path, num_buckets=8, samples=2000, flops=self.flops)
+
+    def test_table_holds_every_class_of_its_streets(self) -> None:
+        bucket_table = BucketTable(self.path)
+        self.assertEqual(bucket_table.num_buckets, 8)
+        self.assertEqual(len(bucket_table._streets[0][0]), 169)
+        self.assertEqual(len(bucket_table._streets[4][0]), 0)
+        self.assertIsNotNone(bucket_table.get(get_class_key(_cards("9d", "Ts"), _cards("Qs", "2c", "7h")), 3))
+        self.assertIsNone(bucket_table.get(get_class_key(_cards("9d", "Ts"), _cards("Qs", "3c", "7h")), 3))
+
+    def test_table_buckets_match_on_demand_equities(self) -> None:
+        bucket_table = BucketTable(self.path)
+        for hole, board in (
+            (_cards("As", "Ah"), []),
+            (_cards("7s", "2h"), []),
+            (_cards("Qs", "Qc"), _cards("2s", "7h", "Qd")),
+            (_cards("3h", "4c"), _cards("Ah", "Kh", "5h")),
+        ):
+            table_bucket = bucket_table.get(get_class_key(hole, board), len(board))
+            self.assertEqual(get_bucket(hole, board), table_bucket)
+            result = calculate_equity([hole], board, random_opponents=1, random_seed=0)
+            self.assertAlmostEqual(table_bucket, result.equity[0] * 8, delta=1.0)
+
+    def test_a_table_built_after_a_missed_lookup_is_used(self) -> None:
+        copy_path = Path(self.temp_dir.name) / "late-buckets.bin"
+        with patch.dict(os.environ, {"POKER_ML_BUCKET_TABLE": str(copy_path)}, clear=False):
+            self.assertIsNone(abstraction.get_bucket_table())
+            copy_path.write_bytes(self.path.read_bytes())
+            self.assertEqual(abstraction.get_bucket_table().path, copy_path)
+
+    def test_tables_are_only_written_on_little_endian_hosts(self) -> None:
+        path = Path(self.temp_dir.name) / "big-endian.bin"
+        with patch("game_engine.abstraction.sys.byteorder", "big"), self.assertRaises(ValueError):
+            write_bucket_table(path, num_buckets=8, samples=2000, flops=self.flops)
+        self.assertFalse(path.exists())
+
+    def test_other_files_are_rejected(self) -> None:
+        other_path = Path(self.temp_dir.name) / "other.bin"
+        other_path.write_bytes(self.path.read_bytes()[:100])
+        with self.assertRaises(ValueError):
+            BucketTable(other_path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+import pickle
+import tempfile
+import unittest
+from pathlib import Path
+from random import Random
+
+from game_engine.ai import BlueprintStore, NashBlueprintPolicy, convert_pickle_blueprint, load_blueprint
+
+SAMPLE_MODEL = {
+    "k:|Q": ([0, 2, 3], [0.5, 0.25, 0.25]),
+    ":|K": ([0, 2], [0.1, 0.9]),
+    "kr200c/:|A/Q": ([0, 12], [0.0, 1.0]),
+    "-k:|Q": ([0], [1.0]),
+}
+
+
+class BlueprintStoreTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.pickle_path = Path(self.temp_dir.name) / "model.pkl"
+        with self.pickle_path.open("wb") as file_handle:
+            pickle.dump(SAMPLE_MODEL, file_handle)
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def test_converted_store_matches_pickle(self) -> None:
+        store = BlueprintStore(convert_pickle_blueprint(self.pickle_path))
+
+        self.assertEqual(dict(store), SAMPLE_MODEL)
+        self.assertEqual(list(store), sorted(SAMPLE_MODEL))
+        self.assertNotIn("kk:|Q", store)
+        self.assertIsNone(store.get("kk:|Q"))
+
+    def test_load_blueprint_detects_format(self) -> None:
+        binary_path = convert_pickle_blueprint(self.pickle_path)
+
+        self.assertIsInstance(load_blueprint(binary_path), BlueprintStore)
+        self.assertEqual(load_blueprint(self.pickle_path), SAMPLE_MODEL)
+
+    def test_policy_decides_the_same_with_both_formats(self) -> None:
+        binary_path = convert_pickle_blueprint(self.pickle_path)
+        pickle_policy = NashBlueprintPolicy(model_path=self.pickle_path, rng=Random(5))
+        binary_policy = NashBlueprintPolicy(model_path=binary_path, rng=Random(5))
+
+        for infoset in list(SAMPLE_MODEL) * 10 + ["kk:|Q"]:
+            self.assertEqual(binary_policy.decide_next_action(infoset), pickle_policy.decide_next_action(infoset))
+
+    def test_closed_store_releases_the_file(self) -> None:
+        binary_path = convert_pickle_blueprint(self.pickle_path)
+        with BlueprintStore(binary_path) as store:
+            self.assertEqual(store[":|K"], SAMPLE_MODEL[":|K"])
+        self.assertTrue(store._mmap.closed)
+        with self.assertRaises(ValueError):
+            store[":|K"]
+        store.close()
+
+        other_path = Path(self.temp_dir.name) / "other.blueprint"
+        other_path.write_bytes(b"not a blueprint" * 4)
+        with self.assertRaises(ValueError):
+            BlueprintStore(other_path)
+
+
+if __name__ == "__main__":
+    unittest.main()
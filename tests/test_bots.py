@@ -0,0 +1,129 @@
+import asyncio
+import json
+import socket
+import unittest
+from contextlib import suppress
+from unittest.mock import patch
+
+import websockets
+
+from game_engine.bots import get_legal_actions
+from game_engine.config import ServerConfig, build_game_config
+from game_engine.game import Game
+from game_engine.protocol import build_bot_session_message, parse_bot_session_request
+from game_engine.server import run_server
+
+
+class _AlwaysCallPolicy:
+    def __init__(self, *, model_path, rng):
+        self.model_path = model_path
+        self.rng = rng
+
+    def decide_next_action(self, infoset: str) -> str:
+        return "c"
+
+
+def _get_open_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class LegalActionsTests(unittest.TestCase):
+    def setUp(self) -> None:
+        game = Game(None, "Leduc", build_game_config(num_ai_players=0, num_human_players=2, initial_chips=1000))
+        self.player = game.players.initial_players[0]
+
+    def test_facing_a_bet(self) -> None:
+        legal_actions = get_legal_actions(self.player, 200, 200)
+
+        self.assertEqual(legal_actions.actions, ("f", "c"))
+        self.assertEqual((legal_actions.min_raise, legal_actions.max_raise), (600, 1200))
+        self.assertTrue(legal_actions.is_legal("r600"))
+        self.assertFalse(legal_actions.is_legal("r500"))
+        self.assertFalse(legal_actions.is_legal("k"))
+
+    def test_short_stack_cannot_raise(self) -> None:
+        self.player.chips = 200
+        legal_actions = get_legal_actions(self.player, 200, 200)
+
+        self.assertEqual(legal_actions.to_message(), {"a": ["f", "c"]})
+        self.assertEqual(legal_actions.get_default(), "f")
+
+    def test_short_stack_can_call_all_in_for_less(self) -> None:
+        self.player.chips = 150
+        legal_actions = get_legal_actions(self.player, 200, 200)
+
+        self.assertEqual(legal_actions.to_message(), {"a": ["f", "c"]})
+        self.assertTrue(legal_actions.is_legal("c"))
+        self.assertFalse(legal_actions.is_legal("r350"))
+
+    def test_request_is_validated(self) -> None:
+        request = parse_bot_session_request(build_bot_session_message("Leduc", 10, 4, random_seed=7))
+
+        self.assertEqual((request.hands, request.tables, request.random_seed), (10, 4, 7))
+        self.assertEqual(parse_bot_session_request(build_bot_session_message("Leduc", 2, 8)).tables, 2)
+        self.assertIsNone(parse_bot_session_request(build_bot_session_message("Leduc", 0)))
+        self.assertIsNone(parse_bot_session_request(build_bot_session_message("Chess", 10)))
+
+
+class BotSessionTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.policy_patch = patch("game_engine.game.NashBlueprintPolicy", _AlwaysCallPolicy)
+        self.policy_patch.start()
+
+        port = _get_open_port()
+        self.websocket_url = f"ws://127.0.0.1:{port}"
+        server_config = ServerConfig(host="127.0.0.1", port=port, game_config=build_game_config(num_ai_players=1))
+        self.server_task = asyncio.create_task(run_server(server_config))
+        for _ in range(50):
+            try:
+                async with websockets.connect(self.websocket_url):
+                    return
+            except OSError:
+                await asyncio.sleep(0.05)
+        self.fail("websocket server did not start in time")
+
+    async def asyncTearDown(self) -> None:
+        self.server_task.cancel()
+        with suppress(asyncio.CancelledError):
+            await self.server_task
+        self.policy_patch.stop()
+
+    async def _play_session(self, choose_action) -> tuple[dict, list[dict]]:
+        hand_results = []
+        async with websockets.connect(self.websocket_url) as websocket:
+            await websocket.send(build_bot_session_message("Leduc", 40, 4, random_seed=11))
+            while True:
+                replies = []
+                for message in json.loads(await asyncio.wait_for(websocket.recv(), timeout=5)):
+                    if message["t"] == "d":
+                        replies.append({"id": message["id"], "a": choose_action(message)})
+                    elif message["t"] == "r":
+                        hand_results.append(message)
+                    else:
+                        return message, hand_results
+                # Answered in reverse order, replies are matched by id
+                if replies:
+                    await websocket.send(json.dumps(replies[::-1]))
+
+    async def test_session_plays_every_hand_and_is_reproducible(self) -> None:
+        summary, hand_results = await self._play_session(lambda message: message["a"][-1])
+        repeated_summary, _ = await self._play_session(lambda message: message["a"][-1])
+
+        self.assertEqual(summary["hands"], 40)
+        self.assertEqual(len(hand_results), 40)
+        self.assertEqual(sorted({result["g"] for result in hand_results}), [0, 1, 2, 3])
+        self.assertEqual(summary["chips"], sum(result["c"] for result in hand_results))
+        self.assertEqual(summary["illegalActions"], 0)
+        self.assertEqual(summary, repeated_summary)
+
+    async def test_illegal_actions_are_replaced_and_counted(self) -> None:
+        summary, _ = await self._play_session(lambda message: "r1")
+
+        self.assertEqual(summary["hands"], 40)
+        self.assertGreater(summary["illegalActions"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,231 @@
+import asyncio
+import json
+import socket
+import tempfile
+import unittest
+from contextlib import suppress
+from dataclasses import replace
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import websockets
+
+from game_engine.checkpoints import (
+    CheckpointStore,
+    SessionRegistry,
+    capture_checkpoint,
+    new_session_token,
+    restore_checkpoint,
+)
+from game_engine.common_types import ChipMode
+from game_engine.config import ServerConfig, build_game_config
+from game_engine.game import Game, Round
+from game_engine.pacing import PacingMode
+from game_engine.protocol import build_start_game_message
+from game_engine.server import run_server
+from game_engine.simulator import run_sync
+
+
+class _RandomPolicy:
+    def __init__(self, *, model_path, rng):
+        self.model_path = model_path
+        self.rng = rng
+
+    def decide_next_action(self, infoset: str) -> str:
+        if infoset.split(":|")[0][-1:].isdigit():
+            return self.rng.choice(["f", "c"])
+        return "k"
+
+
+def _get_open_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _play_rounds(game: Game, num_rounds: int) -> None:
+    for _ in range(num_rounds):
+        if game.is_finished():
+            return
+        small_blind, big_blind = game.get_blinds()
+        run_sync(Round(game, small_blind, big_blind).start())
+        game.finish_round()
+
+
+class CheckpointTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.policy_patch = patch("game_engine.game.NashBlueprintPolicy", _RandomPolicy)
+        self.policy_patch.start()
+        self.config = build_game_config(
+            num_ai_players=2,
+            num_human_players=0,
+            chip_mode=ChipMode.PERSISTENT_MATCH,
+            random_seed=5,
+            pacing=PacingMode.INSTANT,
+        )
+
+    def tearDown(self) -> None:
+        self.policy_patch.stop()
+
+    def test_restored_game_plays_the_same_hands(self) -> None:
+        game = Game(None, "Leduc", self.config)
+        _play_rounds(game, 3)
+        checkpoint = json.loads(json.dumps(capture_checkpoint(game)))
+
+        # Another seed, everything that matters comes from the checkpoint
+        restored_game = Game(None, "Leduc", replace(self.config, random_seed=123))
+        restore_checkpoint(restored_game, checkpoint)
+        _play_rounds(game, 5)
+        _play_rounds(restored_game, 5)
+
+        for player, restored_player in zip(game.players.initial_players, restored_game.players.initial_players):
+            self.assertEqual(player.chips_won_history, restored_player.chips_won_history)
+            self.assertEqual(player.chips, restored_player.chips)
+        self.assertEqual(game.round_num, restored_game.round_num)
+
+    def test_mismatched_checkpoint_leaves_the_game_alone(self) -> None:
+        game = Game(None, "Leduc", self.config)
+        _play_rounds(game, 2)
+        checkpoint = capture_checkpoint(game)
+        checkpoint["players"][1]["chips"] = "lots"
+
+        fresh_game = Game(None, "Leduc", self.config)
+        with self.assertRaises(ValueError):
+            restore_checkpoint(fresh_game, checkpoint)
+        self.assertEqual(fresh_game.round_num, 0)
+        with self.assertRaises(ValueError):
+            restore_checkpoint(Game(None, "Texas Hold'em", self.config), capture_checkpoint(game))
+
+    def test_store_rejects_tokens_that_are_not_file_names(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            store = CheckpointStore(directory)
+            token = new_session_token()
+            asyncio.run(store.save(token, {"version": 1}))
+
+            self.assertEqual(asyncio.run(store.load(token)), {"version": 1})
+            self.assertIsNone(asyncio.run(store.load("../" + token)))
+            asyncio.run(store.delete(token))
+            self.assertEqual(list(Path(directory).iterdir()), [])
+
+
+class _ClosingWebsocket:
+    def __init__(self) -> None:
+        self.is_closed = False
+
+    async def close(self, code: int = 1000, reason: str = "") -> None:
+        self.is_closed = True
+
+
+class SessionRegistryTests(unittest.IsolatedAsyncioTestCase):
+    async def test_game_outliving_the_take_over_keeps_its_session(self) -> None:
+        sessions = SessionRegistry(CheckpointStore(tempfile.gettempdir()))
+        old_game, new_game = SimpleNamespace(suspend_requested=False), SimpleNamespace(suspend_requested=False)
+        old_websocket = _ClosingWebsocket()
+        sessions.register("token", old_game, old_websocket)
+
+        self.assertFalse(await sessions.take_over("token", timeout=0.01))
+        self.assertTrue(old_game.suspend_requested and old_websocket.is_closed)
+        # A game that does not hold the token cannot end the session of the one that does
+        sessions.unregister("token", new_game)
+        self.assertEqual(len(sessions), 1)
+
+        taking_over = asyncio.ensure_future(sessions.take_over("token", timeout=5))
+        await asyncio.sleep(0)
+        sessions.unregister("token", old_game)
+        self.assertTrue(await taking_over)
+        self.assertEqual(len(sessions), 0)
+
+
+class ResumeSessionTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.policy_patch = patch("game_engine.game.NashBlueprintPolicy", _RandomPolicy)
+        self.policy_patch.start()
+        self.checkpoint_dir = tempfile.TemporaryDirectory()
+
+        port = _get_open_port()
+        self.websocket_url = f"ws://127.0.0.1:{port}"
+        self.stop = asyncio.Event()
+        server_config = ServerConfig(
+            host="127.0.0.1",
+            port=port,
+            game_config=build_game_config(num_ai_players=1, random_seed=9, pacing=PacingMode.INSTANT),
+            checkpoint_dir=Path(self.checkpoint_dir.name),
+        )
+        self.server_task = asyncio.create_task(run_server(server_config, stop=self.stop))
+        for _ in range(50):
+            try:
+                async with websockets.connect(self.websocket_url):
+                    return
+            except OSError:
+                await asyncio.sleep(0.05)
+        self.fail("websocket server did not start in time")
+
+    async def asyncTearDown(self) -> None:
+        self.server_task.cancel()
+        with suppress(asyncio.CancelledError):
+            await self.server_task
+        self.policy_patch.stop()
+        self.checkpoint_dir.cleanup()
+
+    async def _start(self, websocket, session_token=None) -> dict:
+        await websocket.send(build_start_game_message("Leduc", ChipMode.PERSISTENT_MATCH, session_token=session_token))
+        return json.loads(await asyncio.wait_for(websocket.recv(), timeout=5))
+
+    async def _wait_for_hands(self, websocket, num_hands: int) -> dict:
+        while True:
+            state = json.loads(await asyncio.wait_for(websocket.recv(), timeout=5))
+            if state.get("game_over") or len(state["players"]["initial_players"][1]["chips_won_history"]) >= num_hands:
+                return state
+
+    async def test_reconnecting_client_resumes_the_match(self) -> None:
+        async with websockets.connect(self.websocket_url) as websocket:
+            session = await self._start(websocket)
+            self.assertEqual((session["type"], session["resumed"]), ("session", False))
+            for _ in range(3):
+                await websocket.send("Fold")
+            state = await self._wait_for_hands(websocket, 3)
+        chips_before = [player["chips"] for player in state["players"]["initial_players"]]
+
+        async with websockets.connect(self.websocket_url) as websocket:
+            resumed_session = await self._start(websocket, session["sessionToken"])
+            self.assertEqual(resumed_session, {**session, "resumed": True})
+            resumed_state = json.loads(await asyncio.wait_for(websocket.recv(), timeout=5))
+            human = resumed_state["players"]["initial_players"][1]
+
+            # The hand left in the middle was folded when the connection dropped
+            self.assertEqual(len(human["chips_won_history"]), 4)
+            self.assertEqual(sum(player["chips"] for player in resumed_state["players"]["initial_players"]), sum(chips_before))
+
+            for _ in range(40):
+                await websocket.send("Fold")
+            self.assertTrue((await self._wait_for_hands(websocket, 100))["game_over"])
+
+        for _ in range(50):
+            if not any(Path(self.checkpoint_dir.name).iterdir()):
+                break
+            await asyncio.sleep(0.02)
+        self.assertEqual(list(Path(self.checkpoint_dir.name).iterdir()), [])
+
+    async def test_stopping_the_server_suspends_sessions(self) -> None:
+        async with websockets.connect(self.websocket_url) as websocket:
+            session = await self._start(websocket)
+            await self._wait_for_hands(websocket, 0)
+            self.stop.set()
+            await websocket.send("Fold")
+
+            while True:
+                payload = json.loads(await asyncio.wait_for(websocket.recv(), timeout=5))
+                if payload.get("type") == "session-suspended":
+                    break
+            self.assertEqual(payload["sessionToken"], session["sessionToken"])
+            with self.assertRaises(websockets.exceptions.ConnectionClosed) as closed:
+                await asyncio.wait_for(websocket.recv(), timeout=5)
+            self.assertEqual(closed.exception.rcvd.code, 1012)
+
+        await asyncio.wait_for(self.server_task, timeout=5)
+        self.assertTrue((Path(self.checkpoint_dir.name) / f"{session['sessionToken']}.json").exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
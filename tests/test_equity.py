@@ -0,0 +1,133 @@
+import os
+import tempfile
+import unittest
+from itertools import combinations
+from pathlib import Path
+from unittest.mock import patch
+
+from treys import Card, Deck, Evaluator
+
+from game_engine import equity, evaluation
+from game_engine.equity import calculate_equity
+from game_engine.isomorphism import canonicalize
+from game_engine.rank_table import np, write_rank_table
+
+# AsAh against KsKh before the flop, enumerated over all 1712304 boards
+ACES_AGAINST_KINGS_EQUITY = 0.826366
+
+
+def _cards(*card_strings: str) -> list[int]:
+    return [Card.new(card_string) for card_string in card_strings]
+
+
+class EquityTests(unittest.TestCase):
+    def setUp(self) -> None:
+        equity._calculate_canonical_equity.cache_clear()
+
+    def test_exact_equity_matches_every_board(self) -> None:
+        hands = [_cards("As", "Kd"), _cards("Qh", "Qc")]
+        board = _cards("2s", "7s", "Qs")
+        evaluator = Evaluator()
+        remaining = [card for card in Deck.GetFullDeck() if card not in board + hands[0] + hands[1]]
+        shares = [0.0, 0.0]
+        boards = list(combinations(remaining, 2))
+        for turn_and_river in boards:
+            full_board = board + list(turn_and_river)
+            ranks = [evaluator.evaluate(full_board, hand) for hand in hands]
+            for seat, rank in enumerate(ranks):
+                if rank == min(ranks):
+                    shares[seat] += 1 / ranks.count(rank)
+
+        result = calculate_equity(hands, board)
+        self.assertTrue(result.is_exact)
+        self.assertEqual(result.trials, len(boards))
+        for seat in range(2):
+            self.assertAlmostEqual(result.equity[seat], shares[seat] / len(boards))
+            self.assertAlmostEqual(result.win[seat] + result.tie[seat] / 2, result.equity[seat])
+
+    def test_leduc_equity(self) -> None:
+        # The king loses only when the board is the other queen
+        result = calculate_equity([_cards("Ks"), _cards("Qs")], game_type="Leduc")
+        self.assertEqual((result.win, result.tie, result.trials), ((0.75, 0.25), (0.0, 0.0), 4))
+
+        result = calculate_equity([_cards("Ks")], _cards("Kd"), game_type="Leduc", random_opponents=1)
+        self.assertEqual(result.equity, (1.0,))
+
+    def test_monte_carlo_converges(self) -> None:
+        result = calculate_equity([_cards("As", "Ah"), _cards("Ks", "Kh")], random_seed=3, target_standard_error=0.004)
+        self.assertFalse(result.is_exact)
+        self.assertLessEqual(result.standard_error, 0.004)
+        self.assertAlmostEqual(result.equity[0], ACES_AGAINST_KINGS_EQUITY, delta=0.016)
+        self.assertAlmostEqual(sum(result.equity), 1.0)
+
+    def test_suit_isomorphic_inputs_share_a_result(self) -> None:
+        result = calculate_equity([_cards("As", "Ks"), _cards("Qh", "Qd")], _cards("2s", "2h", "9c"))
+        # Spades to hearts, hearts to diamonds, diamonds to clubs and clubs to spades
+        same_result = calculate_equity([_cards("Kh", "Ah"), _cards("Qc", "Qd")], _cards("2d", "9s", "2h"))
+        self.assertIs(same_result, result)
+        self.assertEqual(equity._calculate_canonical_equity.cache_info().hits, 1)
+        self.assertEqual(
+            canonicalize([_cards("As", "Ks"), _cards("2s")]), canonicalize([_cards("Kd", "Ad"), _cards("2d")])
+        )
+        leduc_suits = (Card.new("Ks") & 0xF000, Card.new("Kd") & 0xF000)
+        self.assertEqual(
+            canonicalize([_cards("Kd"), _cards("Qs")], leduc_suits),
+            canonicalize([_cards("Ks"), _cards("Qd")], leduc_suits),
+        )
+
+    def test_invalid_inputs_are_rejected(self) -> None:
+        for hands, board, options in (
+            ([_cards("As", "Ks"), _cards("As", "Qd")], [], {}),
+            ([_cards("As", "Ks")], [], {}),
+            ([_cards("As")], [], {"random_opponents": 1}),
+            ([_cards("As", "Ks"), _cards("Qh", "Qd")], _cards("2s", "3s", "4s", "5s", "6s", "7s"), {}),
+            ([_cards("Js"), _cards("Qs")], [], {"game_type": "Leduc"}),
+            ([_cards("As", "Ks")], [], {"random_opponents": 30}),
+        ):
+            with self.assertRaises(ValueError):
+                calculate_equity(hands, board, **options)
+
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class VectorizedEquityTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.temp_dir = tempfile.TemporaryDirectory()
+        cls.path = write_rank_table(Path(cls.temp_dir.name) / "holdem-7card.ranks")
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.temp_dir.cleanup()
+
+    def setUp(self) -> None:
+        for cached_function in (evaluation._load_rank_table, equity._calculate_canonical_equity):
+            cached_function.cache_clear()
+            self.addCleanup(cached_function.cache_clear)
+        environment = patch.dict(os.environ, {"POKER_ML_RANK_TABLE": str(self.path)}, clear=False)
+        environment.start()
+        self.addCleanup(environment.stop)
+
+    def test_batches_match_the_scalar_ranking(self) -> None:
+        hands = [_cards("As", "Kd"), _cards("Qh", "Qc")]
+        board = _cards("2s", "7s", "Qs")
+        vectorized_result = calculate_equity(hands, board)
+
+        with patch.object(equity, "np", None):
+            equity._calculate_canonical_equity.cache_clear()
+            scalar_result = calculate_equity(hands, board)
+        self.assertEqual(vectorized_result.trials, scalar_result.trials)
+        for seat in range(2):
+            self.assertAlmostEqual(vectorized_result.equity[seat], scalar_result.equity[seat])
+
+    def test_monte_carlo_converges(self) -> None:
+        result = calculate_equity([_cards("As", "Ah"), _cards("Ks", "Kh")], random_seed=3, target_standard_error=0.001)
+        self.assertFalse(result.is_exact)
+        self.assertAlmostEqual(result.equity[0], ACES_AGAINST_KINGS_EQUITY, delta=0.004)
+
+        result = calculate_equity([_cards("As", "Ah")], random_opponents=3, random_seed=3)
+        self.assertLessEqual(result.standard_error, equity.DEFAULT_TARGET_STANDARD_ERROR)
+        self.assertGreater(result.equity[0], 0.6)
+
+
+if __name__ == "__main__":
+    unittest.main()
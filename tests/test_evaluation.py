@@ -0,0 +1,62 @@
+import random
+import unittest
+
+from treys import Card, Deck, Evaluator
+
+from game_engine.config import build_game_config
+from game_engine.evaluation import evaluate_many, get_evaluator, rank_leduc_hand
+from game_engine.game import Game, Round
+from game_engine.simulator import run_sync
+
+
+class _FoldingPolicy:
+    def decide_next_action(self, infoset: str) -> str:
+        return "f"
+
+
+class EvaluationTests(unittest.TestCase):
+    def test_evaluator_is_built_once(self) -> None:
+        self.assertIs(get_evaluator(), get_evaluator())
+
+    def test_batch_ranks_match_treys(self) -> None:
+        evaluator = Evaluator()
+        rng = random.Random(7)
+        # Boards drawn from two suits make flushes and straight flushes common
+        two_suits = [Card.new(rank + suit) for rank in "23456789TJQKA" for suit in "sh"]
+        for deck in [Deck.GetFullDeck()] * 200 + [two_suits] * 200:
+            cards = rng.sample(deck, 11)
+            board, hands = cards[:5], [cards[5:7], cards[7:9], cards[9:11]]
+            self.assertEqual(
+                evaluate_many(board, hands),
+                [evaluator.evaluate(board, hand) for hand in hands],
+            )
+
+    def test_incomplete_boards_fall_back_to_treys(self) -> None:
+        evaluator = Evaluator()
+        cards = random.Random(3).sample(Deck.GetFullDeck(), 8)
+        for board in (cards[:3], cards[:4]):
+            hands = [cards[4:6], cards[6:8]]
+            self.assertEqual(evaluate_many(board, hands), [evaluator.evaluate(board, hand) for hand in hands])
+
+    def test_leduc_pairs_beat_high_cards(self) -> None:
+        queen, king, ace = Card.new("Qs"), Card.new("Ks"), Card.new("As")
+        self.assertLess(rank_leduc_hand(queen, [Card.new("Qd")]), rank_leduc_hand(ace, [Card.new("Qd")]))
+        self.assertLess(rank_leduc_hand(ace, [Card.new("Qd")]), rank_leduc_hand(king, [Card.new("Qd")]))
+        self.assertEqual(rank_leduc_hand(king, [Card.new("Kd")]), rank_leduc_hand(Card.new("Kd"), [Card.new("Ks")]))
+        self.assertLess(rank_leduc_hand(ace, []), rank_leduc_hand(king, []))
+
+    def test_holdem_hand_won_before_the_flop_finishes(self) -> None:
+        config = build_game_config(num_ai_players=3, num_human_players=0, random_seed=5, pacing="instant")
+        game = Game(None, "Texas Hold'em", config)
+        for player in game.players.get_players("all"):
+            player.policy = _FoldingPolicy()
+
+        round_instance = Round(game, *game.get_blinds())
+        run_sync(round_instance.start())
+
+        self.assertFalse(round_instance.is_showdown)
+        self.assertEqual(sum(player.chips for player in game.players.get_players("all")), game.initial_chips * 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,460 @@
+import contextlib
+import inspect
+import io
+import logging
+import os
+import random
+import sys
+import tempfile
+import unittest
+from collections import Counter
+from itertools import permutations
+from pathlib import Path
+from types import SimpleNamespace
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - exercised only without numpy
+    np = None
+
+# The training scripts import their siblings by bare name, as when they are run from their own directory
+ALGORITHMS_DIR = Path(__file__).resolve().parents[1] / "game_engine" / "ia" / "algorithms"
+if np is not None:
+    sys.path.insert(0, str(ALGORITHMS_DIR))
+    from cfr_variants import CFR_VARIANTS, CFRVariant, get_cfr_variant
+    from classes import Card, InfoSetNode, RegretTable
+    from exploitability import get_best_response_value, get_exploitability
+    from functions import BettingTable, create_actions, get_possible_actions, set_bet_value
+    from leduc_tree import NUM_COLUMNS, PHASE_NAMES, LeducTree
+    from mod_leduc import ModLeducTrainer
+    from vectorized_leduc import VectorizedLeducTrainer
+
+ACTION_SYMBOLS = ["p", "b", "B", "3", "4", "5", "6", "7", "8", "9", "q", "u", "v"]
+TOTAL_CHIPS = 5
+
+
+def _deck() -> list:
+    return [Card.Q, Card.Q, Card.K, Card.K, Card.A, Card.A]
+
+
+def _train(trainer_class, iterations: int, algorithm: str = "cfr", **kwargs):
+    """
+    Builds a trainer, which trains right away, in a temporary directory, since the trainers write their logs and
+    blueprints next to the scripts' working directory.
+    """
+    root_logger = logging.getLogger("")
+    handlers = list(root_logger.handlers)
+    level = root_logger.level
+    current_directory = os.getcwd()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        work_dir = Path(temp_dir) / "algorithms"
+        work_dir.mkdir()
+        os.chdir(work_dir)
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                return trainer_class(
+                    iterations,
+                    algorithm,
+                    _deck(),
+                    0.0,
+                    "cfr",
+                    ACTION_SYMBOLS,
+                    0.0,
+                    False,
+                    kwargs.pop("total_chips", TOTAL_CHIPS),
+                    1,
+                    1,
+                    False,
+                    **kwargs,
+                )
+        finally:
+            os.chdir(current_directory)
+            for handler in root_logger.handlers[len(handlers) :]:
+                handler.close()
+            root_logger.handlers[:] = handlers
+            root_logger.setLevel(level)
+
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class LeducTreeTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        random.seed(0)
+        cls.mod_trainer = _train(ModLeducTrainer, 20)
+        cls.tree = LeducTree(_deck(), TOTAL_CHIPS, 1, False, cls.mod_trainer.Actions)
+
+    def _assert_walk_matches_tree(self, deal_index: int) -> int:
+        # Plays every line of the deal with ModLeducTrainer's betting table and encoder, as nash_equilibrium_algorithm
+        # does, and returns the number of tree nodes it reached
+        tree, betting_table, encoder = self.tree, self.mod_trainer.betting_table, self.mod_trainer.encoder
+        cards = [Card(int(rank) + 1) for rank in tree.deals[deal_index]]
+        stack = [(encoder.ROOT, betting_table.initial_state, 0)]
+        num_nodes = 0
+        while stack:
+            history_id, state_id, node = stack.pop()
+            num_nodes += 1
+            possible_actions, rewards, next_phase_started = betting_table.get_possible_actions(state_id, cards)
+            player = encoder.plays[history_id] % 2
+            if possible_actions is None:
+                self.assertTrue(tree.is_terminal[node])
+                self.assertAlmostEqual(tree.payoffs[node, deal_index], rewards if player == 0 else -rewards)
+                continue
+
+            updated_history_id = encoder.child(history_id, "/") if next_phase_started else history_id
+            phase = betting_table.acting_phases[state_id]
+            public_card = cards[2] if phase == "flop" else None
+            info_set_id = encoder.get_info_set_id(updated_history_id, cards[player], public_card)
+            column = tree.observation_columns[player, PHASE_NAMES.index(phase), deal_index]
+            self.assertEqual(tree.node_player[node], player)
+            self.assertTrue(tree.node_has_column[node, column])
+            self.assertEqual(tree.info_set_key(node, column), encoder.info_set_string(info_set_id))
+
+            edges = range(tree.child_offsets[node], tree.child_offsets[node + 1])
+            self.assertEqual(tree.edge_action_value[edges].tolist(), [action["value"] for action in possible_actions])
+            for edge, action in zip(edges, possible_actions):
+                next_state_id, bet_result = betting_table.transition(state_id, action["value"])
+                stack.append((encoder.child(updated_history_id, bet_result), next_state_id, int(tree.edge_child[edge])))
+        return num_nodes
+
+    def test_payoffs_and_columns_match_the_trainer(self) -> None:
+        for deal_index in range(self.tree.num_deals):
+            self.assertEqual(self._assert_walk_matches_tree(deal_index), self.tree.num_nodes)
+
+        info_set_keys = {key for key, _, _ in self.tree.info_sets()}
+        self.assertEqual(len(info_set_keys), self.mod_trainer.encoder.num_info_sets)
+        self.assertLessEqual(set(self.mod_trainer.get_node_dict()), info_set_keys)
+
+    def test_vectorized_exploitability_decreases(self) -> None:
+        for cfr_variant in ("vanilla", "cfr+", "lcfr", "dcfr"):
+            with self.subTest(cfr_variant=cfr_variant):
+                trainer = _train(VectorizedLeducTrainer, 200, cfr_variant=cfr_variant, exploitability_every=50)
+                exploitabilities = [exploitability for _, exploitability in trainer.exploitability_log]
+                self.assertEqual(len(exploitabilities), 4)
+                self.assertLess(exploitabilities[-1], exploitabilities[0] / 2)
+                self.assertLess(exploitabilities[-1], 100)
+
+    def test_strategy_grids_round_trip_through_dicts(self) -> None:
+        trainer = _train(VectorizedLeducTrainer, 20)
+        node_dict = trainer.get_node_dict()
+        grid = self.tree.strategy_grid_from_dict(node_dict)
+        np.testing.assert_array_equal(grid, trainer.get_average_strategy())
+        self.assertEqual(self.tree.strategy_grid_to_dict(grid), node_dict)
+
+        mod_node_dict = self.mod_trainer.get_node_dict()
+        exported = self.tree.strategy_grid_to_dict(self.tree.strategy_grid_from_dict(mod_node_dict))
+        for key, (action_values, strategy) in mod_node_dict.items():
+            self.assertEqual(exported[key][0], action_values)
+            np.testing.assert_allclose(exported[key][1], strategy)
+
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class InfoSetEncoderTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        random.seed(1)
+        cls.mod_trainer = _train(ModLeducTrainer, 20, "mccfr")
+        cls.encoder = cls.mod_trainer.encoder
+
+    def test_ids_and_strings_are_a_bijection(self) -> None:
+        encoder = self.encoder
+        info_set_strings = [encoder.info_set_string(info_set_id) for info_set_id in range(encoder.num_info_sets)]
+        self.assertEqual(len(set(info_set_strings)), encoder.num_info_sets)
+
+        tree = LeducTree(_deck(), TOTAL_CHIPS, 1, False, self.mod_trainer.Actions)
+        self.assertEqual(set(info_set_strings), {key for key, _, _ in tree.info_sets()})
+
+        for info_set_id, info_set_string in enumerate(info_set_strings):
+            self.assertEqual(encoder.encode(info_set_string), info_set_id)
+            history_string, cards_string = info_set_string.split(":|")
+            history_id = encoder.history_strings.index(history_string)
+            self.assertEqual(encoder.info_set_histories[info_set_id], history_id)
+            public_card = Card[cards_string[2]] if len(cards_string) > 1 else None
+            self.assertEqual(encoder.get_info_set_id(history_id, Card[cards_string[0]], public_card), info_set_id)
+
+        self.assertIsNone(encoder.encode("ppp:|Q"))
+        self.assertIsNone(encoder.encode(":|Q/K"))
+
+    def test_every_info_set_has_the_tree_key(self) -> None:
+        encoder = self.encoder
+        tree = LeducTree(_deck(), TOTAL_CHIPS, 1, False, self.mod_trainer.Actions)
+        history_ids = {history_string: history_id for history_id, history_string in enumerate(encoder.history_strings)}
+        num_info_sets = 0
+        for key, node, column in tree.info_sets():
+            info_set_id = encoder.info_set_ids[history_ids[tree.histories[node]] * NUM_COLUMNS + column]
+            self.assertEqual(encoder.info_set_string(info_set_id), key)
+            num_info_sets += 1
+        self.assertEqual(num_info_sets, encoder.num_info_sets)
+
+    def test_encode_agrees_with_the_trainer_keys(self) -> None:
+        node_dict = self.mod_trainer.get_node_dict()
+        self.assertGreater(len(node_dict), 0)
+        for info_set_string, (action_values, _) in node_dict.items():
+            info_set_id = self.encoder.encode(info_set_string)
+            self.assertIsNotNone(info_set_id)
+            self.assertEqual(self.encoder.info_set_string(info_set_id), info_set_string)
+            self.assertEqual(self.encoder.get_action_values(info_set_id), action_values)
+
+
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class BettingTableTests(unittest.TestCase):
+    def _assert_table_matches_uncached_functions(self, total_chips: int, is_bet_relative: bool) -> int:
+        all_actions = create_actions(total_chips, 1, is_bet_relative)
+        betting_table = BettingTable(all_actions, 1, total_chips, is_bet_relative)
+        deals = [[Card(a), Card(b), Card(c)] for a in range(1, 4) for b in range(1, 4) for c in range(1, 4)]
+        initial_player = (total_chips - 1, 1, 1, False)
+        stack = [((initial_player, initial_player), "preflop", 0, betting_table.initial_state)]
+        seen = set()
+        while stack:
+            players, phase, player, state_id = stack.pop()
+            if (players, phase, player) in seen:
+                continue
+            seen.add((players, phase, player))
+            self.assertEqual(betting_table.players[state_id], players)
+            self.assertEqual(betting_table.phases[state_id], phase)
+            self.assertEqual(betting_table.acting_players[state_id], player)
+
+            for cards in deals:
+                expected = get_possible_actions(
+                    "", cards, player, 1 - player, players, phase, all_actions, 1, total_chips, is_bet_relative
+                )
+                self.assertEqual(betting_table.get_possible_actions(state_id, cards), expected)
+            possible_actions, _, next_phase_started = expected
+            if possible_actions is None:
+                continue
+
+            self.assertEqual(betting_table.acting_phases[state_id], "flop" if next_phase_started else phase)
+            for action in possible_actions:
+                updated_players, bet_result = set_bet_value(
+                    player, players, action["value"], next_phase_started, is_bet_relative, possible_actions
+                )
+                next_state_id, table_bet_result = betting_table.transition(state_id, action["value"])
+                self.assertEqual(table_bet_result, bet_result)
+                self.assertEqual(betting_table.transition(state_id, action["value"]), (next_state_id, bet_result))
+                next_phase = "flop" if next_phase_started else phase
+                stack.append((updated_players, next_phase, 1 - player, next_state_id))
+
+        self.assertEqual(len(betting_table.players), len(seen))
+        return len(seen)
+
+    def test_cached_states_match_the_uncached_functions(self) -> None:
+        for total_chips in (3, 5, 8):
+            for is_bet_relative in (False, True):
+                with self.subTest(total_chips=total_chips, is_bet_relative=is_bet_relative):
+                    self.assertGreater(self._assert_table_matches_uncached_functions(total_chips, is_bet_relative), 10)
+
+
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class RegretTableTests(unittest.TestCase):
+    def _assert_tables_equal(self, table, other_table) -> None:
+        for name in RegretTable.ARRAYS:
+            np.testing.assert_array_equal(getattr(table, name), getattr(other_table, name), err_msg=name)
+
+    def _play(self, table, info_set_id: int, regrets: list) -> None:
+        actions = [{"value": value} for value in range(len(regrets))]
+        node = InfoSetNode(f"{info_set_id}", actions, None, table, info_set_id)
+        for action_index, regret in enumerate(regrets):
+            node.regret_sum[action_index] += regret
+            node.strategy_sum[action_index] += abs(regret) / 2
+            node.times_action_got_positive_reward[action_index] += regret > 0
+        node.times_regret_sum_updated += 1
+
+    def test_deltas_round_trip(self) -> None:
+        table = RegretTable([2, 3, 2])
+        self._play(table, 0, [1.5, -0.25])
+        snapshot = table.copy_arrays()
+        self._play(table, 0, [-1.0, 2.0])
+        self._play(table, 2, [0.5, 0.125])
+
+        delta = table.get_delta(snapshot)
+        self.assertEqual(delta["is_visited"][0].tolist(), [2])
+        self.assertEqual(delta["regret_sum"][0].tolist(), [0, 1, 5, 6])
+
+        other_table = RegretTable([2, 3, 2])
+        for name, array in snapshot.items():
+            getattr(other_table, name)[:] = array
+        other_table.add_delta(delta)
+        self._assert_tables_equal(other_table, table)
+        self.assertEqual(other_table.visited_info_set_ids(), [0, 2])
+
+    def test_saved_tables_load_back(self) -> None:
+        table = RegretTable([2, 3, 2])
+        self._play(table, 1, [0.75, -2.0, 1.0])
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = Path(temp_dir) / "table.npz"
+            table.save(path)
+            loaded_table = RegretTable([2, 3, 2])
+            loaded_table.load(path)
+            self._assert_tables_equal(loaded_table, table)
+            with self.assertRaises(ValueError):
+                RegretTable([3, 2, 2]).load(path)
+
+    def test_parallel_training_is_deterministic_for_a_seed(self) -> None:
+        trainers = [
+            _train(ModLeducTrainer, 40, "mccfr", num_workers=2, merge_every=10, seed=seed) for seed in (7, 7, 8)
+        ]
+        self._assert_tables_equal(trainers[0].regret_table, trainers[1].regret_table)
+        self.assertEqual(trainers[0].get_node_dict(), trainers[1].get_node_dict())
+        self.assertFalse(np.array_equal(trainers[0].regret_table.regret_sum, trainers[2].regret_table.regret_sum))
+
+    def test_serial_training_is_deterministic_for_a_seed(self) -> None:
+        trainers = []
+        for seed in (7, 7, 8):
+            # The global RNG is left in a different state before every run
+            random.seed(len(trainers))
+            trainers.append(_train(ModLeducTrainer, 40, "mccfr", seed=seed))
+        self._assert_tables_equal(trainers[0].regret_table, trainers[1].regret_table)
+        self.assertEqual(trainers[0].get_node_dict(), trainers[1].get_node_dict())
+        self.assertFalse(np.array_equal(trainers[0].regret_table.regret_sum, trainers[2].regret_table.regret_sum))
+
+    def test_discounting_variants_train_in_a_single_process(self) -> None:
+        with self.assertRaises(ValueError):
+            _train(ModLeducTrainer, 40, "mccfr", num_workers=2, merge_every=10, cfr_variant="cfr+")
+
+
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class CFRVariantTests(unittest.TestCase):
+    def _apply(self, cfr_variant: str, t: int) -> tuple:
+        regret_sum, strategy_sum = np.array([4.0, -4.0, 0.0]), np.array([2.0, 6.0, 0.0])
+        get_cfr_variant(cfr_variant).apply(regret_sum, strategy_sum, t)
+        return regret_sum.tolist(), strategy_sum.tolist()
+
+    def test_variant_weights(self) -> None:
+        self.assertEqual(self._apply("vanilla", 3), ([4.0, -4.0, 0.0], [2.0, 6.0, 0.0]))
+        # Regret-matching+ floors the regrets, and the strategy of iteration t is weighted by t
+        self.assertEqual(self._apply("cfr+", 3), ([4.0, 0.0, 0.0], [1.5, 4.5, 0.0]))
+        # Linear CFR weights regrets and strategies by t, so every sum is scaled by t / (t + 1)
+        self.assertEqual(self._apply("lcfr", 3), ([3.0, -3.0, 0.0], [1.5, 4.5, 0.0]))
+        # Discounted CFR with alpha 1.5, beta 0 and gamma 2
+        regret_sum, strategy_sum = self._apply("dcfr", 4)
+        np.testing.assert_allclose(regret_sum, [4.0 * 8 / 9, -2.0, 0.0])
+        np.testing.assert_allclose(strategy_sum, [2.0 * 0.64, 6.0 * 0.64, 0.0])
+
+        self.assertTrue(CFR_VARIANTS["vanilla"].is_vanilla)
+        self.assertFalse(CFR_VARIANTS["cfr+"].is_vanilla)
+        variant = CFRVariant("custom", gamma=1)
+        self.assertIs(get_cfr_variant(variant), variant)
+        with self.assertRaises(Exception):
+            get_cfr_variant("unknown")
+
+    def _discount_intervals(self, discount_every: int, first: int, last: int) -> list:
+        applied = []
+        cfr_variant = SimpleNamespace(is_vanilla=False, apply=lambda regret_sum, strategy_sum, t: applied.append(t))
+        regret_table = SimpleNamespace(regret_sum=None, strategy_sum=None)
+        trainer = SimpleNamespace(cfr_variant=cfr_variant, discount_every=discount_every, regret_table=regret_table)
+        ModLeducTrainer.apply_cfr_variant(trainer, first, last)
+        return applied
+
+    def test_discount_intervals(self) -> None:
+        # Both trainers discount after every iteration by default, so cfr+ is regret-matching+
+        self.assertEqual(self._discount_intervals(1, 0, 1), [1])
+        self.assertEqual(self._discount_intervals(1, 4, 7), [5, 6, 7])
+        # With longer intervals, interval t ends after iteration t * discount_every, wherever merges fall
+        self.assertEqual(self._discount_intervals(10, 0, 9), [])
+        self.assertEqual(self._discount_intervals(10, 9, 25), [1, 2])
+
+        for trainer_class in (ModLeducTrainer, VectorizedLeducTrainer):
+            self.assertEqual(inspect.signature(trainer_class).parameters["discount_every"].default, 1)
+
+
+def _brute_force_best_response_value(node_dict: dict, total_chips: int, br_player: int) -> float:
+    """
+    Best response value computed on info set strings with the betting functions, without the tree arrays: every info
+    set of br_player takes the action with the highest value summed over its deals, weighted by chance and by the
+    opponent's reach, and values are memoized per history and deal.
+    """
+    all_actions = create_actions(total_chips, 1, False)
+    deal_counts = Counter(permutations(_deck(), 3))
+    deals = {deal: count / sum(deal_counts.values()) for deal, count in deal_counts.items()}
+    initial_player = (total_chips - 1, 1, 1, False)
+    values: dict = {}
+    choices: dict = {}
+
+    def info_set_key(history: str, phase: str, card, cards) -> str:
+        return f"{history}:|{card}" + (f"/{cards[2]}" if phase == "flop" else "")
+
+    def expand(state: tuple, cards) -> tuple:
+        history, players, phase, plays, path = state
+        player = plays % 2
+        possible_actions, rewards, next_phase_started = get_possible_actions(
+            history, list(cards), player, 1 - player, players, phase, all_actions, 1, total_chips, False
+        )
+        if possible_actions is None:
+            return player, rewards if player == br_player else -rewards, None, []
+        if next_phase_started:
+            history, phase = history + "/", "flop"
+        children = []
+        for action in possible_actions:
+            updated_players, bet_result = set_bet_value(
+                player, players, action["value"], next_phase_started, False, possible_actions
+            )
+            step = (history, phase, action["value"])
+            child = (history + bet_result, updated_players, phase, plays + 1, path + (step,))
+            children.append((action["value"], child))
+        return player, None, info_set_key(history, phase, cards[player], cards), children
+
+    def opponent_reach(path: tuple, cards) -> float:
+        reach = 1.0
+        for plays, (history, phase, action_value) in enumerate(path):
+            if plays % 2 != br_player:
+                action_values, strategy = node_dict[info_set_key(history, phase, cards[plays % 2], cards)]
+                reach *= strategy[action_values.index(action_value)]
+        return reach
+
+    def best_action(key: str, children: list) -> int:
+        if key not in choices:
+            # Every child's path ends with the info set's own history and phase
+            history, phase, _ = children[0][1][4][-1]
+            info_set_deals = [
+                (deal, weight * opponent_reach(children[0][1][4][:-1], deal))
+                for deal, weight in deals.items()
+                if info_set_key(history, phase, deal[br_player], deal) == key
+            ]
+            action_values = {
+                action_value: sum(weight * value(child, deal) for deal, weight in info_set_deals)
+                for action_value, child in children
+            }
+            choices[key] = max(action_values, key=action_values.__getitem__)
+        return choices[key]
+
+    def value(state: tuple, cards) -> float:
+        memo_key = (state[0], state[1], cards)
+        if memo_key not in values:
+            player, reward, key, children = expand(state, cards)
+            if key is None:
+                values[memo_key] = reward
+            elif player == br_player:
+                chosen = best_action(key, children)
+                chosen_child = next(child for action_value, child in children if action_value == chosen)
+                values[memo_key] = value(chosen_child, cards)
+            else:
+                action_values, strategy = node_dict[key]
+                values[memo_key] = sum(
+                    probability * value(child, cards) for probability, (_, child) in zip(strategy, children)
+                )
+        return values[memo_key]
+
+    root = ("", (initial_player, initial_player), "preflop", 0, ())
+    return sum(weight * value(root, deal) for deal, weight in deals.items())
+
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class ExploitabilityTests(unittest.TestCase):
+    def test_best_response_matches_a_brute_force_one(self) -> None:
+        tree = LeducTree(_deck(), TOTAL_CHIPS, 1, False)
+        rng = np.random.default_rng(5)
+        uniform_grid = tree.normalize(np.zeros((tree.num_edges, NUM_COLUMNS)))
+        for grid in (uniform_grid, tree.normalize(rng.random((tree.num_edges, NUM_COLUMNS)))):
+            node_dict = tree.strategy_grid_to_dict(grid)
+            br_values = [_brute_force_best_response_value(node_dict, TOTAL_CHIPS, player) for player in range(2)]
+            for player in range(2):
+                br_value = get_best_response_value(tree, tree.per_deal(grid), player)
+                self.assertAlmostEqual(br_value, br_values[player], places=12)
+            self.assertAlmostEqual(get_exploitability(tree, grid), sum(br_values) / 2, places=12)
+            self.assertGreater(sum(br_values), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
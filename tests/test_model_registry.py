@@ -0,0 +1,90 @@
+import os
+import pickle
+import tempfile
+import unittest
+from pathlib import Path
+from random import Random
+
+from game_engine.ai import ModelRegistry, NashBlueprintPolicy, convert_pickle_blueprint
+
+
+class ModelRegistryTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.load_count = 0
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def _write_model(self, name: str, model: dict) -> Path:
+        path = Path(self.temp_dir.name) / name
+        with path.open("wb") as file_handle:
+            pickle.dump(model, file_handle)
+        return path
+
+    def _counting_loader(self, path: Path) -> dict:
+        self.load_count += 1
+        with path.open("rb") as file_handle:
+            return pickle.load(file_handle)
+
+    def test_sessions_share_one_loaded_model(self) -> None:
+        path = self._write_model("model.pkl", {":|Q": ([0], [1.0])})
+        registry = ModelRegistry(loader=self._counting_loader)
+        policies = [NashBlueprintPolicy(model_path=path, rng=Random(seed), registry=registry) for seed in range(3)]
+
+        for policy in policies:
+            self.assertEqual(policy.decide_next_action(":|Q"), "k")
+
+        self.assertEqual(self.load_count, 1)
+        self.assertIs(registry.get_model(path), registry.get_model(Path(self.temp_dir.name) / "." / "model.pkl"))
+
+    def test_changed_file_and_explicit_reload_load_again(self) -> None:
+        path = self._write_model("model.pkl", {":|Q": ([0], [1.0])})
+        registry = ModelRegistry(loader=self._counting_loader)
+        registry.get_model(path)
+
+        self._write_model("model.pkl", {":|Q": ([2], [1.0])})
+        stat = path.stat()
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+        self.assertEqual(registry.get_model(path)[":|Q"], ([2], [1.0]))
+
+        registry.reload(path)
+        registry.get_model(path)
+        self.assertEqual(self.load_count, 3)
+
+    def test_least_recently_used_model_is_evicted(self) -> None:
+        paths = [self._write_model(f"model{index}.pkl", {}) for index in range(3)]
+        registry = ModelRegistry(max_models=2, loader=self._counting_loader)
+
+        registry.get_model(paths[0])
+        registry.get_model(paths[1])
+        registry.get_model(paths[0])
+        registry.get_model(paths[2])
+
+        self.assertIn(paths[0], registry)
+        self.assertNotIn(paths[1], registry)
+        self.assertEqual(len(registry), 2)
+
+    def test_dropped_models_are_closed(self) -> None:
+        paths = [self._write_model(f"model{index}.pkl", {":|Q": ([0], [1.0])}) for index in range(3)]
+        binary_paths = [convert_pickle_blueprint(path) for path in paths]
+        registry = ModelRegistry(max_models=2)
+        policy = NashBlueprintPolicy(model_path=binary_paths[0], rng=Random(1), registry=registry)
+        self.assertEqual(policy.decide_next_action(":|Q"), "k")
+        first_store = registry.get_model(binary_paths[0])
+
+        registry.get_model(binary_paths[1])
+        registry.get_model(binary_paths[2])
+        self.assertNotIn(binary_paths[0], registry)
+        self.assertTrue(first_store._mmap.closed)
+        # The handle fetches its evicted model again instead of reading the closed store
+        self.assertEqual(policy.decide_next_action(":|Q"), "k")
+        self.assertIsNot(registry.get_model(binary_paths[0]), first_store)
+
+        stores = [registry.get_model(path) for path in binary_paths[:2]]
+        registry.reload()
+        self.assertTrue(all(store._mmap.closed for store in stores))
+
+
+if __name__ == "__main__":
+    unittest.main()
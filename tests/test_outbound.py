@@ -0,0 +1,145 @@
+import asyncio
+import json
+import unittest
+from unittest.mock import patch
+
+import websockets
+
+from game_engine.common_types import ChipMode
+from game_engine.config import build_game_config
+from game_engine.inbound import InboundReader
+from game_engine.outbound import SLOW_CLIENT_CLOSE_CODE, OutboundQueue, OverflowPolicy
+from game_engine.protocol import STATE_PROTOCOL_DELTA, apply_state_patch
+from game_engine.server import simulate_poker_game
+
+
+class _AlwaysCallPolicy:
+    def __init__(self, *, model_path, rng):
+        self.rng = rng
+
+    def decide_next_action(self, infoset: str) -> str:
+        return "c"
+
+
+class _SlowWebsocket:
+    def __init__(self) -> None:
+        self.sent: list[str] = []
+        self.can_send = asyncio.Event()
+        self.close_code = None
+
+    async def send(self, message: str) -> None:
+        await self.can_send.wait()
+        self.sent.append(message)
+
+    async def close(self, code: int = 1000, reason: str = "") -> None:
+        self.close_code = code
+
+
+class _ScriptedWebsocket:
+    def __init__(self, messages: list[str]) -> None:
+        self.messages: asyncio.Queue[str] = asyncio.Queue()
+        for message in messages:
+            self.messages.put_nowait(message)
+
+    async def recv(self) -> str:
+        message = await self.messages.get()
+        if message == "close":
+            raise websockets.exceptions.ConnectionClosedOK(None, None)
+        return message
+
+
+class InboundReaderTests(unittest.IsolatedAsyncioTestCase):
+    async def test_resync_is_answered_while_no_one_reads(self) -> None:
+        resyncs = []
+        websocket = _ScriptedWebsocket([json.dumps({"type": "resync"}), "c", json.dumps({"type": "resync"}), "close"])
+
+        async def on_resync() -> None:
+            resyncs.append(len(resyncs))
+
+        reader = InboundReader(websocket, on_resync)
+        reader.start()
+        for _ in range(5):
+            await asyncio.sleep(0)
+        self.assertEqual(resyncs, [0, 1])
+
+        self.assertEqual(await reader.recv(), "c")
+        for _ in range(2):
+            with self.assertRaises(websockets.exceptions.ConnectionClosed):
+                await reader.recv()
+        await reader.close()
+
+
+class OutboundQueueTests(unittest.IsolatedAsyncioTestCase):
+    async def test_sends_return_without_waiting_for_the_client(self) -> None:
+        websocket = _SlowWebsocket()
+        queue = OutboundQueue(websocket, high_water_mark=10)
+
+        for index in range(5):
+            await asyncio.wait_for(queue.send(f"state {index}"), timeout=0.1)
+        await asyncio.sleep(0)
+        self.assertEqual(queue.depth, 4)
+
+        websocket.can_send.set()
+        await queue.close()
+        self.assertEqual(websocket.sent, [f"state {index}" for index in range(5)])
+        self.assertEqual(queue.stats().sent, 5)
+
+    async def test_lagging_client_gets_the_coalesced_latest_state(self) -> None:
+        websocket = _SlowWebsocket()
+        queue = OutboundQueue(websocket, high_water_mark=3, coalesce=lambda latest: f"snapshot of {latest}")
+
+        await queue.send("patch 0")
+        await asyncio.sleep(0)
+        for index in range(1, 5):
+            await queue.send(f"patch {index}")
+
+        self.assertEqual(queue.depth, 1)
+        websocket.can_send.set()
+        await queue.close()
+
+        self.assertEqual(websocket.sent, ["patch 0", "snapshot of patch 4"])
+        stats = queue.stats()
+        self.assertEqual((stats.max_depth, stats.coalesced, stats.disconnected), (3, 3, False))
+
+    async def test_disconnect_policy_closes_lagging_clients(self) -> None:
+        websocket = _SlowWebsocket()
+        queue = OutboundQueue(websocket, high_water_mark=2, overflow_policy=OverflowPolicy.DISCONNECT)
+
+        for index in range(4):
+            await queue.send(f"state {index}")
+        await asyncio.sleep(0)
+
+        self.assertEqual(websocket.close_code, SLOW_CLIENT_CLOSE_CODE)
+        self.assertTrue(queue.stats().disconnected)
+        await asyncio.wait_for(queue.close(), timeout=0.1)
+
+    async def test_lagging_delta_client_still_rebuilds_the_final_state(self) -> None:
+        websocket = _SlowWebsocket()
+        websocket.can_send.set()
+        config = build_game_config(
+            num_ai_players=2,
+            num_human_players=0,
+            chip_mode=ChipMode.RESET_EACH_ROUND,
+            max_rounds=50,
+            random_seed=4,
+            pacing="instant",
+        )
+
+        with patch("game_engine.game.NashBlueprintPolicy", _AlwaysCallPolicy):
+            await simulate_poker_game(websocket, "Leduc", config, STATE_PROTOCOL_DELTA, high_water_mark=4)
+
+        state, seq = None, None
+        for message in map(json.loads, websocket.sent):
+            if message["type"] == "state-snapshot":
+                state, seq = message["state"], message["seq"]
+            else:
+                self.assertEqual(message["seq"], seq + 1)
+                state, seq = apply_state_patch(state, message["ops"]), message["seq"]
+
+        self.assertLess(len(websocket.sent), 20)
+        self.assertTrue(state["game_over"])
+        self.assertEqual(len(state["players"]["initial_players"][0]["chips_won_history"]), 50)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+import asyncio
+import os
+import time
+import unittest
+from dataclasses import replace
+from unittest.mock import patch
+
+from game_engine.config import build_game_config, load_server_config
+from game_engine.game import Game, Round
+from game_engine.pacing import Pacing, PacingMode, RealTimePacing, VirtualClockPacing, build_pacing
+from game_engine.simulator import build_simulation_config, run_simulation, run_sync, simulate_hands
+
+
+class _CallingPolicy:
+    def __init__(self, *, model_path, rng):
+        self.rng = rng
+
+    def decide_next_action(self, infoset: str) -> str:
+        return "c"
+
+
+class PacingTests(unittest.TestCase):
+    def test_build_pacing_falls_back_to_real_time(self) -> None:
+        self.assertIsInstance(build_pacing("virtual"), VirtualClockPacing)
+        self.assertIsInstance(build_pacing(PacingMode.INSTANT), Pacing)
+        self.assertIsInstance(build_pacing("unknown"), RealTimePacing)
+        self.assertIsInstance(build_pacing(None), RealTimePacing)
+
+    def test_load_server_config_reads_pacing(self) -> None:
+        with patch.dict(os.environ, {"POKER_ML_PACING": "instant"}, clear=False):
+            config = load_server_config()
+
+        self.assertEqual(config.game_config.pacing.mode, PacingMode.INSTANT)
+        self.assertFalse(config.game_config.pacing.suspends)
+
+    def test_virtual_clock_counts_delays_without_sleeping(self) -> None:
+        pacing = VirtualClockPacing(phase_delay=2.0, ai_turn_delay=3.0)
+        config = build_game_config(num_ai_players=2, num_human_players=0, random_seed=7, pacing=pacing)
+        game = Game(None, "Leduc", config)
+        game.policy = None
+
+        started_at = time.perf_counter()
+        round_instance = Round(game, *game.get_blinds())
+        run_sync(round_instance.start())
+
+        self.assertLess(time.perf_counter() - started_at, 1.0)
+        num_phases = round_instance.history.count("/")
+        num_turns = len(round_instance.history) - num_phases
+        self.assertEqual(game.pacing.now, 2.0 * num_phases + 3.0 * num_turns)
+        # The config's clock is a template, every game counts its own time
+        self.assertEqual(pacing.now, 0.0)
+        self.assertIsNot(Game(None, "Leduc", config).pacing, game.pacing)
+
+    def test_simulation_summary_adds_up_virtual_time(self) -> None:
+        with patch("game_engine.game.NashBlueprintPolicy", _CallingPolicy):
+            config = replace(build_simulation_config(), pacing=VirtualClockPacing(phase_delay=2.0, ai_turn_delay=3.0))
+            hand_results = list(simulate_hands("Leduc", replace(config, random_seed=3), 5))
+            summary = run_simulation(10, config=config, hands_per_game=5, random_seed=3)
+
+        # Blueprint turns are not delayed, only the end of each phase is
+        for hand_result in hand_results:
+            self.assertEqual(hand_result.virtual_seconds, 2.0 * hand_result.history.count("/"))
+        # Both games of the run start their clock at 0, the first one replays the hands above
+        self.assertGreater(summary.virtual_seconds, sum(hand_result.virtual_seconds for hand_result in hand_results))
+        self.assertIn("hours at a table", summary.format())
+
+    def test_real_time_pacing_sleeps(self) -> None:
+        pacing = RealTimePacing(phase_delay=0.05, ai_turn_delay=0)
+
+        started_at = time.perf_counter()
+        asyncio.run(pacing.after_phase())
+        asyncio.run(pacing.before_ai_turn())
+
+        self.assertTrue(pacing.suspends)
+        self.assertGreaterEqual(time.perf_counter() - started_at, 0.05)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+import asyncio
+import random
+import unittest
+
+from game_engine.config import build_game_config
+from game_engine.functions import reorder_list
+from game_engine.game import Game
+from game_engine.player import GROUP_NAMES, PlayerTurnState
+
+GROUP_CONDITIONS = {
+    "all": lambda player: True,
+    "non_broke": lambda player: not (player.chips == 0 and player.turn_state != PlayerTurnState.ALL_IN),
+    "can_bet_in_current_turn": lambda player: GROUP_CONDITIONS["non_broke"](player)
+    and player.turn_state not in {PlayerTurnState.FOLDED, PlayerTurnState.ALL_IN},
+    "active_in_hand": lambda player: GROUP_CONDITIONS["non_broke"](player)
+    and player.turn_state != PlayerTurnState.FOLDED,
+    "all_in": lambda player: player.turn_state == PlayerTurnState.ALL_IN,
+    "human": lambda player: not player.is_robot,
+    "not_human": lambda player: player.is_robot,
+}
+
+
+class _ScriptedWebsocket:
+    def __init__(self, messages: list[str]) -> None:
+        self.messages = messages
+
+    async def recv(self) -> str:
+        return self.messages.pop(0)
+
+
+class HumanActionTests(unittest.TestCase):
+    def test_short_stack_calls_all_in_for_less(self) -> None:
+        game = Game(None, "Leduc", build_game_config(num_ai_players=1, num_human_players=1, random_seed=1))
+        human = game.players.get_players("human")[0]
+        human.set_chips(150)
+        human.set_turn_state(PlayerTurnState.PLAYING_TURN)
+        human.websocket = _ScriptedWebsocket(["Call"])
+
+        self.assertEqual(asyncio.run(human.receive_human_action(200, 200)), "Call")
+        self.assertEqual((human.chips, human.round_bet_value), (0, 150))
+        self.assertEqual(human.get_turn_state(), PlayerTurnState.ALL_IN)
+
+
+class PlayerGroupTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.game = Game(None, "Texas Hold'em", build_game_config(num_ai_players=6, num_human_players=3, random_seed=1))
+        self.players = self.game.players
+
+    def _assert_groups_match_their_definition(self) -> None:
+        for group in GROUP_NAMES:
+            expected = [player for player in self.players.initial_players if GROUP_CONDITIONS[group](player)]
+            self.assertEqual(self.players.get_players(group), expected, group)
+            self.assertEqual(self.players.count(group), len(expected), group)
+
+            for raw_id in range(12):
+                ordered_players = reorder_list(self.players.initial_players, lambda player: player.id == raw_id % 9)
+                expected_player = next((player for player in ordered_players if player in expected), None)
+                self.assertIs(self.players.get_closest_group_player(group, raw_id), expected_player, (group, raw_id))
+
+    def test_groups_follow_chip_and_turn_state_changes(self) -> None:
+        rng = random.Random(4)
+        self._assert_groups_match_their_definition()
+        for _ in range(200):
+            player = rng.choice(self.players.initial_players)
+            if rng.random() < 0.5:
+                player.set_turn_state(rng.choice(list(PlayerTurnState)))
+            else:
+                player.set_chips(rng.choice([0, 0, 100, 1200]))
+            self._assert_groups_match_their_definition()
+
+    def test_returned_lists_are_copies(self) -> None:
+        self.players.get_players("all").clear()
+
+        self.assertEqual(len(self.players.get_players("all")), 9)
+        self.assertTrue(self.players.contains("human", self.players.initial_players[8]))
+        with self.assertRaises(ValueError):
+            self.players.get_players("spectators")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+import unittest
+
+from game_engine.ai.sampling import BlueprintSampler, action_from_code
+from game_engine.random_control import build_rng
+
+SAMPLE_MODEL = {
+    ":|Q": ([0, 2, 3, 12], [0.1, 0.2, 0.3, 0.4]),
+    "r200:|K": ([0, 2, 4], [0.25, 0.5, 0.25]),
+    "kr300c/:|A/Q": ([0, 5], [0.0, 1.0]),
+}
+
+
+def _reference_decision(model: dict, infoset: str, rng) -> str:
+    action_data = model.get(infoset)
+    if action_data is None:
+        return "c"
+
+    actions, probabilities = action_data
+    selected_action_code = rng.choices(actions, weights=probabilities, k=1)[0]
+    history = infoset.split(":|")[0]
+    return action_from_code(selected_action_code, actions.index(selected_action_code), history[-1] if history else "y")
+
+
+class BlueprintSamplerTests(unittest.TestCase):
+    def test_decisions_match_rng_choices_for_the_same_seed(self) -> None:
+        sampler = BlueprintSampler(SAMPLE_MODEL)
+        infosets = [":|Q", "r200:|K", "kr300c/:|A/Q", "unknown:|Q"] * 50
+        sampler_rng = build_rng(42)
+        reference_rng = build_rng(42)
+
+        for infoset in infosets:
+            self.assertEqual(sampler.decide(infoset, sampler_rng), _reference_decision(SAMPLE_MODEL, infoset, reference_rng))
+
+    def test_decide_many_uses_one_rng_per_infoset(self) -> None:
+        sampler = BlueprintSampler(SAMPLE_MODEL)
+        infosets = [":|Q", "r200:|K", ":|Q"]
+
+        decisions = sampler.decide_many(infosets, [build_rng(seed) for seed in range(3)])
+
+        expected = [sampler.decide(infoset, build_rng(seed)) for seed, infoset in enumerate(infosets)]
+        self.assertEqual(decisions, expected)
+        with self.assertRaises(ValueError):
+            sampler.decide_many(infosets, [build_rng(0)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,183 @@
+import random
+import unittest
+from fractions import Fraction
+from unittest.mock import patch
+
+from game_engine.common_types import ChipMode
+from game_engine.config import build_game_config
+from game_engine.game import Game, Round
+from game_engine.pacing import PacingMode
+from game_engine.player import PlayerTurnState
+from game_engine.pots import Pot, award_pots, build_pots
+from game_engine.protocol import build_game_state
+from game_engine.simulator import run_sync
+
+
+class _FoldOnTheTurnPolicy:
+    def __init__(self, *, model_path, rng):
+        self.rng = rng
+
+    def decide_next_action(self, infoset: str) -> str:
+        # Hold'em info sets end in the hole card ranks and then the board's, four of them on the turn
+        board = infoset.split(":|")[1].partition("/")[2]
+        return "f" if len(board) == 4 else "c"
+
+
+class _ShovingPolicy:
+    def __init__(self, *, model_path, rng):
+        self.rng = rng
+
+    def decide_next_action(self, infoset: str) -> str:
+        return self.rng.choice(["f", "c", "c", "c", "r100000"])
+
+
+def _split_chip_by_chip(
+    contributions: dict[int, int], eligible_player_ids: set[int], order_of_best_hands: list[list[int]]
+) -> dict[int, Fraction]:
+    # Every chip goes to the best eligible hands among the players who put in at least as many, chips above all of
+    # theirs to the ones who put in the most
+    max_eligible_amount = max(contributions[player_id] for player_id in eligible_player_ids)
+    winnings = {player_id: Fraction(0) for player_id in contributions}
+    for player_id, amount in contributions.items():
+        for chip in range(1, amount + 1):
+            covering_ids = {
+                other_id
+                for other_id in eligible_player_ids
+                if contributions[other_id] >= min(chip, max_eligible_amount)
+            }
+            winners = next(
+                [winner_id for winner_id in hand_group if winner_id in covering_ids]
+                for hand_group in order_of_best_hands
+                if covering_ids.intersection(hand_group)
+            )
+            for winner_id in winners:
+                winnings[winner_id] += Fraction(1, len(winners))
+    return winnings
+
+
+class PotTests(unittest.TestCase):
+    def test_side_pots_are_layered_by_contribution(self) -> None:
+        # Player 3 folded after putting 50 in, 0 and 1 are all in for less than 2
+        pots = build_pots({0: 100, 1: 300, 2: 500, 3: 50}, {0, 1, 2})
+        self.assertEqual(pots, [Pot(350, (0, 1, 2)), Pot(400, (1, 2)), Pot(200, (2,))])
+
+        awarded_pots = award_pots(pots, [[0], [2], [1]])
+        self.assertEqual([pot.winner_ids for pot in awarded_pots], [(0,), (2,), (2,)])
+        awarded_pots = award_pots(pots, [[0, 1], [2]])
+        self.assertEqual([pot.winner_ids for pot in awarded_pots], [(0, 1), (1,), (2,)])
+
+    def test_equal_contributions_share_a_pot(self) -> None:
+        self.assertEqual(build_pots({0: 200, 1: 200, 2: 80}, {0, 1}), [Pot(480, (0, 1))])
+        # A folded big blind no one called
+        self.assertEqual(build_pots({0: 20, 1: 0}, {1}), [Pot(20, (1,))])
+        self.assertEqual(build_pots({0: 300, 1: 100, 2: 100}, {1, 2}), [Pot(500, (1, 2))])
+
+    def test_pots_match_a_chip_by_chip_split(self) -> None:
+        rng = random.Random(7)
+        for _ in range(300):
+            num_players = rng.randint(2, 9)
+            contributions = {player_id: rng.choice([0, 10, 20, 50, 100, 250]) for player_id in range(num_players)}
+            eligible_player_ids = {
+                player_id for player_id in range(num_players) if rng.random() < 0.6 and contributions[player_id]
+            } or {max(contributions, key=contributions.__getitem__)}
+            ranked_ids = sorted(eligible_player_ids, key=lambda _: rng.random())
+            order_of_best_hands: list[list[int]] = []
+            for player_id in ranked_ids:
+                if order_of_best_hands and rng.random() < 0.3:
+                    order_of_best_hands[-1].append(player_id)
+                else:
+                    order_of_best_hands.append([player_id])
+
+            pots = award_pots(build_pots(contributions, eligible_player_ids), order_of_best_hands)
+            self.assertEqual(sum(pot.amount for pot in pots), sum(contributions.values()))
+            winnings = {player_id: Fraction(0) for player_id in contributions}
+            for pot in pots:
+                for winner_id in pot.winner_ids:
+                    winnings[winner_id] += Fraction(pot.amount, len(pot.winner_ids))
+            self.assertEqual(winnings, _split_chip_by_chip(contributions, eligible_player_ids, order_of_best_hands))
+
+    def test_showdown_pays_each_pot(self) -> None:
+        game = Game(
+            None,
+            "Texas Hold'em",
+            build_game_config(num_ai_players=4, num_human_players=0, random_seed=1, pacing=PacingMode.INSTANT),
+        )
+        round_instance = Round(game, 10, 20)
+        players = game.players.initial_players
+        turn_states = (
+            PlayerTurnState.ALL_IN,
+            PlayerTurnState.ALL_IN,
+            PlayerTurnState.WAITING_FOR_TURN,
+            PlayerTurnState.FOLDED,
+        )
+        for player, amount, turn_state in zip(players, (100, 300, 500, 50), turn_states):
+            player.set_chips(player.chips - amount)
+            player.set_round_bet_value(amount)
+            player.set_turn_state(turn_state)
+            game.total_pot += amount
+        players[0].set_chips(0)
+        players[1].set_chips(0)
+        round_instance.players_in_the_hand = players[:3]
+        chips_before = [player.chips for player in players]
+
+        pots = round_instance.distribute_pot([[players[0]], [players[2]], [players[1]]])
+        self.assertEqual(game.total_pot, 0)
+        self.assertEqual([player.chips - chips for player, chips in zip(players, chips_before)], [350, 0, 600, 0])
+        self.assertEqual(
+            build_game_state(game)["pots"],
+            [
+                {"amount": 350, "eligible": [0, 1, 2], "winners": [0]},
+                {"amount": 400, "eligible": [1, 2], "winners": [2]},
+                {"amount": 200, "eligible": [2], "winners": [2]},
+            ],
+        )
+        self.assertEqual(game.pots, pots)
+
+    def test_holdem_hands_reach_showdown_only_on_the_river(self) -> None:
+        with patch("game_engine.game.NashBlueprintPolicy", _FoldOnTheTurnPolicy):
+            game = Game(
+                None,
+                "Texas Hold'em",
+                build_game_config(num_ai_players=2, num_human_players=0, random_seed=3, pacing=PacingMode.INSTANT),
+            )
+            round_instance = Round(game, 10, 20)
+            run_sync(round_instance.start())
+
+        self.assertFalse(round_instance.is_showdown)
+        self.assertEqual(len(round_instance.players_in_the_hand), 1)
+        winner = round_instance.players_in_the_hand[0]
+        winner.show_down_hand["value"] = 1234
+        self.assertEqual(round_instance.calculate_winners(), [[winner]])
+        self.assertIsNone(winner.show_down_hand["value"])
+        self.assertEqual(sorted(player.chip_balance for player in game.players.initial_players), [-20, 20])
+
+    def test_multiway_all_ins_keep_every_chip(self) -> None:
+        with patch("game_engine.game.NashBlueprintPolicy", _ShovingPolicy):
+            num_side_pots = 0
+            for random_seed in range(5):
+                game = Game(
+                    None,
+                    "Texas Hold'em",
+                    build_game_config(
+                        num_ai_players=6,
+                        num_human_players=0,
+                        chip_mode=ChipMode.PERSISTENT_MATCH,
+                        random_seed=random_seed,
+                        pacing=PacingMode.INSTANT,
+                    ),
+                )
+                total_chips = sum(player.chips for player in game.players.initial_players)
+                while not game.is_finished():
+                    small_blind, big_blind = game.get_blinds()
+                    round_instance = Round(game, small_blind, big_blind)
+                    run_sync(round_instance.start())
+                    players_in_the_hand = round_instance.players_in_the_hand
+                    self.assertEqual(len(set(players_in_the_hand)), len(players_in_the_hand))
+                    num_side_pots += len(game.pots) - 1
+                    game.finish_round()
+                    self.assertEqual(sum(player.chips for player in game.players.initial_players), total_chips)
+            self.assertGreater(num_side_pots, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
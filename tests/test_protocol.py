@@ -1,7 +1,47 @@
+import copy
+import json
 import unittest
+from unittest.mock import patch
+
+from treys import Card
 
 from game_engine.common_types import ChipMode
-from game_engine.protocol import build_start_game_message, parse_start_request
+from game_engine.config import build_game_config
+from game_engine.game import Game
+from game_engine.protocol import (
+    STATE_PROTOCOL_DELTA,
+    STATE_PROTOCOL_FULL,
+    GameStateStream,
+    apply_state_patch,
+    build_game_state,
+    build_start_game_message,
+    diff_state,
+    is_resync_request,
+    parse_start_request,
+    serialize_game_state,
+)
+from game_engine.serialization import (
+    ENCODING_JSON,
+    ENCODING_MSGPACK,
+    decode_client_message,
+    dumps,
+    msgpack,
+    orjson,
+)
+
+SAMPLE_STATE = {
+    "players": {
+        "initial_players": [
+            {"id": 0, "chips": 1200, "chips_won_history": [100, -50], "show_down_hand": {"value": None}},
+            {"id": 1, "chips": 1200, "chips_won_history": [-100, 50], "show_down_hand": {"value": None}},
+        ],
+        "current_dealer": {"id": 0, "chips": 1200, "chips_won_history": [100, -50], "show_down_hand": {"value": None}},
+        "current_turn_player": "EVERYONE_IN_ALL_IN",
+    },
+    "table_cards": [],
+    "total_pot": 0,
+    "winner_name": None,
+}
 
 
 class ProtocolTests(unittest.TestCase):
@@ -27,6 +67,155 @@ class ProtocolTests(unittest.TestCase):
     def test_parse_start_request_rejects_unknown_payload(self) -> None:
         self.assertIsNone(parse_start_request('{"type":"ping"}'))
 
+    def test_parse_start_request_reads_state_protocol(self) -> None:
+        delta_request = parse_start_request(build_start_game_message("Leduc", ChipMode.RESET_EACH_ROUND, STATE_PROTOCOL_DELTA))
+        legacy_request = parse_start_request("start-game-Leduc")
+
+        self.assertEqual(delta_request.state_protocol, STATE_PROTOCOL_DELTA)
+        self.assertEqual(legacy_request.state_protocol, STATE_PROTOCOL_FULL)
+        self.assertTrue(is_resync_request('{"type": "resync"}'))
+        self.assertFalse(is_resync_request("Call"))
+
+    def test_parse_start_request_falls_back_to_json_encoding(self) -> None:
+        message = build_start_game_message("Leduc", ChipMode.RESET_EACH_ROUND, encoding=ENCODING_MSGPACK)
+
+        with patch("game_engine.serialization.msgpack", None):
+            self.assertEqual(parse_start_request(message).encoding, ENCODING_JSON)
+        self.assertEqual(parse_start_request("start-game-Leduc").encoding, ENCODING_JSON)
+        self.assertEqual(parse_start_request('{"type":"start-game","gameType":"Leduc","encoding":"xml"}').encoding, ENCODING_JSON)
+
+    @unittest.skipIf(msgpack is None, "msgpack is not installed")
+    def test_msgpack_messages_decode_to_the_json_protocol(self) -> None:
+        message = build_start_game_message("Leduc", ChipMode.RESET_EACH_ROUND, encoding=ENCODING_MSGPACK)
+        self.assertEqual(parse_start_request(message).encoding, ENCODING_MSGPACK)
+
+        self.assertEqual(decode_client_message(msgpack.packb("Bet 300")), "Bet 300")
+        self.assertTrue(is_resync_request(decode_client_message(msgpack.packb({"type": "resync"}))))
+        self.assertEqual(decode_client_message(b"\xc1"), "")
+        self.assertEqual(decode_client_message("Call"), "Call")
+
+
+class SerializeGameStateTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.game = Game(None, "Leduc", build_game_config(num_ai_players=0, num_human_players=2, random_seed=3))
+        first_player, second_player = self.game.players.initial_players
+        first_player.chips_won_history.extend([100, -200])
+        first_player.cards = [Card.new("As")]
+        self.game.players.current_turn_player = second_player
+
+    def test_fast_encoder_writes_the_same_values(self) -> None:
+        self.assertEqual(json.loads(serialize_game_state(self.game)), build_game_state(self.game))
+
+    def test_both_encoders_write_the_golden_bytes(self) -> None:
+        def player_text(player_id: int, cards: str, chips_won_history: str) -> str:
+            return (
+                f'{{"id":{player_id},"name":"Player {player_id}","chips":1200,"round_start_chips":1200,'
+                f'"round_end_chips":1200,"cards":[{cards}],'
+                '"show_down_hand":{"value":null,"hand":[],"descendingSortHand":[]},"turn_bet_value":0,'
+                '"phase_bet_value":0,"round_bet_value":0,"is_robot":false,"turn_state":"NOT_PLAYING",'
+                f'"played_current_phase":false,"chip_balance":0,"chips_won_history":[{chips_won_history}]}}'
+            )
+
+        first_player, second_player = player_text(0, '"As"', "100,-200"), player_text(1, "", "")
+        golden_state = (
+            f'{{"players":{{"initial_players":[{first_player},{second_player}],"current_dealer":{first_player},'
+            f'"current_turn_player":{second_player}}},"_increase_blind_every":0,"round_num":0,"table_cards":[],'
+            '"phase_name":null,"total_pot":0,"pots":[],"min_turn_value_to_continue":0,"min_bet":0,'
+            '"chip_mode":"persistent_match","game_type":"Leduc","game_over":false,"winner_name":null}'
+        )
+        message = {"winner_name": "Zoë", "equity": [0.5, float("nan"), float("inf")], "cards": ("As",), "pot": 300}
+        golden_message = '{"winner_name":"Zoë","equity":[0.5,null,null],"cards":["As"],"pot":300}'
+
+        with patch("game_engine.serialization.orjson", None):
+            self.assertEqual(serialize_game_state(self.game), golden_state)
+            self.assertEqual(dumps(message), golden_message)
+        if orjson is not None:
+            self.assertEqual(serialize_game_state(self.game), golden_state)
+            self.assertEqual(dumps(message), golden_message)
+
+    @unittest.skipIf(msgpack is None, "msgpack is not installed")
+    def test_msgpack_encoding_writes_the_same_values(self) -> None:
+        encoded_state = serialize_game_state(self.game, ENCODING_MSGPACK)
+
+        self.assertIsInstance(encoded_state, bytes)
+        self.assertEqual(msgpack.unpackb(encoded_state), build_game_state(self.game))
+
+    def test_state_does_not_share_lists_with_players(self) -> None:
+        state = build_game_state(self.game)
+        self.game.players.initial_players[0].chips_won_history.append(50)
+
+        self.assertEqual(state["players"]["initial_players"][0]["chips_won_history"], [100, -200])
+        self.assertEqual(state["players"]["initial_players"][0]["cards"], ["As"])
+
+
+class StatePatchTests(unittest.TestCase):
+    def test_patches_rebuild_every_state(self) -> None:
+        new_state = copy.deepcopy(SAMPLE_STATE)
+        new_state["players"]["initial_players"][0]["chips"] = 1300
+        new_state["players"]["initial_players"][0]["chips_won_history"].append(100)
+        new_state["players"]["current_turn_player"] = {"id": 1}
+        new_state["table_cards"] = ["As"]
+        new_state["winner_name"] = "AI 0"
+
+        operations = diff_state(SAMPLE_STATE, new_state)
+
+        self.assertIn({"p": ["players", "initial_players", 0, "chips_won_history"], "a": [100]}, operations)
+        self.assertEqual(apply_state_patch(copy.deepcopy(SAMPLE_STATE), operations), new_state)
+
+    def test_stream_copies_players_that_became_dealer(self) -> None:
+        stream = GameStateStream()
+        new_state = copy.deepcopy(SAMPLE_STATE)
+        new_state["players"]["current_dealer"] = copy.deepcopy(new_state["players"]["initial_players"][1])
+
+        stream.encode(copy.deepcopy(SAMPLE_STATE))
+        patch = json.loads(stream.encode(new_state))
+
+        self.assertEqual(patch["ops"], [{"p": ["players", "current_dealer"], "c": ["players", "initial_players", 1]}])
+        self.assertEqual(apply_state_patch(copy.deepcopy(SAMPLE_STATE), patch["ops"]), new_state)
+
+    def test_stream_sends_a_snapshot_then_numbered_patches(self) -> None:
+        stream = GameStateStream()
+        new_state = copy.deepcopy(SAMPLE_STATE)
+        new_state["total_pot"] = 200
+
+        snapshot = json.loads(stream.encode(copy.deepcopy(SAMPLE_STATE)))
+        self.assertIsNone(stream.encode(copy.deepcopy(SAMPLE_STATE)))
+        patch = json.loads(stream.encode(new_state))
+        stream.reset()
+        resync = json.loads(stream.encode(new_state))
+
+        self.assertEqual((snapshot["type"], snapshot["seq"]), ("state-snapshot", 1))
+        self.assertEqual((patch["type"], patch["seq"], patch["ops"]), ("state-patch", 2, [{"p": ["total_pot"], "v": 200}]))
+        self.assertEqual((resync["type"], resync["seq"], resync["state"]), ("state-snapshot", 3, new_state))
+
+    def test_game_stream_reuses_unchanged_players(self) -> None:
+        game = Game(None, "Texas Hold'em", build_game_config(num_ai_players=3, num_human_players=0))
+        stream = GameStateStream()
+        players = game.players.initial_players
+        game.players.current_dealer = players[0]
+        stream.encode_game(game)
+        last_state = stream._last_state
+
+        players[1].set_chips(players[1].chips - 20)
+        players[2].chips_won_history.append(-20)
+        patch = json.loads(stream.encode_game(game))
+        state = stream._last_state
+
+        self.assertIs(state["players"]["initial_players"][0], last_state["players"]["initial_players"][0])
+        self.assertEqual(
+            patch["ops"],
+            [
+                {"p": ["players", "initial_players", 1, "chips"], "v": players[1].chips},
+                {"p": ["players", "initial_players", 2, "chips_won_history"], "a": [-20]},
+            ],
+        )
+        self.assertEqual(apply_state_patch(copy.deepcopy(last_state), patch["ops"]), build_game_state(game))
+        # The states the stream keeps do not change with the players
+        players[0].chips_won_history.append(20)
+        players[0].show_down_hand["value"] = 1
+        self.assertEqual(state["players"]["initial_players"][0]["chips_won_history"], [])
+        self.assertNotIn(1, state["players"]["initial_players"][0]["show_down_hand"].values())
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,83 @@
+import os
+import random
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from treys import Card, Deck, Evaluator
+
+from game_engine import evaluation
+from game_engine.rank_table import HandRankTable, load_rank_table, np, write_rank_table
+
+
+class RankTableTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.temp_dir = tempfile.TemporaryDirectory()
+        cls.path = write_rank_table(Path(cls.temp_dir.name) / "holdem-7card.ranks")
+        cls.table = HandRankTable(cls.path)
+        cls.evaluator = Evaluator()
+        rng = random.Random(11)
+        deck = Deck.GetFullDeck()
+        # Hands drawn from two suits make flushes and straight flushes common
+        two_suits = [Card.new(rank + suit) for rank in "23456789TJQKA" for suit in "cd"]
+        cls.hands = [rng.sample(deck, 7) for _ in range(3000)] + [rng.sample(two_suits, 7) for _ in range(3000)]
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.temp_dir.cleanup()
+
+    def _treys_rank(self, cards: list[int]) -> int:
+        return self.evaluator.evaluate(cards[:5], cards[5:])
+
+    def test_ranks_match_treys(self) -> None:
+        for cards in self.hands:
+            self.assertEqual(self.table.evaluate(cards), self._treys_rank(cards))
+
+    def test_shared_board_ranks_match_treys(self) -> None:
+        for cards in self.hands[:500]:
+            hands = [cards[5:7], [card for card in Deck.GetFullDeck() if card not in cards][:2]]
+            self.assertEqual(
+                self.table.evaluate_many(cards[:5], hands),
+                [self.evaluator.evaluate(cards[:5], hand) for hand in hands],
+            )
+
+    @unittest.skipIf(np is None, "numpy is not installed")
+    def test_batch_ranks_match_treys(self) -> None:
+        ranks = self.table.evaluate_batch(np.array(self.hands))
+        self.assertEqual(ranks.tolist(), [self._treys_rank(cards) for cards in self.hands])
+
+    def test_other_files_are_rejected(self) -> None:
+        other_path = Path(self.temp_dir.name) / "other.ranks"
+        other_path.write_bytes(self.path.read_bytes()[:1000])
+        with self.assertRaises(ValueError):
+            HandRankTable(other_path)
+        self.assertIsNone(load_rank_table(Path(self.temp_dir.name) / "missing.ranks"))
+
+    def test_tables_are_only_written_on_little_endian_hosts(self) -> None:
+        path = Path(self.temp_dir.name) / "big-endian.ranks"
+        with patch("game_engine.rank_table.sys.byteorder", "big"), self.assertRaises(ValueError):
+            write_rank_table(path)
+        self.assertFalse(path.exists())
+
+    def test_a_table_built_after_a_missed_lookup_is_used(self) -> None:
+        evaluation._load_rank_table.cache_clear()
+        self.addCleanup(evaluation._load_rank_table.cache_clear)
+        copy_path = Path(self.temp_dir.name) / "late.ranks"
+        with patch.dict(os.environ, {"POKER_ML_RANK_TABLE": str(copy_path)}, clear=False):
+            self.assertIsNone(evaluation.get_rank_table())
+            copy_path.write_bytes(self.path.read_bytes())
+            self.assertEqual(evaluation.get_rank_table().path, copy_path)
+
+    def test_showdowns_use_the_configured_table(self) -> None:
+        evaluation._load_rank_table.cache_clear()
+        self.addCleanup(evaluation._load_rank_table.cache_clear)
+        with patch.dict(os.environ, {"POKER_ML_RANK_TABLE": str(self.path)}, clear=False):
+            self.assertEqual(evaluation.get_rank_table().path, self.path)
+            cards = self.hands[0]
+            self.assertEqual(evaluation.evaluate_many(cards[:5], [cards[5:]]), [self._treys_rank(cards)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+import csv
+import gzip
+import pickle
+import tempfile
+import types
+import unittest
+from dataclasses import replace
+from pathlib import Path
+
+from treys import Card
+
+from game_engine.game import Game, Round
+from game_engine.simulator import build_simulation_config, run_simulation, run_sync, simulate_hands
+
+
+class _RecordingPolicy:
+    def __init__(self, player) -> None:
+        self.player = player
+        self.infosets: list[tuple[str, str]] = []
+
+    def decide_next_action(self, infoset: str) -> str:
+        self.infosets.append((infoset, Card.int_to_str(self.player.cards[0])))
+        return "c"
+
+
+@types.coroutine
+def _suspend():
+    yield
+
+
+async def _suspending_coroutine() -> None:
+    await _suspend()
+
+
+class SimulatorTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.model_path = Path(self.temp_dir.name) / "model.pkl"
+        with self.model_path.open("wb") as file_handle:
+            pickle.dump({":|Q": ([0, 2], [0.5, 0.5]), ":|K": ([0, 3], [0.25, 0.75])}, file_handle)
+        self.config = build_simulation_config(model_path=self.model_path)
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def test_hands_are_zero_sum_and_reproducible(self) -> None:
+        config = replace(self.config, random_seed=5)
+
+        hands = list(simulate_hands("Leduc", config, 200))
+
+        self.assertEqual(len(hands), 200)
+        self.assertEqual([hand.hand for hand in hands], list(range(200)))
+        self.assertTrue(all(sum(hand.chip_deltas) == 0 for hand in hands))
+        self.assertEqual(hands, list(simulate_hands("Leduc", config, 200)))
+
+    def test_output_does_not_depend_on_the_number_of_workers(self) -> None:
+        serial_path = Path(self.temp_dir.name) / "serial.csv"
+        parallel_path = Path(self.temp_dir.name) / "parallel.csv.gz"
+
+        serial = run_simulation(300, config=self.config, hands_per_game=100, random_seed=1, output_path=serial_path)
+        parallel = run_simulation(
+            300,
+            config=self.config,
+            num_workers=2,
+            hands_per_game=100,
+            random_seed=1,
+            output_path=parallel_path,
+        )
+
+        self.assertEqual(serial, parallel)
+        self.assertEqual(serial.hands, 300)
+        with gzip.open(parallel_path, "rt", newline="") as file_handle:
+            self.assertEqual(serial_path.read_text(), file_handle.read())
+        with serial_path.open(newline="") as file_handle:
+            rows = list(csv.DictReader(file_handle))
+        self.assertEqual(len(rows), 300)
+        self.assertEqual({row["game_seed"] for row in rows}, {"1", "2", "3"})
+
+    def test_ai_info_sets_use_the_acting_players_cards(self) -> None:
+        game = Game(None, "Leduc", replace(self.config, random_seed=3))
+        policies = [_RecordingPolicy(player) for player in game.players.get_players("all")]
+        for policy in policies:
+            policy.player.policy = policy
+
+        for _ in range(20):
+            run_sync(Round(game, *game.get_blinds()).start())
+
+        for policy in policies:
+            self.assertTrue(policy.infosets)
+            for infoset, card in policy.infosets:
+                self.assertEqual(infoset.split(":|")[1][0], card[0])
+
+    def test_run_sync_rejects_coroutines_that_suspend(self) -> None:
+        with self.assertRaises(RuntimeError):
+            run_sync(_suspending_coroutine())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,141 @@
+import asyncio
+import json
+import socket
+import unittest
+from contextlib import suppress
+from unittest.mock import patch
+
+import websockets
+
+from game_engine.common_types import ChipMode
+from game_engine.config import ServerConfig, build_game_config
+from game_engine.pacing import RealTimePacing
+from game_engine.protocol import apply_state_patch, build_table_request_message
+from game_engine.server import run_server
+
+
+class _AlwaysCallPolicy:
+    def __init__(self, *, model_path, rng):
+        self.model_path = model_path
+        self.rng = rng
+
+    def decide_next_action(self, infoset: str) -> str:
+        return "c"
+
+
+def _get_open_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def _receive(websocket) -> dict:
+    return json.loads(await asyncio.wait_for(websocket.recv(), timeout=5))
+
+
+async def _follow_state(websocket, state=None, seq=None) -> dict:
+    """Applies state messages until the game is over, checking that none is missing."""
+    while state is None or not state["game_over"]:
+        payload = await _receive(websocket)
+        if payload["type"] == "state-snapshot":
+            state, seq = payload["state"], payload["seq"]
+            continue
+        assert payload["seq"] == seq + 1, (payload["seq"], seq)
+        state, seq = apply_state_patch(state, payload["ops"]), payload["seq"]
+    return state
+
+
+class TableManagerTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.policy_patch = patch("game_engine.game.NashBlueprintPolicy", _AlwaysCallPolicy)
+        self.policy_patch.start()
+
+        port = _get_open_port()
+        self.websocket_url = f"ws://127.0.0.1:{port}"
+        server_config = ServerConfig(
+            host="127.0.0.1",
+            port=port,
+            game_config=build_game_config(
+                num_ai_players=1,
+                initial_chips=100,
+                pacing=RealTimePacing(phase_delay=0.01, ai_turn_delay=0.01),
+            ),
+        )
+        self.server_task = asyncio.create_task(run_server(server_config))
+        for _ in range(50):
+            try:
+                async with websockets.connect(self.websocket_url):
+                    return
+            except OSError:
+                await asyncio.sleep(0.05)
+        self.fail("websocket server did not start in time")
+
+    async def asyncTearDown(self) -> None:
+        self.server_task.cancel()
+        with suppress(asyncio.CancelledError):
+            await self.server_task
+        self.policy_patch.stop()
+
+    async def _request(self, action: str, **fields) -> dict:
+        async with websockets.connect(self.websocket_url) as websocket:
+            await websocket.send(build_table_request_message(action, **fields))
+            return await _receive(websocket)
+
+    async def test_players_and_spectators_share_one_table(self) -> None:
+        async with websockets.connect(self.websocket_url) as first_player, websockets.connect(
+            self.websocket_url
+        ) as second_player, websockets.connect(self.websocket_url) as spectator:
+            await first_player.send(
+                build_table_request_message("create-table", gameType="Leduc", chipMode="reset_each_round", humanSeats=2)
+            )
+            created = await _receive(first_player)
+            table_id = created["tableId"]
+            self.assertEqual((created["type"], created["role"]), ("table-joined", "player"))
+
+            table_list = await self._request("list-tables")
+            self.assertEqual(table_list["tables"][0]["freeSeats"], 1)
+            self.assertFalse(table_list["tables"][0]["started"])
+
+            await second_player.send(build_table_request_message("join-table", tableId=table_id))
+            joined = await _receive(second_player)
+            self.assertEqual(joined["seat"], created["seat"] + 1)
+
+            first_state = await _receive(first_player)
+            self.assertEqual(first_state["type"], "state-snapshot")
+            await spectator.send(build_table_request_message("spectate-table", tableId=table_id))
+            self.assertEqual((await _receive(spectator))["role"], "spectator")
+            spectator_snapshot = await _receive(spectator)
+            self.assertEqual(spectator_snapshot["type"], "state-snapshot")
+
+            for player in (first_player, second_player):
+                for _ in range(20):
+                    await player.send("Fold")
+
+            final_states = await asyncio.gather(
+                _follow_state(first_player, first_state["state"], first_state["seq"]),
+                _follow_state(second_player),
+                _follow_state(spectator, spectator_snapshot["state"], spectator_snapshot["seq"]),
+            )
+
+        self.assertTrue(final_states[0]["game_over"])
+        self.assertEqual(final_states[0], final_states[1])
+        self.assertEqual(final_states[0], final_states[2])
+        self.assertEqual((await self._request("list-tables"))["tables"], [])
+
+    async def test_unknown_table_and_abandoned_table(self) -> None:
+        error = await self._request("join-table", tableId="missing")
+        self.assertEqual(error["type"], "table-error")
+
+        async with websockets.connect(self.websocket_url) as player:
+            await player.send(build_table_request_message("create-table", humanSeats=2))
+            await _receive(player)
+
+        for _ in range(50):
+            if not (await self._request("list-tables"))["tables"]:
+                break
+            await asyncio.sleep(0.02)
+        self.assertEqual((await self._request("list-tables"))["tables"], [])
+
+
+if __name__ == "__main__":
+    unittest.main()
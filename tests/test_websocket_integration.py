@@ -7,9 +7,20 @@ from unittest.mock import patch
 
 import websockets
 
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - depends on the environment
+    msgpack = None
+
 from game_engine.common_types import ChipMode
 from game_engine.config import ServerConfig, build_game_config
-from game_engine.protocol import build_start_game_message
+from game_engine.protocol import (
+    STATE_PROTOCOL_DELTA,
+    STATE_PROTOCOL_FULL,
+    apply_state_patch,
+    build_start_game_message,
+)
+from game_engine.serialization import ENCODING_JSON, ENCODING_MSGPACK
 from game_engine.server import run_server
 
 
@@ -46,7 +57,13 @@ class WebsocketIntegrationTests(unittest.IsolatedAsyncioTestCase):
 
         self.fail("websocket server did not start in time")
 
-    async def _run_session(self, game_type: str, chip_mode: ChipMode) -> dict[str, object]:
+    async def _run_session(
+        self,
+        game_type: str,
+        chip_mode: ChipMode,
+        state_protocol: str = STATE_PROTOCOL_FULL,
+        encoding: str = ENCODING_JSON,
+    ) -> dict[str, object]:
         initial_chips = 100 if game_type == "Leduc" else 20
         max_rounds = 1 if chip_mode == ChipMode.RESET_EACH_ROUND else None
         port = _get_open_port()
@@ -69,10 +86,23 @@ class WebsocketIntegrationTests(unittest.IsolatedAsyncioTestCase):
             await self._wait_until_server_starts(websocket_url)
 
             async with websockets.connect(websocket_url) as websocket:
-                await websocket.send(build_start_game_message(game_type, chip_mode))
-
-                for _ in range(30):
-                    payload = json.loads(await asyncio.wait_for(websocket.recv(), timeout=5))
+                await websocket.send(build_start_game_message(game_type, chip_mode, state_protocol, encoding))
+
+                state = None
+                for seq in range(1, 31):
+                    message = await asyncio.wait_for(websocket.recv(), timeout=5)
+                    if encoding == ENCODING_MSGPACK:
+                        self.assertIsInstance(message, bytes)
+                        payload = msgpack.unpackb(message)
+                    else:
+                        payload = json.loads(message)
+                    if state_protocol == STATE_PROTOCOL_DELTA:
+                        self.assertEqual(payload["seq"], seq)
+                        if payload["type"] == "state-snapshot":
+                            state = payload["state"]
+                        else:
+                            state = apply_state_patch(state, payload["ops"])
+                        payload = state
                     messages.append(payload)
                     if payload["game_over"]:
                         break
@@ -100,6 +130,25 @@ class WebsocketIntegrationTests(unittest.IsolatedAsyncioTestCase):
                 self.assertTrue(final_payload["game_over"])
                 self.assertIn("winner_name", final_payload)
 
+    async def test_delta_protocol_rebuilds_the_final_state(self) -> None:
+        final_payload = await self._run_session("Leduc", ChipMode.RESET_EACH_ROUND, STATE_PROTOCOL_DELTA)
+
+        self.assertEqual(final_payload["game_type"], "Leduc")
+        self.assertTrue(final_payload["game_over"])
+        self.assertEqual(len(final_payload["players"]["initial_players"][0]["chips_won_history"]), 1)
+
+    @unittest.skipIf(msgpack is None, "msgpack is not installed")
+    async def test_msgpack_encoding_sends_binary_frames(self) -> None:
+        final_payload = await self._run_session(
+            "Leduc",
+            ChipMode.RESET_EACH_ROUND,
+            STATE_PROTOCOL_DELTA,
+            ENCODING_MSGPACK,
+        )
+
+        self.assertEqual(final_payload["game_type"], "Leduc")
+        self.assertTrue(final_payload["game_over"])
+
 
 if __name__ == "__main__":
     unittest.main()